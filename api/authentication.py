@@ -1,33 +1,131 @@
 from etl.load.mysql_connector import MysqlConnector
 from common.util import Util as u
 
+from collections import OrderedDict
 from hashlib import sha256
+from threading import Lock
+from time import monotonic
+
+
+class _AuthCache:
+    """Process-wide TTL and LRU bounded cache of authenticated api keys 
+    {sha256_api_key: (user_name, roles)}. Unknown keys are not cached.
+    """
+    
+    TTL = 60
+    MAX_SIZE = 1024
+    
+    def __init__(self) -> None:
+        """Creates an empty cache.
+        """
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        
+    def get(self, sha256_api_key: str) -> tuple[str, list[str]]:
+        """Gets the user of an api key if cached and not expired.
+
+        Args:
+            sha256_api_key (str): Sha256 of the api key.
+
+        Returns:
+            tuple[str, list[str]]: (user_name, roles). None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(sha256_api_key)
+            if not entry:
+                return
+            
+            (expires, user_name, roles) = entry
+            if expires < monotonic():
+                del self._entries[sha256_api_key]
+                return
+            
+            self._entries.move_to_end(sha256_api_key)
+            return (user_name, list(roles))
+        
+    def put(self, sha256_api_key: str, user_name: str, 
+            roles: list[str]) -> None:
+        """Caches the user of an api key, evicting the least recently used 
+        one if full.
+
+        Args:
+            sha256_api_key (str): Sha256 of the api key.
+            user_name (str): Username.
+            roles (list[str]): Roles of the user.
+        """
+        with self._lock:
+            self._entries[sha256_api_key] = (monotonic() + _AuthCache.TTL,
+                                             user_name, tuple(roles))
+            self._entries.move_to_end(sha256_api_key)
+            while len(self._entries) > _AuthCache.MAX_SIZE:
+                self._entries.popitem(last=False)
+                
+    def invalidate_user(self, user_name: str) -> None:
+        """Removes cached api keys of a user.
+
+        Args:
+            user_name (str): Username.
+        """
+        with self._lock:
+            for key in [k for (k, e) in self._entries.items() 
+                        if e[1] == user_name]:
+                del self._entries[key]
+
 
 class Authentication:
+    
+    _cache = _AuthCache()
+    
     def __init__(self) -> None:
         """Creates a Authentication connection.
         """
         self.mysql_conn = MysqlConnector("MYSQL_CREDENTIALS")
         
-    def get_user_name(self, api_key: str) -> str:
-        """Get user associated to an api key.
+    def _get_user(self, api_key: str) -> tuple[str, list[str]]:
+        """Get user and roles associated to an api key. Uses the cache, on 
+        miss user and roles are downloaded with a single query.
 
         Args:
             api_key (str): Api key.
 
         Returns:
-            str: Username. None if no user.
+            tuple[str, list[str]]: (user_name, roles). None if no user.
         """
         sha256_api_key = sha256(api_key.encode()).hexdigest()
+        user = Authentication._cache.get(sha256_api_key)
+        if user:
+            return user
+        
         result = self.mysql_conn.download_all(
-            "SELECT user_name FROM credentials WHERE sha256_api_key = %(sha256_api_key)s;",
+            "SELECT c.user_name, r.role_id FROM credentials c "
+            + "LEFT JOIN roles r ON r.user_name = c.user_name "
+            + "WHERE c.sha256_api_key = %(sha256_api_key)s;",
             {"sha256_api_key": sha256_api_key}
         )
         
         if len(result) == 0:
             return
         
-        return result[0][0]
+        user_name = result[0][0]
+        roles = [role for (_, role) in result if role is not None]
+        Authentication._cache.put(sha256_api_key, user_name, roles)
+        
+        return (user_name, roles)
+        
+    def get_user_name(self, api_key: str) -> str:
+        """Get user associated to an api key.
+
+        Args:
+            api_key (str): Api key.
+
+        Returns:
+            str: Username. None if no user.
+        """
+        user = self._get_user(api_key)
+        if not user:
+            return
+        
+        return user[0]
     
     def get_roles(self, api_key: str) -> list[str]:
         """Get the roles for the user provided by its api key.
@@ -38,16 +136,11 @@ class Authentication:
         Returns:
             list[str]: List of roles of the user. None if no user.
         """        
-        user_name = self.get_user_name(api_key)
-        if not user_name:
+        user = self._get_user(api_key)
+        if not user:
             return 
         
-        result = self.mysql_conn.download_all(
-            "SELECT role_id FROM roles WHERE user_name = %(user_name)s;",
-            {"user_name": user_name}
-        )
-        
-        return [role for (role,) in result]
+        return user[1]
     
     def get_roles_by_user(self, user_name: str) -> list[str]:
         """Get the roles for the user provided.
@@ -126,6 +219,7 @@ class Authentication:
         result = self.mysql_conn.upload_data(
             "INSERT INTO roles VALUES (%(user_name)s, %(role)s);", 
             {"user_name": user_name, "role": role})
+        Authentication._cache.invalidate_user(user_name)
         if result["row_count"] != 1:
             return
 
@@ -146,6 +240,7 @@ class Authentication:
         result = self.mysql_conn.upload_data(
             "DELETE FROM credentials WHERE user_name=%(user_name)s;", 
             {"user_name": user_name})
+        Authentication._cache.invalidate_user(user_name)
         if result["row_count"] != 1:
             return
         
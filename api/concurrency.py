@@ -0,0 +1,150 @@
+from common.util import Util as u
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+import asyncio
+import json
+
+
+class BlockingRunner:
+    """Runs blocking controller work (MySQL, Selenium, requests) off the event
+    loop. Each lane has its own bounded thread pool, so slow lanes (browser)
+    can't take the workers of fast lanes (db). Each route has a concurrency
+    limit, extra calls wait for a free slot.
+
+    Lanes and route limits can be set on config file "API_CONCURRENCY"
+    section: {"lanes": {lane: workers}, "route_limits": {route: limit}}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    LANES = {
+        "db": 16,      # Short database reads and writes
+        "browser": 2,  # Launches Firefox or scrapes sources
+        "upload": 2    # Parses an apk and loads it
+    }
+    DEFAULT_ROUTE_LIMIT = 16
+    ROUTE_LIMITS = {
+        "/v2/get/app/name": 2,
+        "/v2/post/app/file": 2
+    }
+
+    _runner = None
+    _lock = Lock() # Prevents threads to create more than one runner.
+
+    @staticmethod
+    def get_runner() -> "BlockingRunner":
+        """Returns or creates the unique runner.
+
+        Returns:
+            BlockingRunner: Runner.
+        """
+        with BlockingRunner._lock:
+            if not BlockingRunner._runner:
+                BlockingRunner._runner = BlockingRunner()
+
+        return BlockingRunner._runner
+
+    def __init__(self) -> None:
+        """Creates the thread pool of each lane.
+        """
+        lanes = dict(BlockingRunner.LANES)
+        self.route_limits = dict(BlockingRunner.ROUTE_LIMITS)
+        try:
+            with open(BlockingRunner.CONFIG_FILE, '+r',
+                      encoding="utf8") as config:
+                api_config = json.loads(config.read())["API_CONCURRENCY"]
+                lanes.update(api_config.get("lanes", {}))
+                self.route_limits.update(api_config.get("route_limits", {}))
+        except:
+            pass
+
+        self.executors = {
+            lane: ThreadPoolExecutor(max_workers=workers,
+                                     thread_name_prefix="api-" + lane)
+            for (lane, workers) in lanes.items()
+        }
+        self.semaphores = {} # {route: asyncio.Semaphore} created on demand
+
+    def _get_semaphore(self, route: str) -> asyncio.Semaphore:
+        """Returns the concurrency limit of a route.
+
+        Args:
+            route (str): Route path.
+
+        Returns:
+            asyncio.Semaphore: Route semaphore.
+        """
+        # Only used from the event loop thread, no lock needed
+        if route not in self.semaphores:
+            limit = self.route_limits.get(route,
+                                          BlockingRunner.DEFAULT_ROUTE_LIMIT)
+            self.semaphores[route] = asyncio.Semaphore(limit)
+
+        return self.semaphores[route]
+
+    async def run(self, lane: str, route: str, func, *args, **kwargs):
+        """Runs a blocking function on a lane thread pool, waiting for a free
+        slot of the route.
+
+        Args:
+            lane (str): Lane (one of LANES).
+            route (str): Route path, used for its concurrency limit.
+            func (Callable): Blocking function.
+
+        Returns:
+            Any: Result of func.
+        """
+        async with self._get_semaphore(route):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executors[lane],
+                                              partial(func, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        """Waits for running work and stops the thread pools.
+        """
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+        u.log_normal("Blocking runner stopped.")
+
+
+async def run_db(route: str, func, *args, **kwargs):
+    """Runs a blocking database function off the event loop.
+
+    Args:
+        route (str): Route path.
+        func (Callable): Blocking function.
+
+    Returns:
+        Any: Result of func.
+    """
+    return await BlockingRunner.get_runner().run("db", route, func,
+                                                 *args, **kwargs)
+
+
+async def run_browser(route: str, func, *args, **kwargs):
+    """Runs a blocking browser or scraping function off the event loop.
+
+    Args:
+        route (str): Route path.
+        func (Callable): Blocking function.
+
+    Returns:
+        Any: Result of func.
+    """
+    return await BlockingRunner.get_runner().run("browser", route, func,
+                                                 *args, **kwargs)
+
+
+async def run_upload(route: str, func, *args, **kwargs):
+    """Runs a blocking apk upload function off the event loop.
+
+    Args:
+        route (str): Route path.
+        func (Callable): Blocking function.
+
+    Returns:
+        Any: Result of func.
+    """
+    return await BlockingRunner.get_runner().run("upload", route, func,
+                                                 *args, **kwargs)
@@ -13,36 +13,77 @@ from fastapi.security.http import HTTPAuthorizationCredentials, HTTPBearer, HTTP
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import json
-from threading import Thread, Lock
+from threading import Lock
 import typing as t
 from time import time
 from datetime import datetime
 
 from api.models import *
 from api.authentication import Authentication
+from api.concurrency import BlockingRunner, run_db
+from controller.job_queue import JobQueue
 from api.documentation import description, title, version, contact, license_info
 
 from api.v2 import v2
 
-###########
-# THREADS #
-###########
-
-# Single threads
-aosp_thread = Thread()
-app_candidates_thread = Thread()
-random_n_download_thread = Thread()
-random_n_candidates_thread = Thread()
-apply_metrics_thread = Thread()
-
-# Current threads
-MAX_LIVE_UPLOAD_THREADS = 1
-live_upload_lock: Lock = Lock()
-live_upload_threads: list[Thread] = []
+########
+# JOBS #
+########
+
+jobs = JobQueue.get_queue()
+
+# Only one job of each admin task at a time
+jobs.register("aosp", admin.update_aosp_data, unique=True)
+jobs.register("app_candidates", admin.get_app_candidates, unique=True)
+jobs.register("n_random_apps", admin.download_random_apps, unique=True)
+jobs.register("n_random_app_candidates",
+              admin.download_random_apps_from_candidates, unique=True)
+jobs.register("apply_metrics", admin.apply_all_metrics, unique=True)
+jobs.register("androzoo_index", admin.build_androzoo_index, unique=True)
+jobs.register("az_metadata_index", admin.load_az_metadata_index, unique=True)
+
+# Many uploads at a time (up to the number of workers). Uploads are retried
+# (known apps are not loaded again), admin jobs are not
+MAX_QUEUED_UPLOADS = 20
+jobs.register("app_upload", db.request_app_upload, retry=True)
+
 credentials_lock: Lock = Lock()
 
+async def enqueue_job(name: str, *args, max_queued: int = None) -> dict:
+    """Enqueues a job (off the event loop, the queue database may be busy).
+
+    Args:
+        name (str): Name of the job.
+        max_queued (int, optional): Max jobs of this name queued or running.
+            Defaults to None.
+
+    Returns:
+        dict: {detail, job_id} Request status (busy, requested) and id of the
+            job.
+    """
+    job_id = await run_db("/jobs", jobs.enqueue, name, *args,
+                          max_queued=max_queued)
+    if job_id is None:
+        return {"detail": "busy", "job_id": None}
+
+    return {"detail": "requested", "job_id": job_id}
+
+async def job_status(name: str) -> dict:
+    """Returns the status of the jobs of a name.
+
+    Args:
+        name (str): Name of the job.
+
+    Returns:
+        dict: {detail} Request status (busy, inactive).
+    """
+    if await run_db("/jobs", jobs.count_active, name):
+        return {"detail": "busy"}
+
+    return {"detail": "inactive"}
+
 
 ##################
 # AUTHENTICATION #
@@ -64,12 +105,13 @@ def api_key_expert_auth(
         str: Expert name.
     """
     auth = Authentication()
-    if not auth.get_roles(api_key.credentials):
+    roles = auth.get_roles(api_key.credentials)
+    if not roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
-    if "expert" not in auth.get_roles(api_key.credentials):
+    if "expert" not in roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
@@ -89,12 +131,13 @@ def api_key_admin_auth(
         HTTPException: Api key not valid.
     """
     auth = Authentication()
-    if not auth.get_roles(api_key.credentials):
+    roles = auth.get_roles(api_key.credentials)
+    if not roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
-    if "admin" not in auth.get_roles(api_key.credentials):
+    if "admin" not in roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
@@ -205,13 +248,14 @@ def expert_user(credentials: HTTPBasicCredentials = Depends(security)):
     if credentials.password == "docmaster":
         return
     auth = Authentication()
-    if not auth.get_roles(credentials.password):
+    roles = auth.get_roles(credentials.password)
+    if not roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Basic"}
         )
-    if "expert" not in auth.get_roles(credentials.password):
+    if "expert" not in roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -265,8 +309,16 @@ ADMIN_PATHS = [
     "/admin/update/aosp",
     "/admin/update/aosp/status",
     "/admin/clean_cache",
+    "/admin/cache/stats",
+    "/admin/jobs",
+    "/admin/jobs/{job_id}",
+    "/admin/jobs/{job_id}/cancel",
     "/admin/update/app_candidates",
     "/admin/update/app_candidates/status",
+    "/admin/update/androzoo_index",
+    "/admin/update/androzoo_index/status",
+    "/admin/update/az_metadata_index",
+    "/admin/update/az_metadata_index/status",
     "/admin/upload/n_random_apps",
     "/admin/upload/n_random_apps/status",
     "/admin/upload/n_random_app_candidates",
@@ -288,6 +340,10 @@ You will be able to:
 * Clean all temporal data (app candidates list, AOSP data cache, partial downloads...).
 * Request to update the app candidates list in the warehouse (most important apps according to Play Store).
 * View the status of the app candidates update.
+* Request to build the Androzoo index used to select random apps.
+* View the status of the Androzoo index build.
+* Request to load the AndrozooGP metadata of the apps in the warehouse from the AndrozooGP index.
+* View the status of the AndrozooGP metadata load.
 * Request to upload an arbitrary number of random apps to the warehouse.
 * View the status of the n random apps upload.
 * Request to upload an arbitrary number of random apps from the candidates to the warehouse.
@@ -302,13 +358,14 @@ def admin_user(credentials: HTTPBasicCredentials = Depends(security)):
     if credentials.password == "docmaster":
         return
     auth = Authentication()
-    if not auth.get_roles(credentials.password):
+    roles = auth.get_roles(credentials.password)
+    if not roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Basic"}
         )
-    if "admin" not in auth.get_roles(credentials.password):
+    if "admin" not in roles:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
@@ -370,14 +427,14 @@ async def get_admin_openapi():
 async def get_app_by_hash(hash: str = Query(description="SHA256 hash of the app to download")) -> dict:
     """Download app metadata by its sha256 hash of the package file (e.g. _4e2d2f9383c46905bf2b67acd7921c7d9b2f663191f29a8c451fcfe5e66d20c5_).
     """
-    app_data = db.get_app_by_hash(hash)
-    if not app_data:
+    app_json = await run_db("/get/app/hash", db.get_app_json_by_hash, hash)
+    if not app_json:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="App not found"
         )
 
-    return app_data
+    return Response(content=app_json, media_type="application/json")
 
 @api.get("/get/app/package",
          status_code=status.HTTP_200_OK,
@@ -394,20 +451,21 @@ async def get_app_by_hash(hash: str = Query(description="SHA256 hash of the app
 async def get_app_by_package(package: str = Query(description="package name of the app to download")) -> dict:
     """Download app metadata by its package name (e.g. _net.universia.uva_).
     """
-    app_data = db.get_app_by_package(package)
-    if not app_data:
+    app_json = await run_db("/get/app/package", db.get_app_json_by_package,
+                            package)
+    if not app_json:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="App not found"
         )
 
-    return app_data
+    return Response(content=app_json, media_type="application/json")
 
 @api.post("/post/app/package",
           status_code=status.HTTP_200_OK,
           summary="Request app upload by its package name",
-          response_model=Message,
-          response_description="Request status (busy, requested)",
+          response_model=JobRequest,
+          response_description="Request status (busy, requested) and job id",
           tags=["User"])
 async def upload_app_by_package(package: Package) -> dict:
     """Request app upload by its package name (e.g. _net.universia.uva_).
@@ -416,27 +474,9 @@ async def upload_app_by_package(package: Package) -> dict:
     * **busy**: request is not going to be performed.
     * **requested**: request is going to be performed.
     """
-    with live_upload_lock:
-        # Update list of threads
-        global live_upload_threads
-        live_upload_threads = [t for t in live_upload_threads if t.is_alive()]
-
-        response = {"detail": ""}
-
-        if len(live_upload_threads) == MAX_LIVE_UPLOAD_THREADS:
-            response["detail"] = "busy"
-        else:
-            thread = Thread(target=db.request_app_upload,
-                            args=[package.package])
-            thread.start()
-
-            live_upload_threads.append(thread)
-
-            response["detail"] = "requested"
+    return await enqueue_job("app_upload", package.package,
+                             max_queued=MAX_QUEUED_UPLOADS)
 
-        return response
-
-# TODO: admin functionality?
 @api.get("/post/app/package/status",
          tags=["User"])
 async def upload_app_by_package_status() -> dict:
@@ -445,12 +485,8 @@ async def upload_app_by_package_status() -> dict:
     Returns:
         dict: {n_threads}
     """
-    with live_upload_lock:
-        # Update list of threads
-        global live_upload_threads
-        live_upload_threads = [t for t in live_upload_threads if t.is_alive()]
-
-        return {"n_threads": len(live_upload_threads)}
+    return {"n_threads": await run_db("/jobs", jobs.count_active,
+                                      "app_upload")}
 
 
 ############################
@@ -494,7 +530,8 @@ async def upload_expert_score(
     response = {"detail": "requested"}
 
     # Check if app exists
-    app_data = db.get_app_by_hash(req.app_hash)
+    app_data = await run_db("/expert/post/score", db.get_app_by_hash,
+                            req.app_hash)
     if not app_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -525,7 +562,8 @@ async def upload_expert_score(
         }
     }
     try:
-        result = admin.upload_json(json.dumps(json_score))
+        result = await run_db("/expert/post/score", admin.upload_json,
+                              json.dumps(json_score))
         response = {"detail": "successful"}
 
         if result["row_count"] == 0:
@@ -559,13 +597,17 @@ async def upload_new_expert(
     response = {"detail": "requested"}
 
     auth = Authentication()
-    with credentials_lock:
-        api_key = auth.register_user(user_name)
+
+    def register_user() -> str:
+        with credentials_lock:
+            return auth.register_user(user_name)
+
+    api_key = await run_db("/admin/post/expert", register_user)
     if not api_key:
         response = {"detail": "User name not valid."}
         return response
 
-    auth.assign_role(user_name, "expert")
+    await run_db("/admin/post/expert", auth.assign_role, user_name, "expert")
 
     privacy_rank = {
         "PrivacyRank": {
@@ -578,7 +620,8 @@ async def upload_new_expert(
     }
 
     try:
-        result = admin.upload_json(json.dumps(privacy_rank))
+        result = await run_db("/admin/post/expert", admin.upload_json,
+                              json.dumps(privacy_rank))
         response = {"detail": "Api key: " + api_key}
     except Exception:
         response = {"detail": "unexpected error"}
@@ -591,8 +634,8 @@ async def upload_new_expert(
          dependencies=[Depends(api_key_admin_auth)],
          status_code=status.HTTP_200_OK,
          summary="Request update AOSP data",
-         response_model=Message,
-         response_description="Request status (busy, requested)",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
          tags=["Admin"])
 async def update_aosp_data() -> dict:
     """Request to update AOSP data. Only one update can run at a time.
@@ -601,18 +644,7 @@ async def update_aosp_data() -> dict:
     * **busy**: Request update AOSP data is already running.
     * **requested**: Request update AOSP data is going to be performed.
     """
-    response = {"detail": ""}
-
-    global aosp_thread
-    if aosp_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        aosp_thread = Thread(target=admin.update_aosp_data, name="Aosp")
-        aosp_thread.start()
-
-        response["detail"] = "requested"
-
-    return response
+    return await enqueue_job("aosp")
 
 @api.get("/admin/update/aosp/status",
          dependencies=[Depends(api_key_admin_auth)],
@@ -628,13 +660,7 @@ async def update_aosp_data_status() -> dict:
     * **busy**: Request update AOSP data is running.
     * **inactive**: Request update AOSP data is not running.
     """
-    response = {"detail": ""}
-    if aosp_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        response["detail"] = "inactive"
-
-    return response
+    return await job_status("aosp")
 
 @api.get("/admin/clean_cache",
          dependencies=[Depends(api_key_admin_auth)],
@@ -646,14 +672,26 @@ async def update_aosp_data_status() -> dict:
 async def clean_cache() -> dict:
     """Cleans cache. Be careful when to execute this can delete in use files.
     """
-    return admin.clean_cache()
+    return await run_db("/admin/clean_cache", admin.clean_cache)
+
+@api.get("/admin/cache/stats",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Get app response cache stats",
+         response_model=CacheStats,
+         response_description="Cache backend, size and hit/miss counters",
+         tags=["Admin"])
+async def get_cache_stats() -> dict:
+    """Returns usage counters of the app response cache.
+    """
+    return await run_db("/admin/cache/stats", admin.get_response_cache_stats)
 
 @api.get("/admin/update/app_candidates",
          dependencies=[Depends(api_key_admin_auth)],
          status_code=status.HTTP_200_OK,
          summary="Request update app candidates",
-         response_model=Message,
-         response_description="Request status (busy, requested)",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
          tags=["Admin"])
 async def update_app_candidates() -> dict:
     """Request to update app candidates (most important apps according to Play
@@ -663,19 +701,7 @@ async def update_app_candidates() -> dict:
     * **busy**: Request update app candidates is already running.
     * **requested**: Request update app candidates is going to be performed.
     """
-    response = {"detail": ""}
-
-    global app_candidates_thread
-    if app_candidates_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        app_candidates_thread = Thread(target=admin.get_app_candidates,
-                                       name="App candidates")
-        app_candidates_thread.start()
-
-        response["detail"] = "requested"
-
-    return response
+    return await enqueue_job("app_candidates")
 
 @api.get("/admin/update/app_candidates/status",
          dependencies=[Depends(api_key_admin_auth)],
@@ -691,20 +717,82 @@ async def update_app_candidates_status() -> dict:
     * **busy**: Request update app candidates is running.
     * **inactive**: Request update app candidates is not running.
     """
-    response = {"detail": ""}
-    if app_candidates_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        response["detail"] = "inactive"
+    return await job_status("app_candidates")
 
-    return response
+@api.get("/admin/update/androzoo_index",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Request build Androzoo index",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
+         tags=["Admin"])
+async def update_androzoo_index() -> dict:
+    """Request to build the Androzoo index from the Androzoo index file, so 
+    random apps are selected without reading the whole file. Only one build 
+    can run at a time.
+
+    Request status:
+    * **busy**: Request build Androzoo index is already running.
+    * **requested**: Request build Androzoo index is going to be performed.
+    """
+    return await enqueue_job("androzoo_index")
+
+@api.get("/admin/update/androzoo_index/status",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Get request build Androzoo index status",
+         response_model=Message,
+         response_description="Request status (busy, inactive)",
+         tags=["Admin"])
+async def update_androzoo_index_status() -> dict:
+    """Return status of Androzoo index build request.
+
+    Request status:
+    * **busy**: Request build Androzoo index is running.
+    * **inactive**: Request build Androzoo index is not running.
+    """
+    return await job_status("androzoo_index")
+
+@api.get("/admin/update/az_metadata_index",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Request load AndrozooGP metadata index",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
+         tags=["Admin"])
+async def update_az_metadata_index() -> dict:
+    """Request to load the AndrozooGP metadata of the apps in the warehouse 
+    from the AndrozooGP index file set on the config file. Only one load can 
+    run at a time.
+
+    Request status:
+    * **busy**: Request load AndrozooGP metadata index is already running.
+    * **requested**: Request load AndrozooGP metadata index is going to be performed.
+    """
+    return await enqueue_job("az_metadata_index")
+
+@api.get("/admin/update/az_metadata_index/status",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Get request load AndrozooGP metadata index status",
+         response_model=Message,
+         response_description="Request status (busy, inactive)",
+         tags=["Admin"])
+async def update_az_metadata_index_status() -> dict:
+    """Return status of AndrozooGP metadata index load request.
+
+    Request status:
+    * **busy**: Request load AndrozooGP metadata index is running.
+    * **inactive**: Request load AndrozooGP metadata index is not running.
+    """
+    return await job_status("az_metadata_index")
 
 @api.get("/admin/upload/n_random_apps",
          dependencies=[Depends(api_key_admin_auth)],
          status_code=status.HTTP_200_OK,
          summary="Request upload n random apps",
-         response_model=Message,
-         response_description="Request status (busy, requested)",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
          tags=["Admin"])
 async def get_n_random_apps(
     n_apps: int = Query(description="number of apps to upload", le=20)) -> dict:
@@ -714,20 +802,7 @@ async def get_n_random_apps(
     * **busy**: Request upload n random apps is already running.
     * **requested**: Request upload n random apps is going to be performed.
     """
-    response = {"detail": ""}
-
-    global random_n_download_thread
-    if random_n_download_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        random_n_download_thread = Thread(target=admin.download_random_apps,
-                                          name="Androzoo random download",
-                                          args=[n_apps])
-        random_n_download_thread.start()
-
-        response["detail"] = "requested"
-
-    return response
+    return await enqueue_job("n_random_apps", n_apps)
 
 @api.get("/admin/upload/n_random_apps/status",
          dependencies=[Depends(api_key_admin_auth)],
@@ -743,20 +818,14 @@ async def get_n_random_apps_status() -> dict:
     * **busy**: Request upload n random apps is running.
     * **inactive**: Request upload n random apps is not running.
     """
-    response = {"detail": ""}
-    if random_n_download_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        response["detail"] = "inactive"
-
-    return response
+    return await job_status("n_random_apps")
 
 @api.get("/admin/upload/n_random_app_candidates",
          dependencies=[Depends(api_key_admin_auth)],
          status_code=status.HTTP_200_OK,
          summary="Request upload n random apps from candidates",
-         response_model=Message,
-         response_description="Request status (busy, requested)",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
          tags=["Admin"])
 async def get_n_random_app_candidates(
     n_apps: int = Query(description="number of apps to upload", le=20)) -> dict:
@@ -766,21 +835,7 @@ async def get_n_random_app_candidates(
     * **busy**: Request upload n random apps from candidates is already running.
     * **requested**: Request upload n random apps from candidates is going to be performed.
     """
-    response = {"detail": ""}
-
-    global random_n_candidates_thread
-    if random_n_candidates_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        random_n_candidates_thread = Thread(
-            target=admin.download_random_apps_from_candidates,
-            name="Androzoo random download",
-            args=[n_apps])
-        random_n_candidates_thread.start()
-
-        response["detail"] = "requested"
-
-    return response
+    return await enqueue_job("n_random_app_candidates", n_apps)
 
 @api.get("/admin/upload/n_random_app_candidates/status",
          dependencies=[Depends(api_key_admin_auth)],
@@ -796,20 +851,14 @@ async def get_n_random_app_candidates_status() -> dict:
     * **busy**: Request upload n random apps from candidates is running.
     * **inactive**: Request upload n random apps from candidates is not running.
     """
-    response = {"detail": ""}
-    if random_n_candidates_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        response["detail"] = "inactive"
-
-    return response
+    return await job_status("n_random_app_candidates")
 
 @api.get("/admin/update/apply_metrics",
          dependencies=[Depends(api_key_admin_auth)],
          status_code=status.HTTP_200_OK,
          summary="Apply all metrics to stored apps request",
-         response_model=Message,
-         response_description="Request status (busy, requested)",
+         response_model=JobRequest,
+         response_description="Request status (busy, requested) and job id",
          tags=["Admin"])
 async def apply_metrics() -> dict:
     """Request to apply score metrics to all apps. Only one apply can run at a time.
@@ -818,20 +867,7 @@ async def apply_metrics() -> dict:
     * **busy**: Apply all metrics to stored apps request is already running.
     * **requested**: Apply all metrics to stored apps request is going to be performed.
     """
-    response = {"detail": ""}
-
-    global apply_metrics_thread
-    if apply_metrics_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        apply_metrics_thread = Thread(
-            target=admin.apply_all_metrics,
-            name="All metrics")
-        apply_metrics_thread.start()
-
-        response["detail"] = "requested"
-
-    return response
+    return await enqueue_job("apply_metrics")
 
 @api.get("/admin/update/apply_metrics/status",
          dependencies=[Depends(api_key_admin_auth)],
@@ -847,13 +883,68 @@ async def get_n_random_app_candidates_status() -> dict:
     * **busy**: Apply all metrics to stored apps request is running.
     * **inactive**: Apply all metrics to stored apps request is not running.
     """
-    response = {"detail": ""}
-    if apply_metrics_thread.is_alive():
-        response["detail"] = "busy"
-    else:
-        response["detail"] = "inactive"
+    return await job_status("apply_metrics")
 
-    return response
+@api.get("/admin/jobs",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Get last jobs",
+         response_model=list[Job],
+         response_description="Jobs, newest first",
+         tags=["Admin"])
+async def get_jobs(
+    name: t.Optional[str] = Query(default=None, description="name of the jobs"),
+    status_filter: t.Optional[str] = Query(default=None, alias="status",
+                                           description="status of the jobs (queued, running, done, failed, cancelled)"),
+    limit: int = Query(default=100, description="max number of jobs", le=1000)) -> list:
+    """Returns last jobs (uploads, metrics, AOSP updates...) with their status and progress.
+    """
+    return await run_db("/admin/jobs", jobs.get_jobs, name, status_filter,
+                        limit)
+
+@api.get("/admin/jobs/{job_id}",
+         dependencies=[Depends(api_key_admin_auth)],
+         status_code=status.HTTP_200_OK,
+         summary="Get a job",
+         response_model=Job,
+         response_description="Job with its logs",
+         responses={
+             404: {
+                 "model": Message,
+                 "description": "Job not found Error"
+             },
+         },
+         tags=["Admin"])
+async def get_job(job_id: int) -> dict:
+    """Returns a job with its status, progress and logs.
+    """
+    job = await run_db("/admin/jobs", jobs.get_job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return job
+
+@api.post("/admin/jobs/{job_id}/cancel",
+          dependencies=[Depends(api_key_admin_auth)],
+          status_code=status.HTTP_200_OK,
+          summary="Cancel a job",
+          response_model=Message,
+          response_description="Cancel status (cancelled, not cancellable)",
+          tags=["Admin"])
+async def cancel_job(job_id: int) -> dict:
+    """Cancels a queued or running job. Running jobs stop at their next checkpoint.
+
+    Request status:
+    * **cancelled**: Job cancelled or cancellation requested.
+    * **not cancellable**: Job not found or already finished.
+    """
+    if await run_db("/admin/jobs", jobs.cancel, job_id):
+        return {"detail": "cancelled"}
+
+    return {"detail": "not cancellable"}
 
 @api.post("/admin/delete/user",
           dependencies=[Depends(api_key_admin_auth)],
@@ -871,11 +962,12 @@ async def update_api_key(
     * **unexpected error**: user could not be deleted.
     """
     auth = Authentication()
-    roles = auth.get_roles_by_user(user_name)
+    roles = await run_db("/admin/delete/user", auth.get_roles_by_user,
+                         user_name)
     if "admin" in roles:
         return {"detail": "Could not delete admin user."}
 
-    result = auth.revoke_access(user_name)
+    result = await run_db("/admin/delete/user", auth.revoke_access, user_name)
     if not result:
         return {"detail": "unexpected error"}
 
@@ -887,5 +979,19 @@ async def update_api_key(
 
 api.include_router(v2.router)
 
+@api.on_event("startup")
+def start_jobs() -> None:
+    """Starts the job workers (and the jobs queued before a restart).
+    """
+    jobs.start()
+
+@api.on_event("shutdown")
+def stop_blocking_runner() -> None:
+    """Stops the job workers and waits for the blocking work in flight before 
+    stopping.
+    """
+    jobs.stop()
+    BlockingRunner.get_runner().shutdown()
+
 if __name__ == '__main__':
     uvicorn.run("api.main:api", port=8080, host='0.0.0.0', workers=1)
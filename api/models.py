@@ -9,6 +9,33 @@ from typing import Union
 class Message(BaseModel):
     detail: str
     
+class JobRequest(BaseModel):
+    detail: str
+    job_id: Union[int, None] = None
+    
+class JobLog(BaseModel):
+    timestamp: float
+    message: str
+    
+class Job(BaseModel):
+    id: int
+    name: str
+    args: list
+    status: str
+    progress: float
+    attempts: int
+    created: float
+    started: Union[float, None]
+    finished: Union[float, None]
+    error: Union[str, None]
+    logs: Union[list[JobLog], None] = None
+    
+class CacheStats(BaseModel):
+    backend: str
+    size: int
+    hits: int
+    misses: int
+    
 ################
 # POST SCHEMAS #
 ################
@@ -8,7 +8,8 @@ V2_PATHS = [
     "/get/app/versions",
     "/post/app/file",
     "/get/app/name",
-    "/get/app/detail/hash"
+    "/get/app/detail/hash",
+    "/get/apps"
 ]
 V2_description = """
 ## v2
@@ -19,5 +20,6 @@ You will be able to:
 * Upload app by its apk file.
 * Get app by its name.
 * Get app detail by its hash.
+* Get many apps by their hashes.
 
 """
\ No newline at end of file
@@ -3,6 +3,12 @@ from pydantic import BaseModel
 from typing import Union
 from ..models import *
 
+class HashList(BaseModel):
+    hash_list: list[str]
+
+class AppList(BaseModel):
+    app_list: list[AppElement]
+
 class AppVersion(BaseModel):
     app_hash: str
     version_name: str
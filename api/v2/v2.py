@@ -1,6 +1,12 @@
 from fastapi import APIRouter, Depends, status, Query, HTTPException, UploadFile, File
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from itertools import islice
+from typing import AsyncIterator
+import hashlib
+import json
 
 from api.documentation import *
 from .documentation import *
@@ -8,9 +14,12 @@ from .models import *
 from ..models import *
 
 from controller.controller import LoadController as db
+from api.concurrency import run_browser, run_db, run_upload
 
 
 ROOT_PATH = "/api"
+MAX_APPS_PAGE_SIZE = 500
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 
 router = APIRouter(
@@ -75,7 +84,8 @@ async def get_v2_openapi():
 async def get_all_app_versions_by_package(package: str = Query(description="package name of the app to download")) -> dict:
     """Download all app versions available by its package name (e.g. _net.universia.uva_).
     """
-    versions = db.get_app_versions_by_package(package)
+    versions = await run_db("/v2/get/app/versions",
+                            db.get_app_versions_by_package, package)
 
     if not versions:
         raise HTTPException(
@@ -86,6 +96,26 @@ async def get_all_app_versions_by_package(package: str = Query(description="pack
     return {"app_list": [{"app_hash": h, "version_name": v} for (h, v) in versions]}
 
 
+def _store_upload(file: UploadFile, file_path: str) -> str:
+    """Stores an uploaded apk by chunks, hashing while writing (apk is read
+    once). Blocking, run it off the event loop.
+
+    Args:
+        file (UploadFile): Uploaded apk.
+        file_path (str): Path to store the apk.
+
+    Returns:
+        str: SHA256 of the apk.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for chunk in iter(lambda: file.file.read(UPLOAD_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+            f.write(chunk)
+
+    return sha256.hexdigest()
+
+
 @router.post("/post/app/file",
          status_code=status.HTTP_200_OK,
          summary="Upload app by its apk file",
@@ -112,16 +142,16 @@ async def post_app_by_file(file: UploadFile) -> dict:
     file_path = "data/app_uploads/" + file.filename
 
     try:
-        contents = file.file.read()
-        with open(file_path, 'wb') as f:
-            f.write(contents)
+        app_hash = await run_upload("/v2/post/app/file", _store_upload, file,
+                                    file_path)
     except Exception:
         response["detail"] = "error"
         return response
     finally:
         file.file.close()
 
-    db.upload_app_by_file(file_path)
+    await run_upload("/v2/post/app/file", db.upload_app_by_file, file_path,
+                     app_hash)
 
     response["detail"] = "requested"
 
@@ -143,7 +173,7 @@ async def post_app_by_file(file: UploadFile) -> dict:
 async def get_app_by_name(name: str = Query(description="name of the app to download")) -> dict:
     """Download app metadata by its name (e.g. _Whatsapp_).
     """
-    app_data = db.get_app_by_name(name)
+    app_data = await run_browser("/v2/get/app/name", db.get_app_by_name, name)
     if not app_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -168,15 +198,64 @@ async def get_app_by_name(name: str = Query(description="name of the app to down
 async def get_app_by_hash(hash: str = Query(description="hash of the app to download")) -> dict:
     """Download app metadata detail by its hash (e.g. _00006852e356353884f5a4ab213f3739240bb0a526162265f923e2477e2907fd_).
     """
-    app_data = db.get_app_by_hash(hash)
-    if not app_data:
+    app_detail_json = await run_db("/v2/get/app/detail/hash",
+                                   db.get_app_detail_json_by_hash, hash)
+    if not app_detail_json:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="App not found"
         )
-    
-    app_detail_data = app_data["App"]
 
-    app_detail_data["az_metadata_list"] = db.get_app_detail_by_hash(hash)
+    return Response(content=app_detail_json, media_type="application/json")
 
-    return {"AppDetail": app_detail_data}
\ No newline at end of file
+
+@router.post("/get/apps",
+         status_code=status.HTTP_200_OK,
+         summary="Download many apps metadata by their hashes",
+         response_class=StreamingResponse,
+         responses={
+             200: {
+                 "model": AppList,
+                 "description": "Metadata of the apps found"
+             },
+             400: {
+                 "model": Message,
+                 "description": "Too many hashes Error"
+             },
+         },
+         tags=["v2"])
+async def get_apps_by_hashes(req: HashList) -> StreamingResponse:
+    """Download metadata of many apps by their hashes (at most 500 per request). Apps not found are skipped.
+    """
+    if len(req.hash_list) > MAX_APPS_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At most %d hashes per request" % MAX_APPS_PAGE_SIZE
+        )
+
+    return StreamingResponse(_stream_app_list(req.hash_list),
+                             media_type="application/json")
+
+
+async def _stream_app_list(hash_list: list[str]) -> AsyncIterator[str]:
+    """Serializes apps as they are downloaded as {"app_list": [...]}. Each 
+    batch is downloaded off the event loop.
+
+    Args:
+        hash_list (list[str]): Hashes of apps to download.
+
+    Yields:
+        AsyncIterator[str]: Next piece of the json document.
+    """
+    app_iter = db.get_apps_by_hashes(hash_list)
+    yield '{"app_list": ['
+    separator = ""
+    while True:
+        app_list = await run_db("/v2/get/apps", list,
+                                islice(app_iter, db.BULK_BATCH_SIZE))
+        if not app_list:
+            break
+        for app_data in app_list:
+            yield separator + json.dumps(jsonable_encoder(app_data))
+            separator = ", "
+    yield ']}'
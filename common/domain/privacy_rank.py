@@ -50,8 +50,47 @@ class PrivacyRank(Element):
             self.permission_ranks_list = permission_ranks_list
             self.app_scores_list = app_scores_list
             
+    @property
+    def permission_ranks_list(self) -> list[Rank]:
+        """Ranks of the permissions.
+
+        Returns:
+            list[Rank]: Ranks.
+        """
+        return self._permission_ranks_list
+    
+    @permission_ranks_list.setter
+    def permission_ranks_list(self, permission_ranks_list: list[Rank]) -> None:
+        """Sets the ranks of the permissions (invalidates the index).
+
+        Args:
+            permission_ranks_list (list[Rank]): Ranks.
+        """
+        self._permission_ranks_list = permission_ranks_list
+        self._permission_rank_index = None
+    
+    @property
+    def app_scores_list(self) -> list[Score]:
+        """Scores of the apps.
+
+        Returns:
+            list[Score]: Scores.
+        """
+        return self._app_scores_list
+    
+    @app_scores_list.setter
+    def app_scores_list(self, app_scores_list: list[Score]) -> None:
+        """Sets the scores of the apps (invalidates the index).
+
+        Args:
+            app_scores_list (list[Score]): Scores.
+        """
+        self._app_scores_list = app_scores_list
+        self._app_score_index = None
+            
     def find_permission_rank(self, permission_name: str) -> float:
-        """Finds permission rank.
+        """Finds permission rank. O(1), uses an index built on first call
+        (see invalidate_index()).
 
         Args:
             permission_name (str): Permission name of the rank we want.
@@ -59,11 +98,65 @@ class PrivacyRank(Element):
         Returns:
             float: Permission rank. None if it is not found.
         """
-        for p in self.permission_ranks_list:
-            if p.permission_name == permission_name:
-                return p.value
-            
-        return None
+        if self._permission_rank_index is None:
+            self._permission_rank_index = PrivacyRank._build_index(
+                self.permission_ranks_list, "permission_name")
+        
+        return self._permission_rank_index.get(permission_name)
+    
+    def find_app_score(self, app_hash: str) -> float:
+        """Finds app score. O(1), uses an index built on first call (see
+        invalidate_index()).
+
+        Args:
+            app_hash (str): Hash of the app of the score we want.
+
+        Returns:
+            float: App score. None if it is not found.
+        """
+        if self._app_score_index is None:
+            self._app_score_index = PrivacyRank._build_index(
+                self.app_scores_list, "app_hash")
+        
+        return self._app_score_index.get(app_hash)
+    
+    def get_app_hash_list(self) -> list[str]:
+        """Returns hash of the apps with a score.
+
+        Returns:
+            list[str]: List of hash (without repetitions).
+        """
+        if self._app_score_index is None:
+            self._app_score_index = PrivacyRank._build_index(
+                self.app_scores_list, "app_hash")
+        
+        return list(self._app_score_index)
+    
+    def invalidate_index(self) -> None:
+        """Discards the rank and score indexes. Call it after changing the
+        lists in place (appending, replacing or removing elements) or the 
+        value of a rank or score. Setting the lists invalidates them too.
+        """
+        self._permission_rank_index = None
+        self._app_score_index = None
+    
+    @staticmethod
+    def _build_index(element_list: list, key: str) -> dict:
+        """Builds the {key: value} index of a list of ranks or scores. The 
+        first element of each key is the one indexed.
+
+        Args:
+            element_list (list): Ranks or scores.
+            key (str): Attribute used as key.
+
+        Returns:
+            dict: Index.
+        """
+        d = {}
+        for element in element_list or []:
+            d.setdefault(getattr(element, key), element.value)
+        
+        return d
         
     def to_dict(self) -> dict:
         """Creates a dict representing the permission data.
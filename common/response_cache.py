@@ -0,0 +1,407 @@
+from common.util import Util as u
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock
+import json
+import os
+import re
+
+
+class _CacheBackend(ABC):
+    """Interface of a storage of serialized responses.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> str:
+        """Gets a response.
+
+        Args:
+            key (str): Key of the response.
+
+        Returns:
+            str: Serialized response. None if not stored.
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Stores a response.
+
+        Args:
+            key (str): Key of the response.
+            value (str): Serialized response.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Removes a response if stored.
+
+        Args:
+            key (str): Key of the response.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes all the responses.
+        """
+        pass
+
+    @abstractmethod
+    def size(self) -> int:
+        """Returns the number of responses stored.
+
+        Returns:
+            int: Number of responses.
+        """
+        pass
+
+
+class MemoryBackend(_CacheBackend):
+    """In-memory LRU storage.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Creates an empty storage.
+
+        Args:
+            max_size (int): Max responses stored, least recently used are
+                evicted.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> str:
+        """Gets a response.
+
+        Args:
+            key (str): Key of the response.
+
+        Returns:
+            str: Serialized response. None if not stored.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Stores a response.
+
+        Args:
+            key (str): Key of the response.
+            value (str): Serialized response.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Removes a response if stored.
+
+        Args:
+            key (str): Key of the response.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all the responses.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        """Returns the number of responses stored.
+
+        Returns:
+            int: Number of responses.
+        """
+        return len(self._entries)
+
+
+class DiskBackend(_CacheBackend):
+    """On-disk storage, one file per response. Survives restarts and is
+    shared by processes using the same directory. When it grows over
+    max_size the least recently used files are removed.
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        """Creates the storage directory if needed.
+
+        Args:
+            directory (str): Directory of the response files.
+            max_size (int): Max responses stored.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = Lock()
+        self._n_files = self.size() # Approximate, other processes write too
+
+    def _path(self, key: str) -> str:
+        """Returns the file of a key.
+
+        Args:
+            key (str): Key of the response.
+
+        Returns:
+            str: File path.
+        """
+        # Only word characters, keys may come from user input
+        return os.path.join(self.directory, re.sub(r"\W", "_", key) + ".json")
+
+    def get(self, key: str) -> str:
+        """Gets a response.
+
+        Args:
+            key (str): Key of the response.
+
+        Returns:
+            str: Serialized response. None if not stored.
+        """
+        try:
+            with open(self._path(key), 'r', encoding="utf8") as f:
+                value = f.read()
+            os.utime(self._path(key)) # Recently used
+        except OSError:
+            return None
+
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """Stores a response.
+
+        Args:
+            key (str): Key of the response.
+            value (str): Serialized response.
+        """
+        # Write and rename so readers never see a partial file
+        is_new = not os.path.exists(self._path(key))
+        tmp_path = self._path(key) + ".%d.tmp" % os.getpid()
+        with open(tmp_path, 'w', encoding="utf8") as f:
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._n_files += is_new
+            if self._n_files > self.max_size:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Removes the least recently used files until a tenth of max_size 
+        is free.
+        """
+        file_list = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    file_list.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass # Removed by other process
+        file_list.sort()
+
+        n_remove = len(file_list) - int(self.max_size * 0.9)
+        for (_, path) in file_list[:max(n_remove, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._n_files = len(file_list) - max(n_remove, 0)
+
+    def delete(self, key: str) -> None:
+        """Removes a response if stored.
+
+        Args:
+            key (str): Key of the response.
+        """
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Removes all the responses.
+        """
+        with self._lock:
+            for file in os.listdir(self.directory):
+                if file.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.directory, file))
+                    except OSError:
+                        pass
+            self._n_files = 0
+
+    def size(self) -> int:
+        """Returns the number of responses stored.
+
+        Returns:
+            int: Number of responses.
+        """
+        return len([f for f in os.listdir(self.directory)
+                    if f.endswith(".json")])
+
+
+class ResponseCache:
+    """Process-wide cache of serialized (JSON) responses of an app hash.
+    Backend is set on config file "RESPONSE_CACHE" section: {"backend":
+    "memory" | "disk", "max_size": int, "directory": str}.
+
+    Loaders invalidate the responses of a hash when they change its data,
+    and clear the whole cache when they add permission ranks (responses
+    include the ranks of each permission).
+    """
+
+    CONFIG_FILE = "data/config.json"
+    MAX_SIZE = 10000
+    DIRECTORY = "data/response_cache"
+    KINDS = ("app", "app_detail") # Responses stored for each hash
+
+    _cache = None
+    _lock = Lock() # Prevents threads to create more than one cache.
+
+    @staticmethod
+    def get_cache() -> "ResponseCache":
+        """Returns or creates the unique cache.
+
+        Returns:
+            ResponseCache: Cache.
+        """
+        with ResponseCache._lock:
+            if not ResponseCache._cache:
+                ResponseCache._cache = ResponseCache()
+
+        return ResponseCache._cache
+
+    def __init__(self) -> None:
+        """Creates a cache reading its backend from config file. Defaults to
+        an in-memory LRU.
+        """
+        backend = "memory"
+        max_size = ResponseCache.MAX_SIZE
+        directory = ResponseCache.DIRECTORY
+        try:
+            with open(ResponseCache.CONFIG_FILE, '+r',
+                      encoding="utf8") as config:
+                cache_config = json.loads(config.read())["RESPONSE_CACHE"]
+                backend = cache_config.get("backend", backend)
+                max_size = cache_config.get("max_size", max_size)
+                directory = cache_config.get("directory", directory)
+        except:
+            pass
+
+        if backend == "disk":
+            self.backend = DiskBackend(directory, max_size)
+        else:
+            self.backend = MemoryBackend(max_size)
+        self.stats_lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(kind: str, app_hash: str) -> str:
+        """Returns the key of a response.
+
+        Args:
+            kind (str): Kind of response (one of KINDS).
+            app_hash (str): Hash of the app.
+
+        Returns:
+            str: Key.
+        """
+        return kind + ":" + app_hash.lower()
+
+    def get(self, kind: str, app_hash: str) -> str:
+        """Gets a response of an app.
+
+        Args:
+            kind (str): Kind of response (one of KINDS).
+            app_hash (str): Hash of the app.
+
+        Returns:
+            str: JSON response. None if not cached.
+        """
+        value = self.backend.get(ResponseCache._key(kind, app_hash))
+        with self.stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return value
+
+    def set(self, kind: str, app_hash: str, data: dict) -> str:
+        """Stores a response of an app.
+
+        Args:
+            kind (str): Kind of response (one of KINDS).
+            app_hash (str): Hash of the app.
+            data (dict): Response.
+
+        Returns:
+            str: JSON response stored.
+        """
+        value = ResponseCache.dumps(data)
+        try:
+            self.backend.set(ResponseCache._key(kind, app_hash), value)
+        except OSError:
+            u.log_error("Cache fail.", "Could not cache %s response."
+                        % app_hash)
+
+        return value
+
+    def invalidate(self, app_hash: str) -> None:
+        """Removes all the responses of an app.
+
+        Args:
+            app_hash (str): Hash of the app.
+        """
+        for kind in ResponseCache.KINDS:
+            self.backend.delete(ResponseCache._key(kind, app_hash))
+
+    def clear(self) -> None:
+        """Removes all the responses (e.g. when permission ranks change).
+        """
+        self.backend.clear()
+
+    def get_stats(self) -> dict:
+        """Returns cache usage counters.
+
+        Returns:
+            dict: {backend, size, hits, misses}
+        """
+        with self.stats_lock:
+            (hits, misses) = (self.hits, self.misses)
+
+        return {"backend": type(self.backend).__name__,
+                "size": self.backend.size(),
+                "hits": hits,
+                "misses": misses}
+
+    @staticmethod
+    def dumps(data: dict) -> str:
+        """Serializes a response as the API does (dates in ISO format,
+        decimals as numbers).
+
+        Args:
+            data (dict): Response.
+
+        Returns:
+            str: JSON.
+        """
+        def default(o):
+            if isinstance(o, Decimal):
+                return float(o)
+            if hasattr(o, "isoformat"):
+                return o.isoformat()
+            return str(o)
+
+        return json.dumps(data, default=default)
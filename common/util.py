@@ -4,9 +4,14 @@ from os import system
 system('color')
 import random
 import string
+import hashlib
+from threading import local
 
 
 class Util:
+    
+    _log_sinks = local() # Extra log destination of each thread
+    
     @staticmethod
     def get_tag_containing(substring, string_iterator) -> str:
         """Finds first string in string_iterator that match regex ".*substring"
@@ -51,6 +56,24 @@ class Util:
         with open(filename, 'w', encoding="utf8") as f:
             f.write('\n'.join(list) + '\n')
     
+    @staticmethod
+    def get_file_sha256(filename: str, chunk_size: int = 1 << 20) -> str:
+        """Computes the SHA256 of a file reading it by chunks (memory use 
+        doesn't depend on file size).
+
+        Args:
+            filename (str): File path.
+            chunk_size (int, optional): Bytes read at once. Defaults to 1 MiB.
+
+        Returns:
+            str: Hex digest.
+        """
+        sha256 = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    
     @staticmethod
     def log_normal(msg: str) -> None:
         """Logs a normal priority message.
@@ -59,6 +82,7 @@ class Util:
             msg (str): Message.
         """
         print("[i] " + msg)
+        Util._sink("[i] " + msg)
     
     @staticmethod        
     def log_error(error: str, msg: str) -> None:
@@ -69,6 +93,7 @@ class Util:
             msg (str): Error description.
         """
         print(colored("[!] Error: " + error, "red") + " " + msg)
+        Util._sink("[!] Error: " + error + " " + msg)
     
     @staticmethod    
     def log_warning(warning: str, msg: str) -> None:
@@ -79,6 +104,7 @@ class Util:
             msg (str): Warning description.
         """
         print(colored("[i] Warning: " + warning, "yellow") + " " + msg)
+        Util._sink("[i] Warning: " + warning + " " + msg)
     
     @staticmethod    
     def log_result(msg: str) -> None:
@@ -88,6 +114,40 @@ class Util:
             msg (str): Message.
         """
         print(colored("[+] " + msg, "green"))
+        Util._sink("[+] " + msg)
+    
+    @staticmethod
+    def set_log_sink(sink) -> None:
+        """Sets a function that also receives every message logged by the 
+        current thread (e.g. to store the logs of a job).
+
+        Args:
+            sink (Callable[[str], None]): Function receiving the messages. 
+                None to remove it.
+        """
+        Util._log_sinks.sink = sink
+    
+    @staticmethod
+    def get_log_sink():
+        """Returns the log sink of the current thread (e.g. to set it on 
+        helper threads).
+
+        Returns:
+            Callable[[str], None]: Function receiving the messages. None if
+                not set.
+        """
+        return getattr(Util._log_sinks, "sink", None)
+    
+    @staticmethod
+    def _sink(msg: str) -> None:
+        """Sends a logged message to the sink of the current thread if any.
+
+        Args:
+            msg (str): Message (without colors).
+        """
+        sink = getattr(Util._log_sinks, "sink", None)
+        if sink:
+            sink(msg)
         
     @staticmethod
     def get_new_api_key(length: int = 20) -> str:
@@ -1,12 +1,23 @@
 from etl.extract import * # Important first of all due to androzoo
 from etl.transform import *
 from etl.load import *
+from etl.load.mysql_connector import MysqlConnector
 
+from controller.job_queue import JobQueue
+from controller.ingest_pipeline import IngestPipeline
+
+from common.domain.app import App
 from common.domain.extraction_metadata import ExtractionMetadata
+from common.response_cache import ResponseCache
 from common.domain.score import Score
 from common.util import Util as u
 
 from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from threading import Event, Lock, Semaphore, Thread
+from queue import Queue
+from typing import Iterator
 from time import time
 from datetime import datetime as date
 import os
@@ -23,6 +34,12 @@ class LoadController:
         apkmonk.Apkmonk,
         apkfollow.Apkfollow
     ]
+    BULK_BATCH_SIZE = 100
+    ACQUISITION_TIMEOUT = 900 # Max seconds to find and download an app
+    
+    # A race takes a browser session per live source, so concurrent uploads
+    # race one at a time instead of queueing on the browser pool
+    _acquisition_races = Semaphore(1)
     
     @staticmethod    
     def get_app_by_hash(hash: str) -> dict:
@@ -42,6 +59,53 @@ class LoadController:
         
         return None
     
+    @staticmethod
+    def get_app_json_by_hash(hash: str) -> str:
+        """Downloads an app data by its hash serialized as JSON. Responses are
+        cached until the app data changes.
+
+        Args:
+            hash (str): Hash of app to download.
+
+        Returns:
+            str: JSON data of the app. None if not found.
+        """
+        cache = ResponseCache.get_cache()
+        app_json = cache.get("app", hash)
+        if app_json is not None:
+            return app_json
+        
+        app = app_loader.AppLoader().download_app(hash)
+        
+        if app:
+            u.log_result("%s app downloaded." % app.package)
+            return cache.set("app", hash, app.to_dict())
+        
+        return None
+    
+    @staticmethod
+    def get_apps_by_hashes(hash_list: list[str]) -> Iterator[dict]:
+        """Downloads many apps data by their hashes. Apps are downloaded in
+        batches of BULK_BATCH_SIZE, each one with a fixed number of queries.
+
+        Args:
+            hash_list (list[str]): Hashes of apps to download.
+
+        Yields:
+            Iterator[dict]: Data of each app found.
+        """
+        loader = app_loader.AppLoader()
+        hash_list = list(dict.fromkeys(hash_list)) # Remove duplicates
+        
+        c = 0
+        for i in range(0, len(hash_list), LoadController.BULK_BATCH_SIZE):
+            batch = hash_list[i:i + LoadController.BULK_BATCH_SIZE]
+            for app in loader.download_apps(batch).values():
+                c += 1
+                yield app.to_dict()
+        
+        u.log_result("%d apps downloaded." % c)
+    
     @staticmethod    
     def get_app_detail_by_hash(hash: str) -> dict:
         """Downloads an app detail data by its hash.
@@ -63,6 +127,48 @@ class LoadController:
         
         return None
     
+    @staticmethod
+    def get_app_detail_json_by_hash(hash: str) -> str:
+        """Downloads an app data with its detail by its hash serialized as 
+        JSON. Responses are cached until the app data changes.
+
+        Args:
+            hash (str): Hash of app to download.
+
+        Returns:
+            str: JSON data of the app detail. None if app not found.
+        """
+        cache = ResponseCache.get_cache()
+        app_detail_json = cache.get("app_detail", hash)
+        if app_detail_json is not None:
+            return app_detail_json
+        
+        app_data = LoadController.get_app_by_hash(hash)
+        if not app_data:
+            return None
+        
+        app_detail_data = app_data["App"]
+        app_detail_data["az_metadata_list"] = (
+            LoadController.get_app_detail_by_hash(hash))
+        
+        return cache.set("app_detail", hash, {"AppDetail": app_detail_data})
+    
+    @staticmethod    
+    def get_app_json_by_package(package: str) -> str:
+        """Downloads an app data by its package like serialized as JSON.
+
+        Args:
+            package (str): Package of app to download.
+
+        Returns:
+            str: JSON data of the app. None if not found.
+        """
+        hash = app_loader.AppLoader().download_last_app_hash(package)
+        if not hash:
+            return None
+        
+        return LoadController.get_app_json_by_hash(hash)
+    
     @staticmethod    
     def get_app_by_package(package: str) -> dict:
         """Downloads an app data by its package like.
@@ -108,43 +214,122 @@ class LoadController:
         if len(package) < 1:
             return
         
-        apk_dir = None
-        for source_obect in LoadController.LIVE_SOURCES:
-            source: live_source.LiveSource = source_obect()
-            
-            if source.is_alive():
-                # Find app in source
-                package_found = source.find_app(package)
-                if not package_found:
-                    continue
-                
-                # Download app from source               
-                apk_dir = source.download_app(package_found)
-                if apk_dir:
-                    break
-                
-        if not apk_dir:
+        result = LoadController._acquire_app(package)
+        if not result:
             return
+        (apk_dir, source_name) = result
 
         # Extract data from app and load to warehouse
         extraction_metadata = ExtractionMetadata(
-            source.get_name(),
+            source_name,
             "web scraping",
             date.fromtimestamp(time()).strftime('%Y-%m-%d %H:%M:%S')
         )
         _CommonController.load_app(apk_dir, extraction_metadata)
         
         # Apply metrics
-        AdminController.apply_all_metrics()
+        AdminController.request_apply_all_metrics()
                 
         return
     
     @staticmethod
-    def upload_app_by_file(apk_dir: str) -> None:
+    def _acquire_app(package: str) -> tuple[str, str]:
+        """Races all live sources for an app. Liveness checks and searches run
+        concurrently on every source, the first source that finds the app 
+        downloads it (next ones only if its download fails) and the rest are
+        cancelled. One race runs at a time.
+
+        Args:
+            package (str): App package.
+
+        Returns:
+            tuple[str, str]: (apk_dir, source name). None if no source could 
+                download the app in ACQUISITION_TIMEOUT seconds.
+        """
+        with LoadController._acquisition_races:
+            done = Event()
+            download_lock = Lock()
+            executor = ThreadPoolExecutor(
+                max_workers=len(LoadController.LIVE_SOURCES),
+                thread_name_prefix="Live source")
+            future_list = [
+                executor.submit(LoadController._acquire_app_from_source, 
+                                source_class, package, done, download_lock)
+                for source_class in LoadController.LIVE_SOURCES
+            ]
+            
+            try:
+                for future in as_completed(
+                        future_list, LoadController.ACQUISITION_TIMEOUT):
+                    result = future.result()
+                    if result:
+                        return result
+            except FuturesTimeoutError:
+                u.log_error("Timeout.", "%s could not be acquired from live "
+                            % package + "sources in time.")
+            finally:
+                # Cancel the rest of sources (they stop on their next step)
+                done.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        return None
+    
+    @staticmethod
+    def _acquire_app_from_source(source_class: type, package: str, 
+                                 done: Event, 
+                                 download_lock: Lock) -> tuple[str, str]:
+        """Tries to find and download an app from a live source. Stops as soon
+        as other source acquired the app.
+
+        Args:
+            source_class (type): Class of the live source.
+            package (str): App package.
+            done (Event): Set when the app was acquired or the race ended.
+            download_lock (Lock): Only one source downloads at a time.
+
+        Returns:
+            tuple[str, str]: (apk_dir, source name). None if not acquired.
+        """
+        source: live_source.LiveSource = None
+        try:
+            # Don't wait for a browser session if the race already ended
+            if done.is_set():
+                return None
+            source = source_class()
+            if done.is_set() or not source.is_alive():
+                return None
+            
+            # Find app in source
+            package_found = source.find_app(package)
+            if not package_found:
+                return None
+            
+            # Download app from source (if no other source did it)
+            with download_lock:
+                if done.is_set():
+                    return None
+                
+                apk_dir = source.download_app(package_found)
+                if apk_dir:
+                    done.set()
+                    return (apk_dir, source.get_name())
+        except Exception as e:
+            u.log_warning("Source fail.", "%s: %s" 
+                          % (source_class.__name__, e))
+        finally:
+            if source:
+                source.close()
+        
+        return None
+    
+    @staticmethod
+    def upload_app_by_file(apk_dir: str, app_hash: str = None) -> None:
         """Try to upload app by file, parse it and upload it to database.
 
         Args:
             apk_dir (str): App file path.
+            app_hash (str, optional): SHA256 of the file if already computed.
+                Defaults to None.
         """        
         if not apk_dir:
             return
@@ -155,10 +340,11 @@ class LoadController:
             "API Request",
             date.fromtimestamp(time()).strftime('%Y-%m-%d %H:%M:%S')
         )
-        _CommonController.load_app(apk_dir, extraction_metadata)
+        _CommonController.load_app(apk_dir, extraction_metadata, 
+                                   app_hash=app_hash)
         
         # Apply metrics
-        AdminController.apply_all_metrics()
+        AdminController.request_apply_all_metrics()
                 
         return
     
@@ -197,49 +383,79 @@ class AdminController:
             apply_metric.PaperMetric("TUDelft intrusiveness", 
                                     "data/paper2.csv")
         ]
+    METRIC_BATCH_SIZE = 500
+    AZ_METADATA_BATCH_SIZE = 1000
+    AZ_METADATA_QUEUE_SIZE = 4
+    
+    _metrics_lock = Lock() # METRICS are shared, one run at a time
+    _metrics_pending = Event() # Apps loaded since the last run started
+    
+    @staticmethod
+    def request_apply_all_metrics() -> None:
+        """Requests to apply all metrics after loading apps. Enqueues the 
+        unique apply_metrics job, if it is already running it runs again when
+        finished. Applies them on this thread if the job is not registered
+        (out of the API).
+        """
+        AdminController._metrics_pending.set()
+        queue = JobQueue.get_queue()
+        if "apply_metrics" in queue.jobs:
+            queue.enqueue("apply_metrics")
+        else:
+            AdminController.apply_all_metrics()
     
     @staticmethod
     def apply_all_metrics() -> None:
         """Apply all stored metrics to all stored apps. Prevents 
-        recalculations.
+        recalculations: only (app, metric) pairs without score are computed,
+        in batches of METRIC_BATCH_SIZE apps. Runs again while apps are 
+        requested to be scored meanwhile.
+        """
+        with AdminController._metrics_lock:
+            while True:
+                AdminController._metrics_pending.clear()
+                AdminController._apply_all_metrics()
+                if not AdminController._metrics_pending.is_set():
+                    break
+    
+    @staticmethod
+    def _apply_all_metrics() -> None:
+        """Apply all stored metrics to the stored apps without score.
         """
         u.log_normal("Applying all metrics...")
         
-        # Download all dynamic metrics
+        # Download all dynamic metrics (ranks only, scores are not needed)
         p_r_loader = privacy_rank_loader.PrivacyRankLoader()
         for metric in AdminController.METRICS:
-            req = p_r_loader.download_privacy_rank(metric.get_name())
+            req = p_r_loader.download_privacy_rank(metric.get_name(), 
+                                                   with_scores=False)
             metric.set_privacy_rank(req["PrivacyRank"])
         
         # Apply all metrics
         c = 0
         s_loader = score_loader.ScoreLoader()
         a_loader = app_loader.AppLoader()
-        app_hash_list = app_loader.AppLoader().download_app_hash_list()
+        batch_size = AdminController.METRIC_BATCH_SIZE
         
-        for metric in AdminController.METRICS:
-            done = metric.get_app_hash_list()
-            remaining = [app for app in app_hash_list if app not in done]
-            
-            if metric.get_app_package_candidates():
-                app_candidates = []
-                for package in metric.get_app_package_candidates():
-                    l = a_loader.download_app_hash_list_by_package(package)
-                    app_candidates = app_candidates + l
-
-                remaining = [app for app in remaining if app in app_candidates]
+        for (m, metric) in enumerate(AdminController.METRICS):
+            remaining = a_loader.download_unscored_app_hash_list(
+                metric.get_name(), metric.get_app_package_candidates())
             
             u.log_normal(str(len(remaining)) + " apps remaining with " 
                          + metric.get_name() + " metric.")
             
-            for app_hash in remaining:
-                app = a_loader.download_app(app_hash)
-                score_value = metric.get_score(app)
+            for i in range(0, len(remaining), batch_size):
+                JobQueue.check_cancelled()
+                JobQueue.set_progress((m + i / len(remaining)) 
+                                      / len(AdminController.METRICS))
+                app_list = list(a_loader.download_apps(
+                    remaining[i:i + batch_size]).values())
+                score_value_list = metric.get_scores(app_list)
                 
-                score = Score(score_value, app_hash, metric.get_name())
-                s_loader.load_score(score)
-                    
-                c += 1
+                score_list = [Score(value, app.hash, metric.get_name()) 
+                              for (app, value) 
+                              in zip(app_list, score_value_list)]
+                c += s_loader.load_scores(score_list)
         
         u.log_result("%d scores loaded." % c)
     
@@ -277,29 +493,23 @@ class AdminController:
         hash_list = androzoo.Androzoo().get_n_random_hash(n_apps)
         
         # Do not download data on database
-        database_hash = app_loader.AppLoader().download_app_hash_list()
-        hash_list = [h for h in hash_list if h.lower() not in database_hash]
+        hash_list = known_hash_index.KnownHashIndex.get_index(
+            ).filter_unknown(hash_list)
         
-        # Download apps
-        androzoo.Androzoo().download_apps(hash_list)
-        
-        # Extract data from apps
+        # Extract data from apps as they are downloaded
         extraction_metadata = ExtractionMetadata(
             androzoo.Androzoo().get_name(),
             "api",
             date.fromtimestamp(time()).strftime('%Y-%m-%d %H:%M:%S')
         )
         
-        opt = webdriver.FirefoxOptions()
-        opt.add_argument("--headless")
-        driver = webdriver.Firefox(options=opt)
-        for apk_path in os.listdir("data/androzoo_downloads/"):
-            apk_path = "data/androzoo_downloads/" + apk_path
-            _CommonController.load_app(apk_path, extraction_metadata, driver)
-        driver.close()
+        _CommonController.seed_category_cache()
+        IngestPipeline(_CommonController.load_extracted_app).run(
+            androzoo.Androzoo().download_apps(hash_list), extraction_metadata,
+            len(hash_list))
         
         # Apply metrics
-        AdminController.apply_all_metrics()
+        AdminController.request_apply_all_metrics()
         
         return
     
@@ -317,29 +527,23 @@ class AdminController:
         )
         
         # Do not download data on database
-        database_hash = app_loader.AppLoader().download_app_hash_list()
-        hash_list = [h for h in hash_list if h.lower() not in database_hash]
-        
-        # Download apps
-        androzoo.Androzoo().download_apps(hash_list)
+        hash_list = known_hash_index.KnownHashIndex.get_index(
+            ).filter_unknown(hash_list)
         
-        # Extract data from apps
+        # Extract data from apps as they are downloaded
         extraction_metadata = ExtractionMetadata(
             androzoo.Androzoo().get_name(),
             "api",
             date.fromtimestamp(time()).strftime('%Y-%m-%d %H:%M:%S')
         )
         
-        opt = webdriver.FirefoxOptions()
-        opt.add_argument("--headless")
-        driver = webdriver.Firefox(options=opt)
-        for apk_path in os.listdir("data/androzoo_downloads/"):
-            apk_path = "data/androzoo_downloads/" + apk_path
-            _CommonController.load_app(apk_path, extraction_metadata, driver)
-        driver.close()
+        _CommonController.seed_category_cache()
+        IngestPipeline(_CommonController.load_extracted_app).run(
+            androzoo.Androzoo().download_apps(hash_list), extraction_metadata,
+            len(hash_list))
         
         # Apply metrics
-        AdminController.apply_all_metrics()
+        AdminController.request_apply_all_metrics()
         
         return
     
@@ -351,6 +555,78 @@ class AdminController:
         
         return
     
+    @staticmethod
+    def build_androzoo_index() -> None:
+        """Builds the Androzoo index used to select random apps.
+        """
+        androzoo.Androzoo().build_index()
+        
+        return
+    
+    @staticmethod
+    def load_az_metadata_index(index: str = None, n_lines: int = None
+                               ) -> int:
+        """Loads the AzMetadata of the apps on the warehouse from an
+        AndrozooGP metadata index. The index is parsed while the previous
+        batches are inserted (AZ_METADATA_QUEUE_SIZE batches in memory).
+
+        Args:
+            index (str, optional): Path of the index file (.jsonl.gz).
+                Defaults to GP_INDEX_FILE of the config file.
+            n_lines (int, optional): Number of records in index. Defaults to
+                GP_INDEX_LINES of the config file.
+
+        Returns:
+            int: Number of AzMetadata rows added.
+        """
+        source = androzoo.AndrozooGP()
+        index = index or source.GP_INDEX_FILE
+        n_lines = n_lines or source.GP_INDEX_LINES
+        if not index:
+            u.log_error("File not found.", "AndrozooGP index not found.")
+            return 0
+
+        app_list = app_loader.AppLoader().download_app_version_dict()
+        batch_queue = Queue(AdminController.AZ_METADATA_QUEUE_SIZE)
+        result = {"row_count": 0, "error": None}
+
+        def load_stage() -> None:
+            loader = az_metadata_loader.AzMetadataLoader()
+            while (batch := batch_queue.get()) is not None:
+                try:
+                    result["row_count"] += loader.load_az_metadata_list(batch)
+                except Exception as e:
+                    result["error"] = e
+                    break
+            # Unblock the producer if the load failed
+            while batch is not None:
+                batch = batch_queue.get()
+
+        loader_thread = Thread(target=load_stage, name="az-metadata-load")
+        loader_thread.start()
+        batch = []
+        try:
+            for metadata_list in source.bulk_load_from_index(
+                    index, n_lines, app_list):
+                JobQueue.check_cancelled()
+                if result["error"]:
+                    break
+                batch += metadata_list
+                if len(batch) >= AdminController.AZ_METADATA_BATCH_SIZE:
+                    batch_queue.put(batch)
+                    batch = []
+            if batch and not result["error"]:
+                batch_queue.put(batch)
+        finally:
+            batch_queue.put(None)
+            loader_thread.join()
+
+        if result["error"]:
+            raise result["error"]
+        u.log_result("%d AzMetadata loaded." % result["row_count"])
+
+        return result["row_count"]
+
     @staticmethod
     def update_aosp_data() -> None:
         """Updates all Android permission and groups data from warehouse.
@@ -383,47 +659,108 @@ class AdminController:
         files = 0
         for path in os.listdir("data/"):
             if path.split("_")[-1] == "downloads":
-                for file in os.listdir("data/" + path):
-                    files += 1
-                    os.remove("data/" + path + "/" +  file)
+                # Browser sessions download to their own sub directory
+                for (dir_path, _, file_list) in os.walk("data/" + path):
+                    for file in file_list:
+                        files += 1
+                        os.remove(os.path.join(dir_path, file))
                     
         return {"detail": str(files) + " files deleted"}
     
+    @staticmethod
+    def get_response_cache_stats() -> dict:
+        """Returns usage counters of the app response cache.
+
+        Returns:
+            dict: {backend, size, hits, misses}
+        """
+        return ResponseCache.get_cache().get_stats()
+    
     
 class _CommonController:
     """Common controller functionalities.
     """
     
+    @staticmethod
+    def seed_category_cache() -> None:
+        """Adds the categories of the apps on warehouse to the category cache
+        (once per process), so new versions of known apps don't go to Google
+        Play Store.
+        """
+        cache = category_cache.CategoryCache.get_cache()
+        if cache.seeded:
+            return
+        
+        try:
+            cache.seed(app_loader.AppLoader().download_app_category_dict())
+        except Exception:
+            u.log_warning("Cache fail.", "Category cache not seeded.")
+    
     @staticmethod
     def load_app(apk_path: str, 
                   extraction_metadata: ExtractionMetadata,
-                  driver: webdriver.Firefox = None) -> None:
-        """Load app in apk_path to warehouse and delete it.
+                  driver: webdriver.Firefox = None,
+                  app_hash: str = None) -> None:
+        """Load app in apk_path to warehouse and delete it. Apps already on
+        warehouse are not parsed, only their extraction metadata is loaded.
 
         Args:
             apk_path (str): Path to app apk.
             extraction_metadata (ExtractionMetadata): Metadata of the 
                 extraction.
             driver (webdriver.Firefox, optional): Browser. Defaults to None.
+            app_hash (str, optional): SHA256 of the apk if already computed.
+                Defaults to None.
         """
+        # Do not parse apps on database, only record this extraction
+        app_hash = app_hash or u.get_file_sha256(apk_path)
+        if known_hash_index.KnownHashIndex.get_index().contains(app_hash):
+            u.log_warning("Duplicated.", "%s already on warehouse." 
+                          % app_hash)
+            app_loader.AppLoader().load_extraction_metadata(
+                app_hash, extraction_metadata)
+            os.remove(apk_path)
+            return
+        
+        _CommonController.seed_category_cache()
+        
         # Extract data from apk
         app = apk_data_extractor.ApkDataExtractor(
             apk_path, 
-            extraction_metadata
+            extraction_metadata,
+            app_hash=app_hash
         ).get_app(driver)
-                
-        # Upload app to warehouse
-        app_loader.AppLoader().load_app(app)
         
-        # Delete apk file
-        if os.path.exists(apk_path):
-            os.remove(apk_path)
+        _CommonController.load_extracted_app(app, apk_path)
+    
+    @staticmethod
+    def load_extracted_app(app: App, apk_path: str) -> None:
+        """Load an app already extracted to warehouse and delete its apk.
 
+        Args:
+            app (App): App extracted.
+            apk_path (str): Path to app apk.
+        """
         # AndrozooGP call
         az_metadata_list = androzoo.AndrozooGP().get_az_metadata(
             app.package, app.version_code, app.hash)
-        if az_metadata_list:
-            for az_metadata in az_metadata_list:
-                az_metadata_loader.AzMetadataLoader().load_az_metadata(az_metadata)
-                
-        u.log_result("%s app loaded." % app.package)
\ No newline at end of file
+        
+        # Upload app and its AzMetadata to warehouse (all or nothing)
+        loaded = True
+        try:
+            with MysqlConnector().transaction():
+                app_loader.AppLoader().load_app(app)
+                for az_metadata in az_metadata_list or []:
+                    az_metadata_loader.AzMetadataLoader().load_az_metadata(
+                        az_metadata)
+        except Exception:
+            u.log_error("Upload fail.", "%s app not loaded, changes rolled "
+                        % app.package + "back.")
+            loaded = False
+        
+        # Delete apk file
+        if os.path.exists(apk_path):
+            os.remove(apk_path)
+        
+        if loaded:
+            u.log_result("%s app loaded." % app.package)
\ No newline at end of file
@@ -0,0 +1,280 @@
+from etl.extract.play_store import CategoryFinder
+from etl.extract.androzoo import AndrozooGP
+from etl.transform.apk_data_extractor import ApkDataExtractor
+
+from controller.job_queue import JobQueue
+
+from common.domain.app import App
+from common.domain.extraction_metadata import ExtractionMetadata
+from common.util import Util as u
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from queue import Queue, Full, Empty
+from threading import Event, Thread
+from typing import Iterable
+import multiprocessing
+import json
+import os
+
+
+def _parse_apk(apk_path: str, metadata: ExtractionMetadata) -> App:
+    """Parses an apk on a worker process (category is not found here).
+
+    Args:
+        apk_path (str): Location of the .apk.
+        metadata (ExtractionMetadata): Metadata of the extraction.
+
+    Returns:
+        App: App extracted.
+    """
+    return ApkDataExtractor(apk_path, metadata).get_app(find_category=False)
+
+
+class IngestPipeline:
+    """Extracts and loads apks in three concurrent stages joined by bounded
+    queues:
+
+    1. parse: androguard parsing on a process pool (CPU bound).
+    2. category: Google Play Store lookups and AndrozooGP metadata prefetch
+       on threads (network bound).
+    3. load: load function on the calling thread (job progress and
+       cancellation are checked here).
+
+    Workers can be set on config file "INGEST_PIPELINE" section:
+    {"parse_workers": int, "category_workers": int, "queue_size": int}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    PARSE_WORKERS = os.cpu_count() or 1
+    CATEGORY_WORKERS = 4
+    QUEUE_SIZE = 16
+    POLL_TIME = 1
+
+    def __init__(self, load_function) -> None:
+        """Creates a pipeline.
+
+        Args:
+            load_function (Callable[[App, str], None]): Loads an app, receives
+                the app and its apk path.
+        """
+        self.load_function = load_function
+        self.parse_workers = IngestPipeline.PARSE_WORKERS
+        self.category_workers = IngestPipeline.CATEGORY_WORKERS
+        self.queue_size = IngestPipeline.QUEUE_SIZE
+        try:
+            with open(IngestPipeline.CONFIG_FILE, '+r',
+                      encoding="utf8") as config:
+                pipeline_config = json.loads(config.read())["INGEST_PIPELINE"]
+                self.parse_workers = pipeline_config.get("parse_workers",
+                                                         self.parse_workers)
+                self.category_workers = pipeline_config.get(
+                    "category_workers", self.category_workers)
+                self.queue_size = pipeline_config.get("queue_size",
+                                                      self.queue_size)
+        except:
+            pass
+
+        self.stop = Event()
+        self.az_metadata_source = None
+
+    def run(self, apk_path_list: Iterable[str], metadata: ExtractionMetadata,
+            n_apks: int = None) -> int:
+        """Extracts and loads apks. Apks that can't be parsed are skipped.
+
+        Args:
+            apk_path_list (Iterable[str]): Location of each .apk. May be a
+                generator (e.g. apks yielded as they are downloaded).
+            metadata (ExtractionMetadata): Metadata of the extraction.
+            n_apks (int, optional): Number of apks expected, for the job
+                progress. Defaults to len(apk_path_list).
+
+        Returns:
+            int: Number of apps passed to the load function.
+        """
+        if n_apks is None:
+            n_apks = len(apk_path_list)
+        if n_apks == 0:
+            return 0
+
+        self.stop.clear()
+        self.az_metadata_source = AndrozooGP()
+        source_queue = Queue(self.queue_size)   # apk_path | None
+        category_queue = Queue(self.queue_size) # (app, apk_path) | None
+        load_queue = Queue(self.queue_size)     # (app, apk_path) | None
+        log_sink = u.get_log_sink()
+
+        threads = [Thread(target=self._source_stage, name="ingest-source",
+                          args=(apk_path_list, source_queue, log_sink)),
+                   Thread(target=self._parse_stage, name="ingest-parse",
+                          args=(source_queue, metadata, category_queue,
+                                log_sink))]
+        threads += [Thread(target=self._category_stage, name="ingest-category",
+                           args=(category_queue, load_queue, log_sink))
+                    for _ in range(self.category_workers)]
+        for thread in threads:
+            thread.start()
+
+        # Load stage
+        n_loaded = 0
+        n_finished_workers = 0
+        try:
+            while n_finished_workers < self.category_workers:
+                JobQueue.check_cancelled()
+                try:
+                    item = load_queue.get(timeout=IngestPipeline.POLL_TIME)
+                except Empty:
+                    continue
+                if item is None:
+                    n_finished_workers += 1
+                    continue
+
+                (app, apk_path) = item
+                self.load_function(app, apk_path)
+                n_loaded += 1
+                JobQueue.set_progress(n_loaded / n_apks)
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+        return n_loaded
+
+    def _put(self, queue: Queue, item) -> bool:
+        """Puts an item on a bounded queue, waiting while it is full.
+
+        Args:
+            queue (Queue): Queue.
+            item (Any): Item.
+
+        Returns:
+            bool: False if the pipeline was stopped before.
+        """
+        while not self.stop.is_set():
+            try:
+                queue.put(item, timeout=IngestPipeline.POLL_TIME)
+                return True
+            except Full:
+                pass
+
+        return False
+
+    def _source_stage(self, apk_path_list: Iterable[str], 
+                      source_queue: Queue, log_sink) -> None:
+        """Reads the apks to parse. Runs apart from the parse stage because
+        the source may block (e.g. waiting for downloads).
+
+        Args:
+            apk_path_list (Iterable[str]): Location of each .apk.
+            source_queue (Queue): Output queue.
+            log_sink (Callable[[str], None]): Log sink of the caller thread.
+        """
+        u.set_log_sink(log_sink)
+        apk_path_iter = iter(apk_path_list)
+        try:
+            for apk_path in apk_path_iter:
+                if not self._put(source_queue, apk_path):
+                    break
+        except Exception as e:
+            u.log_error("Source.", "Could not get more apks (%s)." % e)
+        finally:
+            # Stop a generator source (e.g. pending downloads)
+            if hasattr(apk_path_iter, "close"):
+                apk_path_iter.close()
+            self._put(source_queue, None)
+
+    def _parse_stage(self, source_queue: Queue, metadata: ExtractionMetadata,
+                     category_queue: Queue, log_sink) -> None:
+        """Parses apks on the process pool, keeping at most queue_size apks
+        in flight.
+
+        Args:
+            source_queue (Queue): Input queue.
+            metadata (ExtractionMetadata): Metadata of the extraction.
+            category_queue (Queue): Output queue.
+            log_sink (Callable[[str], None]): Log sink of the caller thread.
+        """
+        u.set_log_sink(log_sink)
+        pending = {} # {future: apk_path}
+        source_done = False
+        try:
+            # Spawn: forked workers would inherit the job log sink (its SQLite
+            # connection and lock) and the download threads state
+            spawn = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.parse_workers,
+                                     mp_context=spawn) as executor:
+                while not self.stop.is_set():
+                    # Fill the window (wait for the source only if idle)
+                    while not source_done and len(pending) < self.queue_size:
+                        try:
+                            apk_path = source_queue.get(
+                                block=not pending, 
+                                timeout=IngestPipeline.POLL_TIME)
+                        except Empty:
+                            break
+                        if apk_path is None:
+                            source_done = True
+                            break
+                        pending[executor.submit(_parse_apk, apk_path,
+                                                metadata)] = apk_path
+                    if not pending:
+                        if source_done:
+                            break
+                        continue
+
+                    (done, _) = wait(pending, timeout=IngestPipeline.POLL_TIME,
+                                     return_when=FIRST_COMPLETED)
+                    for future in done:
+                        apk_path = pending.pop(future)
+                        try:
+                            app = future.result()
+                        except Exception as e:
+                            u.log_error("Parse.", "Could not parse %s (%s)."
+                                        % (apk_path, e))
+                            if os.path.exists(apk_path):
+                                os.remove(apk_path)
+                            continue
+                        self._put(category_queue, (app, apk_path))
+
+                for future in pending:
+                    future.cancel()
+        except Exception as e:
+            # e.g. BrokenProcessPool (a worker killed parsing a large apk)
+            u.log_error("Parse.", "Parse stage stopped (%s)." % e)
+        finally:
+            # Category stages (and then the load stage) wait for them
+            for _ in range(self.category_workers):
+                self._put(category_queue, None)
+
+    def _category_stage(self, category_queue: Queue, load_queue: Queue,
+                        log_sink) -> None:
+        """Finds the category of parsed apps and prefetches their AndrozooGP
+        metadata, so the load function reads it from the cache.
+
+        Args:
+            category_queue (Queue): Input queue.
+            load_queue (Queue): Output queue.
+            log_sink (Callable[[str], None]): Log sink of the caller thread.
+        """
+        u.set_log_sink(log_sink)
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = category_queue.get(
+                        timeout=IngestPipeline.POLL_TIME)
+                except Empty:
+                    continue
+                if item is None:
+                    break
+
+                (app, apk_path) = item
+                try:
+                    app.category = CategoryFinder().get_app_category(
+                        app.package)
+                    self.az_metadata_source.get_az_metadata(
+                        app.package, app.version_code, app.hash)
+                except Exception:
+                    u.log_error("Category.", "Could not find %s category "
+                                "or AndrozooGP metadata." % app.package)
+                self._put(load_queue, (app, apk_path))
+        finally:
+            self._put(load_queue, None)
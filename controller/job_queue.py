@@ -0,0 +1,436 @@
+from common.util import Util as u
+
+from threading import Condition, Lock, Thread, local
+from time import time
+import json
+import sqlite3
+import traceback
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job when its cancellation was requested.
+    """
+
+
+class JobQueue:
+    """Persistent queue of long jobs (uploads, metrics, AOSP updates...) run
+    by a pool of worker threads. Jobs are stored on a SQLite database so
+    queued jobs survive restarts (running ones are queued again).
+
+    Job functions are registered by name and receive the JSON arguments they
+    were enqueued with. While running they can report progress with
+    set_progress() and stop early on cancellation with check_cancelled().
+    Every message they log (Util.log_*) is stored as a job log.
+
+    Failed jobs registered as retriable are retried after RETRY_BACKOFF 
+    seconds, doubled on each attempt.
+
+    Number of workers and retries can be set on config file "JOB_QUEUE"
+    section: {"db_file": str, "n_workers": int, "max_retries": int,
+    "retry_backoff": seconds}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    DB_FILE = "data/jobs.sqlite"
+    N_WORKERS = 4
+    MAX_RETRIES = 2
+    RETRY_BACKOFF = 30
+    POLL_INTERVAL = 5
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    _queue = None
+    _lock = Lock() # Prevents threads to create more than one queue.
+    _local = local() # Job running on each worker thread
+
+    @staticmethod
+    def get_queue() -> "JobQueue":
+        """Returns or creates the unique queue.
+
+        Returns:
+            JobQueue: Queue.
+        """
+        with JobQueue._lock:
+            if not JobQueue._queue:
+                JobQueue._queue = JobQueue()
+
+        return JobQueue._queue
+
+    def __init__(self) -> None:
+        """Creates the queue, its database and requeues jobs interrupted by
+        a restart. Workers are not started until start().
+        """
+        db_file = JobQueue.DB_FILE
+        self.n_workers = JobQueue.N_WORKERS
+        self.max_retries = JobQueue.MAX_RETRIES
+        self.retry_backoff = JobQueue.RETRY_BACKOFF
+        try:
+            with open(JobQueue.CONFIG_FILE, '+r', encoding="utf8") as config:
+                queue_config = json.loads(config.read())["JOB_QUEUE"]
+                db_file = queue_config.get("db_file", db_file)
+                self.n_workers = queue_config.get("n_workers", self.n_workers)
+                self.max_retries = queue_config.get("max_retries",
+                                                    self.max_retries)
+                self.retry_backoff = queue_config.get("retry_backoff",
+                                                      self.retry_backoff)
+        except:
+            pass
+
+        self.jobs = {} # Registered jobs {name: (function, unique, retry)}
+        self.workers = []
+        self.stopped = False
+        # Job logs are written while the API reads jobs, so the db lock is
+        # only held for a statement and never while waiting for a job
+        self.condition = Condition() # Wakes up workers
+        self.lock = Lock() # Protects db
+
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS job ("
+                + "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                + "name TEXT NOT NULL, "
+                + "args TEXT NOT NULL, "
+                + "status TEXT NOT NULL, "
+                + "progress REAL NOT NULL DEFAULT 0, "
+                + "attempts INTEGER NOT NULL DEFAULT 0, "
+                + "cancel_requested INTEGER NOT NULL DEFAULT 0, "
+                + "not_before REAL NOT NULL DEFAULT 0, "
+                + "created REAL NOT NULL, "
+                + "started REAL, "
+                + "finished REAL, "
+                + "error TEXT);")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS job_log ("
+                + "job_id INTEGER NOT NULL, "
+                + "timestamp REAL NOT NULL, "
+                + "message TEXT NOT NULL);")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS job_status ON job (status, id);")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS job_log_job ON job_log (job_id);")
+
+            # Jobs interrupted by a restart
+            self.db.execute("UPDATE job SET status = ? WHERE status = ?;",
+                            (JobQueue.QUEUED, JobQueue.RUNNING))
+
+    def register(self, name: str, function, unique: bool = False,
+                 retry: bool = False) -> None:
+        """Registers a job function.
+
+        Args:
+            name (str): Name of the job.
+            function (Callable): Function run by the job, called with the
+                enqueued arguments.
+            unique (bool, optional): Only one job of this name queued or
+                running at a time. Defaults to False.
+            retry (bool, optional): Retry the job if it fails (only for
+                idempotent jobs). Defaults to False.
+        """
+        self.jobs[name] = (function, unique, retry)
+
+    def start(self) -> None:
+        """Starts the worker threads.
+        """
+        self.stopped = False
+        for i in range(self.n_workers):
+            worker = Thread(target=self._work, name="Job worker %d" % i,
+                            daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+        u.log_normal("%d job workers started." % self.n_workers)
+
+    def stop(self) -> None:
+        """Stops the worker threads. Running jobs are queued again on next
+        start.
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.workers = []
+
+    def enqueue(self, name: str, *args, max_queued: int = None) -> int:
+        """Enqueues a job.
+
+        Args:
+            name (str): Name of a registered job.
+            max_queued (int, optional): Max jobs of this name queued or
+                running. Defaults to None (no limit, 1 if job is unique).
+
+        Returns:
+            int: Id of the job. None if the job is busy (max_queued reached).
+        """
+        if self.jobs[name][1]:
+            max_queued = 1
+
+        with self.lock, self.db:
+            if max_queued is not None:
+                (n_jobs,) = self.db.execute(
+                    "SELECT COUNT(*) FROM job WHERE name = ? "
+                    + "AND status IN (?, ?);",
+                    (name, JobQueue.QUEUED, JobQueue.RUNNING)).fetchone()
+                if n_jobs >= max_queued:
+                    return None
+
+            cursor = self.db.execute(
+                "INSERT INTO job (name, args, status, created) "
+                + "VALUES (?, ?, ?, ?);",
+                (name, json.dumps(args), JobQueue.QUEUED, time()))
+        with self.condition:
+            self.condition.notify()
+
+        return cursor.lastrowid
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job. A queued job is never run, a running job is asked to
+        stop (it stops on its next check_cancelled()).
+
+        Args:
+            job_id (int): Id of the job.
+
+        Returns:
+            bool: True if the job was queued or running.
+        """
+        with self.lock, self.db:
+            cursor = self.db.execute(
+                "UPDATE job SET status = ?, finished = ? "
+                + "WHERE id = ? AND status = ?;",
+                (JobQueue.CANCELLED, time(), job_id, JobQueue.QUEUED))
+            if cursor.rowcount:
+                return True
+
+            cursor = self.db.execute(
+                "UPDATE job SET cancel_requested = 1 "
+                + "WHERE id = ? AND status = ?;",
+                (job_id, JobQueue.RUNNING))
+
+            return cursor.rowcount == 1
+
+    def get_job(self, job_id: int, with_logs: bool = True) -> dict:
+        """Returns a job.
+
+        Args:
+            job_id (int): Id of the job.
+            with_logs (bool, optional): Include its logs. Defaults to True.
+
+        Returns:
+            dict: {id, name, args, status, progress, attempts, created,
+                started, finished, error, logs}. None if not found.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT id, name, args, status, progress, attempts, created, "
+                + "started, finished, error FROM job WHERE id = ?;",
+                (job_id,)).fetchone()
+            if not row:
+                return None
+
+            job = JobQueue._to_dict(row)
+            if with_logs:
+                job["logs"] = [
+                    {"timestamp": timestamp, "message": message}
+                    for (timestamp, message) in self.db.execute(
+                        "SELECT timestamp, message FROM job_log "
+                        + "WHERE job_id = ? ORDER BY rowid;", (job_id,))
+                ]
+
+        return job
+
+    def get_jobs(self, name: str = None, status: str = None,
+                 limit: int = 100) -> list[dict]:
+        """Returns last jobs (without logs).
+
+        Args:
+            name (str, optional): Only jobs of this name. Defaults to None.
+            status (str, optional): Only jobs in this status. Defaults to
+                None.
+            limit (int, optional): Max jobs. Defaults to 100.
+
+        Returns:
+            list[dict]: Jobs, newest first.
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, name, args, status, progress, attempts, created, "
+                + "started, finished, error FROM job "
+                + "WHERE (? IS NULL OR name = ?) "
+                + "AND (? IS NULL OR status = ?) "
+                + "ORDER BY id DESC LIMIT ?;",
+                (name, name, status, status, limit)).fetchall()
+
+        return [JobQueue._to_dict(row) for row in rows]
+
+    def count_active(self, name: str) -> int:
+        """Returns the number of jobs of a name queued or running.
+
+        Args:
+            name (str): Name of the job.
+
+        Returns:
+            int: Number of jobs.
+        """
+        with self.lock:
+            (n_jobs,) = self.db.execute(
+                "SELECT COUNT(*) FROM job WHERE name = ? "
+                + "AND status IN (?, ?);",
+                (name, JobQueue.QUEUED, JobQueue.RUNNING)).fetchone()
+
+        return n_jobs
+
+    @staticmethod
+    def set_progress(progress: float) -> None:
+        """Sets the progress of the job running on this thread. Does nothing
+        outside a job.
+
+        Args:
+            progress (float): Progress [0, 1].
+        """
+        job_id = getattr(JobQueue._local, "job_id", None)
+        if job_id is None:
+            return
+
+        queue = JobQueue.get_queue()
+        with queue.lock, queue.db:
+            queue.db.execute("UPDATE job SET progress = ? WHERE id = ?;",
+                             (min(max(progress, 0), 1), job_id))
+
+    @staticmethod
+    def check_cancelled() -> None:
+        """Stops the job running on this thread if its cancellation was
+        requested. Does nothing outside a job.
+
+        Raises:
+            JobCancelledError: Cancellation requested.
+        """
+        job_id = getattr(JobQueue._local, "job_id", None)
+        if job_id is None:
+            return
+
+        queue = JobQueue.get_queue()
+        with queue.lock:
+            (cancel_requested,) = queue.db.execute(
+                "SELECT cancel_requested FROM job WHERE id = ?;",
+                (job_id,)).fetchone()
+        if cancel_requested:
+            raise JobCancelledError("Job %d cancelled." % job_id)
+
+    def _log(self, job_id: int, message: str) -> None:
+        """Stores a log message of a job.
+
+        Args:
+            job_id (int): Id of the job.
+            message (str): Message.
+        """
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO job_log VALUES (?, ?, ?);",
+                            (job_id, time(), message))
+
+    def _claim(self) -> tuple:
+        """Waits for the next queued job (whose retry backoff is over) and
+        marks it as running.
+
+        Returns:
+            tuple: (id, name, args, attempts including this one). None if 
+                the queue was stopped.
+        """
+        # The db is checked holding the condition, so no notify is lost
+        with self.condition:
+            while not self.stopped:
+                with self.lock, self.db:
+                    row = self.db.execute(
+                        "SELECT id, name, args, attempts FROM job "
+                        + "WHERE status = ? AND not_before <= ? "
+                        + "ORDER BY id LIMIT 1;",
+                        (JobQueue.QUEUED, time())).fetchone()
+                    if row:
+                        self.db.execute(
+                            "UPDATE job SET status = ?, started = ?, "
+                            + "attempts = attempts + 1 WHERE id = ?;",
+                            (JobQueue.RUNNING, time(), row[0]))
+                        return row[:3] + (row[3] + 1,)
+
+                self.condition.wait(JobQueue.POLL_INTERVAL)
+
+        return None
+
+    def _finish(self, job_id: int, status: str, error: str = None,
+                retry_delay: float = 0) -> None:
+        """Marks a job as finished.
+
+        Args:
+            job_id (int): Id of the job.
+            status (str): Final status (or QUEUED to retry it).
+            error (str, optional): Error of the job. Defaults to None.
+            retry_delay (float, optional): Seconds before a QUEUED job is run
+                again. Defaults to 0.
+        """
+        now = time()
+        with self.lock, self.db:
+            self.db.execute(
+                "UPDATE job SET status = ?, finished = ?, error = ?, "
+                + "not_before = ?, "
+                + "progress = CASE WHEN ? = ? THEN 1 ELSE progress END "
+                + "WHERE id = ?;",
+                (status, now, error, now + retry_delay, status,
+                 JobQueue.DONE, job_id))
+
+    def _work(self) -> None:
+        """Worker thread loop: runs queued jobs until the queue is stopped.
+        """
+        while True:
+            job = self._claim()
+            if not job:
+                return
+
+            (job_id, name, args, attempts) = job
+            JobQueue._local.job_id = job_id
+            u.set_log_sink(lambda message: self._log(job_id, message))
+            try:
+                self.jobs[name][0](*json.loads(args))
+                self._finish(job_id, JobQueue.DONE)
+            except JobCancelledError:
+                self._finish(job_id, JobQueue.CANCELLED)
+            except Exception as e:
+                self._log(job_id, traceback.format_exc())
+                if self.jobs[name][2] and attempts <= self.max_retries:
+                    delay = self.retry_backoff * 2 ** (attempts - 1)
+                    u.log_warning("Job failed.", "Job %d (%s) retried in %d s."
+                                  % (job_id, name, delay))
+                    self._finish(job_id, JobQueue.QUEUED, repr(e), delay)
+                else:
+                    u.log_error("Job failed.", "Job %d (%s) failed."
+                                % (job_id, name))
+                    self._finish(job_id, JobQueue.FAILED, repr(e))
+            finally:
+                u.set_log_sink(None)
+                JobQueue._local.job_id = None
+
+    @staticmethod
+    def _to_dict(row: tuple) -> dict:
+        """Creates a dict representing a job row.
+
+        Args:
+            row (tuple): (id, name, args, status, progress, attempts,
+                created, started, finished, error)
+
+        Returns:
+            dict: Job data.
+        """
+        (job_id, name, args, status, progress, attempts, created, started,
+         finished, error) = row
+
+        return {"id": job_id,
+                "name": name,
+                "args": json.loads(args),
+                "status": status,
+                "progress": progress,
+                "attempts": attempts,
+                "created": created,
+                "started": started,
+                "finished": finished,
+                "error": error}
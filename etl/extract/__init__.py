@@ -1,2 +1,4 @@
 __all__ = ["androzoo", "play_store", "google", "rank_load", "live_source", 
-           "apkpure", "apkmonk", "apkfollow", "evozi", "fdroid"] 
\ No newline at end of file
+           "apkpure", "apkmonk", "apkfollow", "evozi", "fdroid", 
+           "browser_pool", "http_session", "category_cache", 
+           "androzoo_index", "az_metadata_cache"]
\ No newline at end of file
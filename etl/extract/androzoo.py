@@ -1,9 +1,16 @@
 from typing import Iterator
-from pyandrozoo import pyAndroZoo
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from threading import Event, Lock
+import multiprocessing
 import gzip
 from alive_progress import alive_bar
 from random import random
+import time
 import json
+import os
 import requests as r
 
 from common.util import Util as u
@@ -11,6 +18,9 @@ from common.util import Util as u
 from common.domain.az_metadata import AzMetadata
 from common.domain.az_dependency import AzDependency
 
+from etl.extract.androzoo_index import AndrozooIndex
+from etl.extract.az_metadata_cache import AzMetadataCache
+
 
 class Androzoo:
     """Represents Androzoo source.
@@ -19,6 +29,14 @@ class Androzoo:
     CONFIG_FILE = "data/config.json"
     NUM_APPS = 22086095
     NAME = "Androzoo"
+    DOWNLOAD_URL = "https://androzoo.uni.lu/api/download"
+    DOWNLOAD_DIR = "data/androzoo_downloads/"
+    PARTIAL_DIR = "data/androzoo_partial_downloads/"
+    DOWNLOAD_WORKERS = 20 # Androzoo limit of parallel downloads
+    DOWNLOAD_RETRIES = 3
+    DOWNLOAD_TIMEOUT = (10, 60) # (connect, between bytes)
+    RETRY_BACKOFF = 2
+    CHUNK_SIZE = 1 << 20
     
     def __init__(self) -> None:
         """Creates a Androzoo object.
@@ -30,6 +48,8 @@ class Androzoo:
                 azoo_data = json.loads(config.read())["ANDROZOO"]
                 self.API_KEY = azoo_data["API_KEY"]
                 self.INDEX_FILE = azoo_data["INDEX_FILE"]
+                self.DOWNLOAD_WORKERS = azoo_data.get(
+                    "DOWNLOAD_WORKERS", Androzoo.DOWNLOAD_WORKERS)
         except:
             pass
         
@@ -44,42 +64,135 @@ class Androzoo:
         """
         return Androzoo.NAME
             
-    def download_apps(self, app_hash_list: list[str]) -> None:
-        """Download apps contained in app_hash_list 20 by 20.
+    def download_apps(self, app_hash_list: list[str]) -> Iterator[str]:
+        """Downloads apps concurrently (up to DOWNLOAD_WORKERS at a time). 
+        Each apk is streamed to a partial file, resumed with HTTP ranges on
+        retry and verified against its hash.
 
         Args:
             app_hash_list (list[str]): List of app hashes.
+
+        Yields:
+            Iterator[str]: Path of each app downloaded, as soon as it is 
+                verified. Apps that could not be downloaded are skipped.
         """
         u.log_normal("Downloading %d apps..." % len(app_hash_list))
         
-        # TODO: call with no app_hash from database (prevent duplication)
-        androzoo = pyAndroZoo(self.API_KEY)
+        os.makedirs(Androzoo.DOWNLOAD_DIR, exist_ok=True)
+        os.makedirs(Androzoo.PARTIAL_DIR, exist_ok=True)
+        session = r.Session()
+        session.mount("https://", HTTPAdapter(
+            pool_maxsize=self.DOWNLOAD_WORKERS))
+        stop = Event()
         
-        # Prepare to download apps 20 by 20
-        lists = []
-        last_i = 0
-        for i in range(len(app_hash_list) // 20):
-            lists.append(app_hash_list[(5*i):((5*i+20))])
-            last_i = i
-        lists.append(app_hash_list[(5*last_i):])
+        executor = ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS,
+                                      thread_name_prefix="androzoo-download")
+        future_list = [executor.submit(self._download_app, session, app_hash,
+                                       stop) 
+                       for app_hash in dict.fromkeys(app_hash_list)]
+        n_downloaded = 0
+        try:
+            for future in as_completed(future_list):
+                apk_path = future.result()
+                if apk_path:
+                    n_downloaded += 1
+                    yield apk_path
+        finally:
+            # Consumer stopped early: running downloads stop on next chunk
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            session.close()
         
-        # Download apps
-        with alive_bar(len(lists)) as bar:
-            for i in self._get_apks(androzoo, lists):
-                bar()
+        u.log_result("Downloaded %d apps." % n_downloaded)
+        
+    def _download_app(self, session: r.Session, app_hash: str, 
+                      stop: Event) -> str:
+        """Downloads an app, retrying with exponential backoff.
+
+        Args:
+            session (r.Session): HTTP session.
+            app_hash (str): Hash of the app.
+            stop (Event): Set to abort the download.
+
+        Returns:
+            str: Path of the app. None if it could not be downloaded.
+        """
+        apk_path = Androzoo.DOWNLOAD_DIR + app_hash.upper() + ".apk"
+        partial_path = Androzoo.PARTIAL_DIR + app_hash.upper() + ".apk.part"
+        if os.path.exists(apk_path):
+            return apk_path
         
-        u.log_result("Downloaded %d apps." % len(app_hash_list))
+        for attempt in range(Androzoo.DOWNLOAD_RETRIES + 1):
+            if attempt > 0:
+                if stop.wait(Androzoo.RETRY_BACKOFF * 2 ** (attempt - 1)):
+                    return None
+            try:
+                if not self._download_to(session, app_hash, partial_path, 
+                                         stop):
+                    return None
+            except r.HTTPError as e:
+                u.log_warning("Connection fail.", "%s download failed (%s)." 
+                              % (app_hash, e))
+                if e.response is not None and e.response.status_code in (
+                        401, 403, 404):
+                    return None # Not worth retrying
+                continue
+            except (r.RequestException, OSError) as e:
+                u.log_warning("Connection fail.", "%s download failed (%s)." 
+                              % (app_hash, e))
+                continue
+            
+            # Integrity check, a corrupted file is downloaded again
+            if u.get_file_sha256(partial_path) == app_hash.lower():
+                os.replace(partial_path, apk_path)
+                return apk_path
+            u.log_warning("Corrupted.", "%s hash does not match." % app_hash)
+            os.remove(partial_path)
         
-    def _get_apks(self, androzoo: pyAndroZoo, lists: list[list[str]]) -> None:
-        """Download all apps contained in lists from androzoo.
+        u.log_error("Download fail.", "%s could not be downloaded." 
+                    % app_hash)
+        return None
+    
+    def _download_to(self, session: r.Session, app_hash: str, 
+                     partial_path: str, stop: Event) -> bool:
+        """Streams an app to its partial file, resuming it if it exists.
 
         Args:
-            androzoo (pyAndroZoo): Androzoo client.
-            lists (list[list[str]]): List of lists of app hashes.
+            session (r.Session): HTTP session.
+            app_hash (str): Hash of the app.
+            partial_path (str): Partial file.
+            stop (Event): Set to abort the download.
+
+        Raises:
+            r.RequestException: Connection or HTTP error.
+
+        Returns:
+            bool: True if completed, False if aborted.
         """
-        for list in lists:
-            androzoo.get(list) # TODO: pyAndroZoo modded to download in data and timeout added
-            yield
+        offset = 0
+        if os.path.exists(partial_path):
+            offset = os.path.getsize(partial_path)
+        headers = {"Range": "bytes=%d-" % offset} if offset else {}
+        
+        with session.get(Androzoo.DOWNLOAD_URL, 
+                         params={"apikey": self.API_KEY, "sha256": app_hash},
+                         headers=headers, stream=True, 
+                         timeout=Androzoo.DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 416:
+                # Partial file not valid for the range, start again
+                os.remove(partial_path)
+                raise r.HTTPError("Range not satisfiable.")
+            response.raise_for_status()
+            
+            # Server may ignore the range and send the whole file
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            with open(partial_path, mode) as f:
+                for chunk in response.iter_content(Androzoo.CHUNK_SIZE):
+                    if stop.is_set():
+                        return False
+                    f.write(chunk)
+        
+        return True
         
     def get_n_random_hash(self, n_hash: int) -> list[str]:
         """Select n_hash random from index file.
@@ -147,8 +260,18 @@ class Androzoo:
         
         return selected_hash_list
     
+    def build_index(self) -> int:
+        """Builds the columnar index (AndrozooIndex) of the index file, used
+        to select random apps without reading the index file.
+
+        Returns:
+            int: Number of apps indexed.
+        """
+        return AndrozooIndex.build(self.INDEX_FILE)
+    
     def _select_random_apps(self, n_apps: int) -> str:
-        """Select n_app random app hashes from index file.
+        """Select n_app random app hashes from index file. Exactly n_apps if
+        the columnar index is built.
 
         Args:
             n_apps (int): Number of apps to select. Function will select n_apps
@@ -160,6 +283,11 @@ class Androzoo:
         Yields:
             Iterator[str]: Hash of app selected.
         """
+        index = AndrozooIndex.open()
+        if index:
+            yield from index.sample(n_apps)
+            return
+        
         # Probability of select an app
         p_select = n_apps / Androzoo.NUM_APPS
         
@@ -183,7 +311,9 @@ class Androzoo:
     def _select_random_apps_by_package(self, n_apps: int, 
                                        package_list: list[str]) -> str:
         """Select n_app random app hashes from index file. Apps package must be
-        inside package_list. It could select less than n_app.
+        inside package_list. It could select less than n_app. If the columnar 
+        index is built, the latest version of n_apps random packages is 
+        selected (else first apps found).
 
         Args:
             n_apps (int): Number of apps to select. Function will select n_apps
@@ -196,6 +326,12 @@ class Androzoo:
         Yields:
             Iterator[str]: Hash of app selected.
         """
+        index = AndrozooIndex.open()
+        if index:
+            yield from index.sample_latest(n_apps, package_list)
+            return
+        
+        package_set = set(package_list)
         with gzip.open(self.INDEX_FILE, 'r') as index:
             apps_selected = 0
             header = True
@@ -207,7 +343,7 @@ class Androzoo:
                 
                 # Select app
                 file_row = app.decode("utf-8").split(",")
-                if file_row[5][1:-1] in package_list:
+                if file_row[5][1:-1] in package_set:
                     apps_selected += 1
                     yield file_row[0]
 
@@ -215,11 +351,103 @@ class Androzoo:
                         break
 
 
+# Worker state of AndrozooGP.bulk_load_from_index
+# {package (bytes): {version_code (int): list[hash]}}
+_index_app_dict = None
+_index_log = False
+
+
+def _init_index_worker(app_list: dict, log: bool) -> None:
+    """Sets the apps to find on an index worker process.
+
+    Args:
+        app_list (dict): Apps in warehouse 
+            {"package_name": [(version_code1, list[hash]), ...]}
+        log (bool): Log missing fields.
+    """
+    global _index_app_dict, _index_log
+    _index_app_dict = {}
+    for (package, version_list) in app_list.items():
+        versions = _index_app_dict.setdefault(package.encode("utf-8"), {})
+        for (version_code, hash_list) in version_list:
+            versions.setdefault(int(version_code), []).extend(hash_list)
+    _index_log = log
+
+
+def _find_docids(line: bytes) -> Iterator[bytes]:
+    """Finds the values of the "docid" keys of a json line without parsing it
+    (packages have no escaped characters). Nested keys are returned too, so
+    no docid is missed.
+
+    Args:
+        line (bytes): Json line.
+
+    Yields:
+        Iterator[bytes]: Value of each "docid" key.
+    """
+    start = line.find(b'"docid"')
+    while start != -1:
+        value_start = line.find(b'"', start + 7) + 1
+        value_end = line.find(b'"', value_start)
+        if value_start == 0 or value_end == -1:
+            return
+        yield line[value_start:value_end]
+        start = line.find(b'"docid"', value_end + 1)
+
+
+def _parse_index_chunk(chunk: bytes) -> tuple[int, list[AzMetadata]]:
+    """Parses the lines of an index chunk whose docid is on the warehouse. 
+    Other lines are skipped before json decoding.
+
+    Args:
+        chunk (bytes): Lines of the index.
+
+    Returns:
+        tuple[int, list[AzMetadata]]: Number of lines, AzMetadata found.
+    """
+    line_list = chunk.rstrip(b"\n").split(b"\n")
+    metadata_list = []
+    for line in line_list:
+        if not any(docid in _index_app_dict for docid in _find_docids(line)):
+            continue
+        
+        try:
+            app_metadata = json.loads(line)
+            versions = _index_app_dict.get(
+                app_metadata["docid"].encode("utf-8"), {})
+            version_code = int(
+                app_metadata["details"]["appDetails"]["versionCode"])
+        except Exception:
+            u.log_error("Parse", "Could not parse index line.")
+            continue
+        
+        for app_hash in versions.get(version_code, []):
+            metadata_list.append(AndrozooGP._parse_json(app_metadata, app_hash,
+                                                        _index_log))
+    
+    return (len(line_list), metadata_list)
+
+
 class AndrozooGP:
     """Represents Androzoo source.
     """
 
     QUERY_URL = "https://androzoo.uni.lu/api/get_gp_metadata/{package}/{version_code}"
+    INDEX_WORKERS = os.cpu_count() or 1
+    INDEX_WINDOW = 2 * INDEX_WORKERS # Chunks in memory at once
+    INDEX_CHUNK_SIZE = 16 << 20
+    GP_INDEX_FILE = None
+    GP_INDEX_LINES = None # Unknown (progress bar without total)
+    REPORT_LINES = 1000000
+    GP_WORKERS = 8
+    GP_RATE_LIMIT = 10 # Requests per second
+    TIMEOUT = (10, 30) # (connect, read)
+    RETRIES = 3
+    RETRY_BACKOFF = 1
+    
+    _session = None
+    _next_request = 0 # Next request slot (monotonic time)
+    _lock = Lock() # Protects session creation and request slots.
 
     def __init__(self) -> None:
         """Creates a AndrozooGP object.
@@ -229,6 +457,17 @@ class AndrozooGP:
             with open(Androzoo.CONFIG_FILE, '+r', encoding="utf8") as config:
                 azoo_data = json.loads(config.read())["ANDROZOO"]
                 self.API_KEY = azoo_data["API_KEY"]
+                self.INDEX_WORKERS = azoo_data.get("GP_INDEX_WORKERS",
+                                                   AndrozooGP.INDEX_WORKERS)
+                self.INDEX_WINDOW = 2 * self.INDEX_WORKERS
+                self.GP_INDEX_FILE = azoo_data.get("GP_INDEX_FILE",
+                                                   AndrozooGP.GP_INDEX_FILE)
+                self.GP_INDEX_LINES = azoo_data.get("GP_INDEX_LINES",
+                                                    AndrozooGP.GP_INDEX_LINES)
+                self.GP_WORKERS = azoo_data.get("GP_WORKERS", 
+                                                AndrozooGP.GP_WORKERS)
+                self.GP_RATE_LIMIT = azoo_data.get("GP_RATE_LIMIT",
+                                                   AndrozooGP.GP_RATE_LIMIT)
         except:
             pass
         
@@ -247,23 +486,138 @@ class AndrozooGP:
         Returns:
             list[AzMetadata]: List of AzMetadata objects or None.
         """
+        response_list = self._get_response(package, version_code)
+        
+        return AndrozooGP._parse_response(response_list, app_hash)
+    
+    def get_az_metadata_many(self, app_list: list[tuple[str, str, str]]
+                             ) -> dict[str, list[AzMetadata]]:
+        """Downloads all AzMetadata available on AndrozooGP for many apps
+        concurrently (up to GP_WORKERS requests at a time). Each version is
+        requested once.
+
+        Args:
+            app_list (list[tuple[str, str, str]]): 
+                [(package, version_code, hash), ...]
+
+        Returns:
+            dict[str, list[AzMetadata]]: {hash: List of AzMetadata objects or 
+                None}
+        """
+        version_dict = {} # {(package, version_code): list[hash]}
+        for (package, version_code, app_hash) in app_list:
+            version_dict.setdefault((package, str(version_code)), 
+                                    []).append(app_hash)
+        
+        az_metadata_dict = {}
+        with ThreadPoolExecutor(max_workers=self.GP_WORKERS,
+                                thread_name_prefix="androzoo-gp") as executor:
+            future_dict = {executor.submit(self._get_response, package, 
+                                           version_code): (package, 
+                                                           version_code)
+                           for (package, version_code) in version_dict}
+            for future in as_completed(future_dict):
+                response_list = future.result()
+                for app_hash in version_dict[future_dict[future]]:
+                    az_metadata_dict[app_hash] = AndrozooGP._parse_response(
+                        response_list, app_hash)
+        
+        return az_metadata_dict
+    
+    def _get_response(self, package: str, version_code: str) -> list[dict]:
+        """Returns the AndrozooGP response of an app version, from the cache
+        if fresh.
+
+        Args:
+            package (str): Package name of the app.
+            version_code (str): Version code of the app.
+
+        Returns:
+            list[dict]: List of raw AzMetadata. The stale one (or None) if the
+                request fails.
+        """
+        cache = AzMetadataCache.get_cache()
+        (fresh, response_list) = cache.get(package, version_code)
+        if fresh:
+            return response_list
+        
         url = AndrozooGP.QUERY_URL.format(package=package, version_code=version_code)
+        AndrozooGP._wait_rate_limit(self.GP_RATE_LIMIT)
+        try:
+            api_response = AndrozooGP._get_session(self.GP_WORKERS).get(
+                url, params={"apikey": self.API_KEY}, 
+                timeout=AndrozooGP.TIMEOUT)
+            if api_response.status_code == 404:
+                fetched_list = [] # No metadata for this version
+            else:
+                api_response.raise_for_status()
+                fetched_list = json.loads(
+                    api_response.content.decode("utf-8")[:-1])
+        except (r.RequestException, ValueError) as e:
+            u.log_warning("Connection fail.", "Could not get %s metadata (%s)."
+                          % (package, e))
+            return response_list
+        
+        cache.put(package, version_code, fetched_list)
+        
+        return fetched_list
+    
+    @staticmethod
+    def _parse_response(response_list: list[dict], app_hash: str
+                        ) -> list[AzMetadata]:
+        """Converts an AndrozooGP response into AzMetadata objects.
 
-        api_response = r.get(url, {"apikey": self.API_KEY})
+        Args:
+            response_list (list[dict]): List of raw AzMetadata.
+            app_hash (str): Hash of the app.
 
-        response_list = json.loads(api_response.content.decode("utf-8")[:-1])
+        Returns:
+            list[AzMetadata]: List of AzMetadata objects or None.
+        """
+        if not response_list:
+            return None
+        
+        return [AndrozooGP._parse_json(az_metadata_raw, app_hash)
+                for az_metadata_raw in response_list]
+    
+    @staticmethod
+    def _get_session(pool_size: int) -> r.Session:
+        """Returns or creates the session shared by all AndrozooGP objects.
+        Connections are kept alive and failed requests retried with backoff.
 
-        az_metadata_list = []
-        if len(response_list) > 0:
-            for az_metadata_raw in response_list:
-                az_metadata_list.append(self._parse_json(az_metadata_raw, app_hash))
+        Args:
+            pool_size (int): Max connections kept alive.
 
-        if len(az_metadata_list) == 0:
-            az_metadata_list = None
+        Returns:
+            r.Session: Session.
+        """
+        with AndrozooGP._lock:
+            if not AndrozooGP._session:
+                retry = Retry(total=AndrozooGP.RETRIES, 
+                              backoff_factor=AndrozooGP.RETRY_BACKOFF,
+                              status_forcelist=(429, 500, 502, 503, 504))
+                AndrozooGP._session = r.Session()
+                AndrozooGP._session.mount("https://", HTTPAdapter(
+                    pool_maxsize=pool_size, max_retries=retry))
+        
+        return AndrozooGP._session
+    
+    @staticmethod
+    def _wait_rate_limit(rate_limit: float) -> None:
+        """Waits for the next request slot of the process.
 
-        return az_metadata_list
+        Args:
+            rate_limit (float): Max requests per second.
+        """
+        with AndrozooGP._lock:
+            now = time.monotonic()
+            slot = max(now, AndrozooGP._next_request)
+            AndrozooGP._next_request = slot + 1 / rate_limit
+        
+        time.sleep(slot - now)
 
-    def _parse_json(self, az_metadata_raw: dict, app_hash: str, log: bool = False) -> AzMetadata:
+    @staticmethod
+    def _parse_json(az_metadata_raw: dict, app_hash: str, log: bool = False) -> AzMetadata:
         # Convert into AzMetadata object
         dependencies = []
         try:
@@ -434,67 +788,93 @@ class AndrozooGP:
             az_dependency_list = dependencies
         )
 
-    def bulk_load_from_index(self, index: str, l: int, app_list: dict, log=False) -> list[AzMetadata]:
-        """Extract all AzMetadata valid objects.
+
+    def bulk_load_from_index(self, index: str, l: int, app_list: dict, 
+                             log=False) -> Iterator[list[AzMetadata]]:
+        """Streams the AzMetadata of the apps on the warehouse found on the
+        GP metadata index. Chunks of lines are filtered and parsed on a
+        process pool and only INDEX_WINDOW chunks are in memory at once.
 
         Args:
-            index (str): Path of the index file.
-            app_list (dict): Apps in warehouse {"package_name": [(version_code1, list[hash]), ...]}
-            l (int): Number of records in index.
+            index (str): Path of the index file (.jsonl.gz).
+            l (int): Number of records in index (for the progress bar).
+            app_list (dict): Apps in warehouse 
+                {"package_name": [(version_code1, list[hash]), ...]}
+            log (bool, optional): Log missing fields. Defaults to False.
 
-        Returns:
-            list[AzMetadata]: List of all AzMetadata that can be uploaded.
+        Yields:
+            Iterator[list[AzMetadata]]: AzMetadata found on each chunk.
         """
         u.log_normal("Finding AzMetadata in index...")
         
-        metadata_list = []
-        with alive_bar(l) as bar:
-            c = 0
-            for i in self._bulk_load_from_index(index, app_list):
-                if i:
-                    az_metadata_raw, hash_list = i
-
-                    for app_hash in hash_list:
-                        metadata = self._parse_json(
-                            az_metadata_raw, app_hash
-                        )
-                        c += 1
-                        metadata_list.append(metadata)
-
-                bar()
-                
-        u.log_result("%d AzMetadata found." % len(metadata_list))
+        n_lines = 0
+        n_found = 0
+        next_report = AndrozooGP.REPORT_LINES
+        start = time.perf_counter()
+        # Spawned workers so they do not inherit the job log sink and locks
+        executor = ProcessPoolExecutor(
+            max_workers=self.INDEX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_index_worker, initargs=(app_list, log))
+        pending = set()
+        try:
+            with alive_bar(l) as bar:
+                chunk_iter = AndrozooGP._read_index_chunks(index)
+                while True:
+                    # Keep the window full, then wait for any chunk
+                    for chunk in chunk_iter:
+                        pending.add(executor.submit(_parse_index_chunk, 
+                                                    chunk))
+                        if len(pending) >= self.INDEX_WINDOW:
+                            break
+                    if not pending:
+                        break
+                    
+                    (done, pending) = wait(pending, 
+                                           return_when=FIRST_COMPLETED)
+                    for future in done:
+                        (n_chunk_lines, metadata_list) = future.result()
+                        n_lines += n_chunk_lines
+                        n_found += len(metadata_list)
+                        bar(n_chunk_lines)
+                        if metadata_list:
+                            yield metadata_list
+                    
+                    if n_lines >= next_report:
+                        next_report += AndrozooGP.REPORT_LINES
+                        u.log_normal("%d lines read, %d AzMetadata found "
+                                     "(%.0f lines/s)." % (n_lines, n_found, 
+                                     n_lines / (time.perf_counter() - start)))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
         
-        return metadata_list
-
-    def _bulk_load_from_index(self, index: str, app_list: dict) -> Iterator[dict]:
-        """Returns az_metadata raw json for app in warehouse.
+        elapsed = time.perf_counter() - start
+        u.log_result("%d AzMetadata found on %d lines in %.0f s (%.0f "
+                     "lines/s)." % (n_found, n_lines, elapsed, 
+                                    n_lines / max(elapsed, 1e-9)))
+    
+    @staticmethod
+    def _read_index_chunks(index: str) -> Iterator[bytes]:
+        """Reads the index in chunks of whole lines.
 
         Args:
-            index (str): Path of the index file.
-            app_list (dict): Apps in warehouse {"package_name": [(version_code1, list[hash]), ...]}
+            index (str): Path of the index file (.jsonl.gz).
 
         Yields:
-            Iterator[tuple(dict, hash_list)]: Dict with the az_metadata raw.
+            Iterator[bytes]: About INDEX_CHUNK_SIZE bytes of lines.
         """
-        with gzip.open(index, 'r') as i:
-            for metadata in i:
-                app_metadata = json.loads(metadata)
-
-                r = None
-
-                # App in warehouse?
-                try:
-                    if app_metadata["docid"] in app_list.keys():
-                        hash_list = []
-
-                        for (vc, hl) in app_list[app_metadata["docid"]]:
-                            if app_metadata["details"]["appDetails"]["versionCode"] == vc:
-                                hash_list += hl
-                        
-                        if len(hash_list) != 0:
-                            r = (app_metadata, hash_list)
-                except Exception:
-                    u.log_error("Parse", "Could not parse index line.")
-
-                yield r
\ No newline at end of file
+        with gzip.open(index, "rb") as i:
+            rest = b""
+            while True:
+                block = i.read(AndrozooGP.INDEX_CHUNK_SIZE)
+                if not block:
+                    break
+                
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                (chunk, rest) = (block[:end], block[end:])
+                if chunk:
+                    yield chunk
+            
+            if rest:
+                yield rest
@@ -0,0 +1,449 @@
+from hashlib import blake2b
+import numpy as np
+import gzip
+import json
+import os
+import shutil
+
+from common.util import Util as u
+
+
+class AndrozooIndex:
+    """Columnar copy of the Androzoo index file (CSV.gz, one app per row)
+    built once and memory-mapped on use, so sampling apps does not
+    decompress the whole file. Each column is a raw binary file of fixed
+    width values:
+
+    * hash: SHA256 digest (32 bytes).
+    * package_key: 64 bit hash of the package name (package filter).
+    * version_code: Version code, -1 if unknown.
+    * dex_date: Dex date as YYYYMMDDhhmmss, 0 if unknown.
+    * apk_size: Apk size in bytes, -1 if unknown.
+
+    Apps of a package are found with an inverted index: rows grouped by
+    package (ordered by version code and dex date), the sorted package keys
+    and the offset of the rows of each package.
+    """
+
+    DIRECTORY = "data/androzoo_index/"
+    META_FILE = "meta.json"
+    CHUNK_ROWS = 1000000
+    COLUMNS = {                        # {name: (dtype, width)}
+        "hash": ("u1", 32),
+        "package_key": ("<i8", 1),
+        "version_code": ("<i8", 1),
+        "dex_date": ("<i8", 1),
+        "apk_size": ("<i8", 1)
+    }
+    INVERTED_COLUMNS = ("inverted_keys", "inverted_offsets", "inverted_rows")
+
+    def __init__(self, directory: str = DIRECTORY) -> None:
+        """Opens a built index.
+
+        Args:
+            directory (str, optional): Index directory. Defaults to
+                DIRECTORY.
+
+        Raises:
+            FileNotFoundError: Index not built.
+        """
+        with open(os.path.join(directory, AndrozooIndex.META_FILE), 'r',
+                  encoding="utf8") as f:
+            meta = json.loads(f.read())
+
+        self.n_rows = meta["rows"]
+        self.columns = {}
+        for (name, (dtype, width)) in AndrozooIndex.COLUMNS.items():
+            shape = (self.n_rows, width) if width > 1 else (self.n_rows,)
+            if self.n_rows == 0:
+                self.columns[name] = np.empty(shape, dtype)
+                continue
+            self.columns[name] = np.memmap(
+                os.path.join(directory, name + ".bin"), dtype=dtype,
+                mode='r', shape=shape)
+
+        # Indexes built before the inverted index are still usable
+        self.inverted = None
+        if meta.get("inverted"):
+            self.inverted = {name: AndrozooIndex._open_column(directory, name)
+                             for name in AndrozooIndex.INVERTED_COLUMNS}
+
+    @staticmethod
+    def _open_column(directory: str, name: str) -> np.ndarray:
+        """Memory-maps a 1-D int64 column.
+
+        Args:
+            directory (str): Index directory.
+            name (str): Column name.
+
+        Returns:
+            np.ndarray: Column (empty array if the file is empty).
+        """
+        path = os.path.join(directory, name + ".bin")
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype="<i8")
+        return np.memmap(path, dtype="<i8", mode='r')
+
+    @staticmethod
+    def open(directory: str = DIRECTORY) -> "AndrozooIndex":
+        """Opens the index if built.
+
+        Args:
+            directory (str, optional): Index directory. Defaults to
+                DIRECTORY.
+
+        Returns:
+            AndrozooIndex: Index. None if not built.
+        """
+        try:
+            return AndrozooIndex(directory)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def package_key(package: str) -> int:
+        """Returns the key of a package name.
+
+        Args:
+            package (str): Package name.
+
+        Returns:
+            int: Signed 64 bit hash.
+        """
+        return int.from_bytes(blake2b(package.encode("utf-8"),
+                                      digest_size=8).digest(),
+                              "little", signed=True)
+
+    def sample(self, n_apps: int, package_list: list[str] = None,
+               seed: int = None) -> list[str]:
+        """Selects random apps without replacement.
+
+        Args:
+            n_apps (int): Number of apps. Exactly n_apps are selected unless
+                there are less apps (then all are).
+            package_list (list[str], optional): Only apps with these
+                packages. Defaults to None (any app).
+            seed (int, optional): Random seed. Defaults to None.
+
+        Returns:
+            list[str]: Hash of each app selected (upper case, as on the
+                index file).
+        """
+        rng = np.random.default_rng(seed)
+        if package_list is None:
+            rows = rng.choice(self.n_rows, size=min(n_apps, self.n_rows),
+                              replace=False)
+        else:
+            candidates = self._find_rows_by_package(package_list)
+            rows = rng.choice(candidates, size=min(n_apps, len(candidates)),
+                              replace=False)
+
+        return self._to_hashes(rows)
+
+    def sample_latest(self, n_apps: int, package_list: list[str],
+                      seed: int = None) -> list[str]:
+        """Selects the latest version of random packages (each package has
+        the same chance, no matter how many versions it has).
+
+        Args:
+            n_apps (int): Number of packages. Exactly n_apps are selected
+                unless less packages are indexed (then all are).
+            package_list (list[str]): Packages allowed.
+            seed (int, optional): Random seed. Defaults to None.
+
+        Returns:
+            list[str]: Hash of each app selected.
+        """
+        rng = np.random.default_rng(seed)
+        row_list = [rows[-1] for rows in self._get_package_rows(package_list)]
+        rows = rng.choice(np.array(row_list, dtype=np.int64),
+                          size=min(n_apps, len(row_list)), replace=False)
+
+        return self._to_hashes(rows)
+
+    def latest_versions(self, package_list: list[str]) -> list[str]:
+        """Selects the latest version (highest version code, then newest dex
+        date) of each package.
+
+        Args:
+            package_list (list[str]): Packages.
+
+        Returns:
+            list[str]: Hash of each app selected (packages not indexed are
+                skipped).
+        """
+        return self._to_hashes([rows[-1] for rows
+                                in self._get_package_rows(package_list)])
+
+    def sample_versions(self, package_list: list[str], k: int,
+                        seed: int = None) -> list[str]:
+        """Selects k random versions of each package without replacement
+        (all versions if it has less).
+
+        Args:
+            package_list (list[str]): Packages.
+            k (int): Versions per package.
+            seed (int, optional): Random seed. Defaults to None.
+
+        Returns:
+            list[str]: Hash of each app selected.
+        """
+        rng = np.random.default_rng(seed)
+        row_list = [rng.choice(rows, size=min(k, len(rows)), replace=False)
+                    for rows in self._get_package_rows(package_list)]
+
+        return self._to_hashes(np.concatenate(row_list) if row_list else [])
+
+    def versions_since(self, package_list: list[str],
+                       dex_date: str) -> list[str]:
+        """Selects all versions of each package with a dex date since a date.
+
+        Args:
+            package_list (list[str]): Packages.
+            dex_date (str): Date as on the index file, "YYYY-MM-DD" or 
+                "YYYY-MM-DD hh:mm:ss".
+
+        Returns:
+            list[str]: Hash of each app selected.
+        """
+        since = int((dex_date.replace("-", "").replace(" ", "")
+                     .replace(":", "") + "000000")[:14])
+        dates = self.columns["dex_date"]
+        row_list = [rows[np.asarray(dates[rows]) >= since]
+                    for rows in self._get_package_rows(package_list)]
+
+        return self._to_hashes(np.concatenate(row_list) if row_list else [])
+
+    def _to_hashes(self, rows) -> list[str]:
+        """Returns the hash of rows.
+
+        Args:
+            rows (np.ndarray): Row numbers.
+
+        Returns:
+            list[str]: Hashes (upper case, as on the index file).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return [bytes(digest).hex().upper()
+                for digest in self.columns["hash"][rows]]
+
+    def _get_package_rows(self, package_list: list[str]) -> list[np.ndarray]:
+        """Finds the rows of each package on the inverted index.
+
+        Args:
+            package_list (list[str]): Packages.
+
+        Returns:
+            list[np.ndarray]: Rows of each package found, ordered by version
+                code and dex date.
+        """
+        if self.inverted is None:
+            # No inverted index, group the rows found by scanning
+            rows = self._find_rows_by_package(package_list)
+            order = np.lexsort((self.columns["dex_date"][rows],
+                                self.columns["version_code"][rows],
+                                self.columns["package_key"][rows]))
+            rows = rows[order]
+            keys = np.asarray(self.columns["package_key"][rows])
+            return np.split(rows, np.flatnonzero(np.diff(keys)) + 1
+                            ) if len(rows) else []
+
+        keys = self.inverted["inverted_keys"]
+        offsets = self.inverted["inverted_offsets"]
+        query = np.array(sorted({AndrozooIndex.package_key(p)
+                                 for p in package_list}), dtype="<i8")
+        if len(keys) == 0 or len(query) == 0:
+            return []
+
+        position = np.searchsorted(keys, query).clip(max=len(keys) - 1)
+        found = position[np.asarray(keys[position]) == query]
+
+        return [np.asarray(self.inverted["inverted_rows"][
+                    offsets[i]:offsets[i + 1]]) for i in found]
+
+    def _find_rows_by_package(self, package_list: list[str]) -> np.ndarray:
+        """Finds the rows of the apps with a package.
+
+        Args:
+            package_list (list[str]): Packages.
+
+        Returns:
+            np.ndarray: Row numbers.
+        """
+        if self.inverted is not None:
+            row_list = self._get_package_rows(package_list)
+            return (np.concatenate(row_list) if row_list 
+                    else np.empty(0, dtype=np.int64))
+
+        keys = np.array(sorted({AndrozooIndex.package_key(p)
+                                for p in package_list}), dtype="<i8")
+        if len(keys) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # By chunks, only one chunk of the column is in memory at once
+        column = self.columns["package_key"]
+        row_list = []
+        for start in range(0, self.n_rows, AndrozooIndex.CHUNK_ROWS):
+            chunk = np.asarray(column[start:start + AndrozooIndex.CHUNK_ROWS])
+            position = np.searchsorted(keys, chunk).clip(max=len(keys) - 1)
+            row_list.append(np.flatnonzero(keys[position] == chunk) + start)
+
+        return np.concatenate(row_list)
+
+    @staticmethod
+    def build(index_file: str, directory: str = DIRECTORY) -> int:
+        """Builds the index from the Androzoo index file, replacing the
+        current one when finished.
+
+        Args:
+            index_file (str): Androzoo index file (CSV.gz).
+            directory (str, optional): Index directory. Defaults to
+                DIRECTORY.
+
+        Returns:
+            int: Number of apps indexed.
+        """
+        u.log_normal("Building Androzoo index from %s..." % index_file)
+
+        tmp_directory = directory.rstrip("/") + ".tmp/"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        files = {name: open(os.path.join(tmp_directory, name + ".bin"), 'wb')
+                 for name in AndrozooIndex.COLUMNS}
+        n_rows = 0
+        try:
+            with gzip.open(index_file, 'rt', encoding="utf-8") as index:
+                header = [h.strip().strip('"')
+                          for h in index.readline().split(",")]
+                positions = [header.index(field) for field in (
+                    "sha256", "pkg_name", "vercode", "dex_date", "apk_size")]
+
+                while True:
+                    lines = index.readlines(AndrozooIndex.CHUNK_ROWS * 200)
+                    if not lines:
+                        break
+                    columns = AndrozooIndex._parse_lines(lines, positions)
+                    for (name, values) in columns.items():
+                        files[name].write(values.tobytes())
+                    n_rows += len(columns["package_key"])
+                    u.log_normal("%d apps indexed." % n_rows)
+        finally:
+            for f in files.values():
+                f.close()
+
+        AndrozooIndex._build_inverted(tmp_directory, n_rows)
+
+        with open(os.path.join(tmp_directory, AndrozooIndex.META_FILE), 'w',
+                  encoding="utf8") as f:
+            f.write(json.dumps({"rows": n_rows, "source": index_file,
+                                "columns": AndrozooIndex.COLUMNS,
+                                "inverted": True}))
+
+        # Replace current index
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+
+        u.log_result("Androzoo index built with %d apps." % n_rows)
+
+        return n_rows
+
+    @staticmethod
+    def _build_inverted(directory: str, n_rows: int) -> None:
+        """Builds the inverted index (package to rows) of the columns.
+
+        Args:
+            directory (str): Directory of the columns.
+            n_rows (int): Number of rows.
+        """
+        u.log_normal("Building Androzoo package index...")
+
+        if n_rows == 0:
+            for name in AndrozooIndex.INVERTED_COLUMNS:
+                open(os.path.join(directory, name + ".bin"), 'wb').close()
+            return
+
+        def column(name):
+            return np.memmap(os.path.join(directory, name + ".bin"),
+                             dtype="<i8", mode='r', shape=(n_rows,))
+
+        # Rows by package, then version code, then dex date
+        package_keys = column("package_key")
+        rows = np.lexsort((column("dex_date"), column("version_code"),
+                           package_keys))
+        sorted_keys = np.asarray(package_keys[rows])
+        starts = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], starts))
+        inverted = {
+            "inverted_keys": sorted_keys[starts],
+            "inverted_offsets": np.concatenate((starts, [n_rows])),
+            "inverted_rows": rows
+        }
+        for (name, values) in inverted.items():
+            values.astype("<i8").tofile(os.path.join(directory, name + ".bin"))
+
+        u.log_result("%d packages indexed." % len(starts))
+
+    @staticmethod
+    def _parse_lines(lines: list[str], positions: list[int]) -> dict:
+        """Parses rows of the index file. Rows without a valid hash or with
+        missing fields (truncated) are skipped.
+
+        Args:
+            lines (list[str]): Rows.
+            positions (list[int]): Position of sha256, pkg_name, vercode,
+                dex_date and apk_size fields.
+
+        Returns:
+            dict: {column name: np.ndarray}
+        """
+        (hash_i, package_i, version_i, date_i, size_i) = positions
+        digests = bytearray()
+        package_keys = []
+        version_codes = []
+        dex_dates = []
+        apk_sizes = []
+        for line in lines:
+            row = line.rstrip("\n").split(",")
+            try:
+                digest = bytes.fromhex(row[hash_i])
+                package = row[package_i].strip('"')
+                version_code = AndrozooIndex._to_int(row[version_i])
+                dex_date = AndrozooIndex._to_int(
+                    row[date_i].replace("-", "").replace(" ", "")
+                    .replace(":", ""), 0)
+                apk_size = AndrozooIndex._to_int(row[size_i])
+            except (ValueError, IndexError):
+                continue
+            if len(digest) != 32:
+                continue
+
+            digests += digest
+            package_keys.append(AndrozooIndex.package_key(package))
+            version_codes.append(version_code)
+            dex_dates.append(dex_date)
+            apk_sizes.append(apk_size)
+
+        return {
+            "hash": np.frombuffer(bytes(digests), dtype="u1"),
+            "package_key": np.array(package_keys, dtype="<i8"),
+            "version_code": np.array(version_codes, dtype="<i8"),
+            "dex_date": np.array(dex_dates, dtype="<i8"),
+            "apk_size": np.array(apk_sizes, dtype="<i8")
+        }
+
+    @staticmethod
+    def _to_int(value: str, default: int = -1) -> int:
+        """Parses an integer field.
+
+        Args:
+            value (str): Field (may be quoted or empty).
+            default (int, optional): Value if not an integer. Defaults to -1.
+
+        Returns:
+            int: Value.
+        """
+        try:
+            return int(value.strip('"'))
+        except ValueError:
+            return default
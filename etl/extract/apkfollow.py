@@ -43,7 +43,7 @@ class Apkfollow(WebSource):
         if len(link_list) > 0:
             return link_list[0].split("/")[-2]
         
-        self.driver.close()
+        self.close()
         
         return None
     
@@ -72,7 +72,7 @@ class Apkfollow(WebSource):
         # Cloudfare detection
         if len(link_list) == 0:
             u.log_error("Cloudfare.", "Detected as bot.")
-            self.driver.close()
+            self.close()
             return None
         
         super()._load_content_page(link_list[0])
@@ -86,7 +86,7 @@ class Apkfollow(WebSource):
         # Cloudfare detection
         if len(d_links) == 0:
             u.log_error("Cloudfare.", "Detected as bot.")
-            self.driver.close()
+            self.close()
             return None
         
         # Download app
@@ -94,10 +94,11 @@ class Apkfollow(WebSource):
         if not filename:
             u.log_error("File not found.", "Downloading %s error." 
                         % d_links[0])
-            self.driver.close()
+            self.close()
             return None
         
-        u.log_result(Apkfollow.DOWNLOAD_DIR_REL + filename + " downloaded.")
+        apk_dir = self._finalize_download(filename)
+        u.log_result(apk_dir + " downloaded.")
         
-        return Apkfollow.DOWNLOAD_DIR_REL + filename
+        return apk_dir
         
\ No newline at end of file
@@ -44,7 +44,7 @@ class Apkmonk(WebSource):
         if len(link_list) > 0:
             return link_list[0].split("/")[-2]
         
-        self.driver.close()
+        self.close()
         
         return None
     
@@ -72,7 +72,7 @@ class Apkmonk(WebSource):
         # Cloudfare detection
         if len(download_links) == 0:
             u.log_error("Cloudfare.", "Detected as bot.")
-            self.driver.close()
+            self.close()
             return None
         
         # Download app
@@ -80,10 +80,11 @@ class Apkmonk(WebSource):
         if not filename:
             u.log_error("File not found.", "Downloading %s error." 
                         % download_links[0])
-            self.driver.close()
+            self.close()
             return None
         
-        u.log_result(Apkmonk.DOWNLOAD_DIR_REL + filename + " downloaded.")
+        apk_dir = self._finalize_download(filename)
+        u.log_result(apk_dir + " downloaded.")
         
-        return Apkmonk.DOWNLOAD_DIR_REL + filename
+        return apk_dir
         
\ No newline at end of file
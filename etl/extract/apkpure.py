@@ -34,7 +34,7 @@ class APKPure(WebSource):
         
         result = self._find_app_by_name(package)
         if not result:
-            self.driver.close()
+            self.close()
             u.log_warning("Empty list.", "No package " + package + " found on "
                           + "APKPure website.")
             return None
@@ -70,33 +70,34 @@ class APKPure(WebSource):
         download_links = [l for l in download_links if l]
         download_links = [l for l in download_links if "?version=latest" in l]
         if len(download_links) == 0:
-            self.driver.close()
+            self.close()
             u.log_error("File not found.", "Downloading error.")
             return None
         
         # Download app
         filename = super()._download_file_page(download_links[0])
         if not filename:
-            self.driver.close()
+            self.close()
             u.log_error("File not found.", "Downloading %s error." 
                         % download_links[0])
             return None
         
         # Si es XAPK hay que extraer la APK
         if ".xapk" in filename:
-            with zipfile.ZipFile(APKPure.DOWNLOAD_DIR_REL+filename, 'r') as z:
-                z.extract(package + ".apk", APKPure.DOWNLOAD_DIR_REL)
+            with zipfile.ZipFile(self.DOWNLOAD_DIR_REL+filename, 'r') as z:
+                z.extract(package + ".apk", self.DOWNLOAD_DIR_REL)
                 z.close()
                 
-            remove(APKPure.DOWNLOAD_DIR_REL+filename)
+            remove(self.DOWNLOAD_DIR_REL+filename)
                 
             apk_filename = package + ".apk"
         else:
             apk_filename = filename
         
-        u.log_result(APKPure.DOWNLOAD_DIR_REL + apk_filename + " downloaded.")
+        apk_dir = self._finalize_download(apk_filename)
+        u.log_result(apk_dir + " downloaded.")
         
-        return APKPure.DOWNLOAD_DIR_REL + apk_filename
+        return apk_dir
     
     def _find_app_by_name(self, name: str) -> tuple[str, str]:
         """Finds app by package.
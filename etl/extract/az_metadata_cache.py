@@ -0,0 +1,108 @@
+from threading import Lock
+from time import time
+import json
+import sqlite3
+
+from common.util import Util as u
+
+
+class AzMetadataCache:
+    """Process-wide persistent cache of AndrozooGP responses by (package,
+    version_code). Versions without metadata are cached too (as an empty
+    list) for a shorter time. Responses are stored on a SQLite database.
+
+    TTLs can be set on config file "AZ_METADATA_CACHE" section:
+    {"db_file": str, "ttl": seconds, "negative_ttl": seconds}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    DB_FILE = "data/az_metadata_cache.sqlite"
+    TTL = 7 * 24 * 3600          # Androzoo adds new snapshots over time
+    NEGATIVE_TTL = 24 * 3600     # Retry versions without metadata next day
+
+    _cache = None
+    _lock = Lock() # Prevents threads to create more than one cache.
+
+    @staticmethod
+    def get_cache() -> "AzMetadataCache":
+        """Returns or creates the unique cache.
+
+        Returns:
+            AzMetadataCache: Cache.
+        """
+        with AzMetadataCache._lock:
+            if not AzMetadataCache._cache:
+                AzMetadataCache._cache = AzMetadataCache()
+
+        return AzMetadataCache._cache
+
+    def __init__(self) -> None:
+        """Creates a cache opening (or creating) its database.
+        """
+        db_file = AzMetadataCache.DB_FILE
+        self.ttl = AzMetadataCache.TTL
+        self.negative_ttl = AzMetadataCache.NEGATIVE_TTL
+        try:
+            with open(AzMetadataCache.CONFIG_FILE, '+r',
+                      encoding="utf8") as config:
+                cache_config = json.loads(config.read())["AZ_METADATA_CACHE"]
+                db_file = cache_config.get("db_file", db_file)
+                self.ttl = cache_config.get("ttl", self.ttl)
+                self.negative_ttl = cache_config.get("negative_ttl",
+                                                     self.negative_ttl)
+        except:
+            pass
+
+        self.lock = Lock() # Protects db
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS az_metadata ("
+                + "package TEXT NOT NULL, "
+                + "version_code TEXT NOT NULL, "
+                + "response TEXT NOT NULL, "
+                + "stored_at REAL NOT NULL, "
+                + "PRIMARY KEY (package, version_code));")
+
+    def get(self, package: str, version_code: str) -> tuple[bool, list]:
+        """Looks up the AndrozooGP response of an app version.
+
+        Args:
+            package (str): Package of the app.
+            version_code (str): Version code of the app.
+
+        Returns:
+            tuple[bool, list]: (fresh, response). fresh is False if the
+                version is not cached or its entry expired. response is the
+                list of raw AzMetadata (None if not cached).
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, stored_at FROM az_metadata "
+                + "WHERE package = ? AND version_code = ?;",
+                (package, str(version_code))).fetchone()
+        if not row:
+            return (False, None)
+
+        (response, stored_at) = row
+        response = json.loads(response)
+        ttl = self.ttl if response else self.negative_ttl
+
+        return (time() - stored_at < ttl, response)
+
+    def put(self, package: str, version_code: str, response: list) -> None:
+        """Stores the AndrozooGP response of an app version.
+
+        Args:
+            package (str): Package of the app.
+            version_code (str): Version code of the app.
+            response (list): List of raw AzMetadata (empty if none).
+        """
+        try:
+            with self.lock, self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO az_metadata VALUES (?, ?, ?, ?);",
+                    (package, str(version_code), json.dumps(response), time()))
+        except sqlite3.Error:
+            u.log_error("Cache fail.", "Could not store %s metadata."
+                        % package)
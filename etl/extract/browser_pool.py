@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from threading import Condition, Lock
+from time import time
+import json
+import os
+
+from common.util import Util as u
+
+
+class BrowserSession:
+    """Headless Firefox session of the pool with its own download directory.
+    """
+
+    def __init__(self, slot: int, download_dir_rel: str, 
+                 download_dir: str) -> None:
+        """Launches the browser.
+
+        Args:
+            slot (int): Slot of the pool taken by the session.
+            download_dir_rel (str): Download directory relative to warehouse
+                (ends with "/").
+            download_dir (str): Absolute download directory (ends with "/").
+        """
+        self.slot = slot
+        self.download_dir_rel = download_dir_rel
+        self.download_dir = download_dir
+        self.n_uses = 0
+        os.makedirs(download_dir_rel, exist_ok=True)
+
+        opt = webdriver.FirefoxOptions()
+        opt.set_preference("browser.download.folderList", 2)
+        opt.set_preference("browser.download.manager.showWhenStarting", False)
+        opt.set_preference("browser.download.dir", download_dir)
+        opt.set_preference("browser.helperApps.neverAsk.saveToDisk",
+                           "application/vnd.android.package-archive")
+        opt.set_preference("browser.download.manager.quitBehavior", 2)
+        opt.add_argument("--headless")
+        opt.add_argument("-remote-allow-system-access") # Browser context
+        self.driver = webdriver.Firefox(options=opt)
+
+    def reset(self) -> bool:
+        """Leaves the session as new for the next user: blank page, no
+        cookies, empty download directory and default page load timeout.
+
+        Returns:
+            bool: True if the browser is healthy and clean else False.
+        """
+        try:
+            self.driver.set_page_load_timeout(BrowserPool.PAGE_LOAD_TIMEOUT)
+            # WebDriver only deletes the cookies of the current document,
+            # the ones of every site are removed from the browser context
+            self.driver.delete_all_cookies()
+            with self.driver.context(self.driver.CONTEXT_CHROME):
+                self.driver.execute_script("Services.cookies.removeAll();")
+            self.driver.get("about:blank")
+        except WebDriverException:
+            return False
+
+        for file in os.listdir(self.download_dir_rel):
+            try:
+                os.remove(self.download_dir_rel + file)
+            except OSError:
+                pass # Download still open
+
+        return True
+
+    def quit(self) -> None:
+        """Quits the browser.
+        """
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """Process-wide bounded pool of headless browser sessions shared by all
+    scrapers. Sessions are recycled after MAX_USES uses or when they crash.
+
+    Size and max uses can be set on config file "BROWSER_POOL" section:
+    {"pool_size": int, "max_uses": int}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    DOWNLOAD_DIR_REL = "data/app_downloads/"
+    POOL_SIZE = 6 # An app acquisition race (5 live sources) and one more
+    MAX_USES = 20
+    CHECKOUT_TIMEOUT = 600
+    PAGE_LOAD_TIMEOUT = 300 # Selenium default, users may set a shorter one
+
+    _pool = None
+    _lock = Lock() # Prevents threads to create more than one pool.
+
+    @staticmethod
+    def get_pool() -> "BrowserPool":
+        """Returns or creates the unique pool.
+
+        Returns:
+            BrowserPool: Pool.
+        """
+        with BrowserPool._lock:
+            if not BrowserPool._pool:
+                BrowserPool._pool = BrowserPool()
+
+        return BrowserPool._pool
+
+    def __init__(self) -> None:
+        """Creates an empty pool, browsers are launched on demand.
+        """
+        self.absolute_path = os.getcwd() + "/"
+        self.size = BrowserPool.POOL_SIZE
+        self.max_uses = BrowserPool.MAX_USES
+        try:
+            with open(BrowserPool.CONFIG_FILE, '+r', encoding="utf8") as config:
+                data = json.loads(config.read())
+                self.absolute_path = data["ABSOLUTE_PATH_OF_WAREHOUSE"]
+                pool_config = data.get("BROWSER_POOL", {})
+                self.size = pool_config.get("pool_size", self.size)
+                self.max_uses = pool_config.get("max_uses", self.max_uses)
+        except:
+            pass
+
+        self.condition = Condition()
+        self.idle_sessions = []
+        self.free_slots = list(range(self.size)) # Download dir of sessions
+
+    def acquire(self) -> BrowserSession:
+        """Checks out a session. Waits for a free one when the pool is full.
+
+        Raises:
+            TimeoutError: No session was released in time.
+            WebDriverException: The new browser could not be reset.
+
+        Returns:
+            BrowserSession: Clean session.
+        """
+        end_time = time() + BrowserPool.CHECKOUT_TIMEOUT
+        with self.condition:
+            while not self.idle_sessions and not self.free_slots:
+                remaining = end_time - time()
+                if remaining <= 0:
+                    raise TimeoutError("No browser session available.")
+                self.condition.wait(remaining)
+
+            if self.idle_sessions:
+                session = self.idle_sessions.pop()
+                slot = None
+            else:
+                session = None
+                slot = self.free_slots.pop()
+
+        if session:
+            session.n_uses += 1
+            return session
+
+        # Launch a new browser out of the lock (takes seconds)
+        download_dir_rel = BrowserPool.DOWNLOAD_DIR_REL + "session_%d/" % slot
+        session = None
+        try:
+            session = BrowserSession(slot, download_dir_rel,
+                                     self.absolute_path + download_dir_rel)
+            if not session.reset():
+                raise WebDriverException("Browser session could not be "
+                                         "reset.")
+        except Exception:
+            if session:
+                session.quit()
+            with self.condition:
+                self.free_slots.append(slot)
+                self.condition.notify()
+            raise
+        session.n_uses += 1
+
+        return session
+
+    def release(self, session: BrowserSession, discard: bool = False) -> None:
+        """Returns a session to the pool. Sessions that crashed or reached
+        max uses are quitted.
+
+        Args:
+            session (BrowserSession): Session checked out.
+            discard (bool, optional): Quit the session. Defaults to False.
+        """
+        if discard or session.n_uses >= self.max_uses or not session.reset():
+            session.quit()
+            with self.condition:
+                self.free_slots.append(session.slot)
+                self.condition.notify()
+            return
+
+        with self.condition:
+            self.idle_sessions.append(session)
+            self.condition.notify()
+
+    @contextmanager
+    def session(self):
+        """Checks out a session, returning it to the pool when finished. The
+        session is discarded if the browser crashed.
+
+        Yields:
+            BrowserSession: Clean session.
+        """
+        session = self.acquire()
+        discard = False
+        try:
+            yield session
+        except WebDriverException:
+            discard = True
+            raise
+        finally:
+            self.release(session, discard)
+
+    def close(self) -> None:
+        """Quits all idle sessions.
+        """
+        with self.condition:
+            session_list = self.idle_sessions
+            self.idle_sessions = []
+            for session in session_list:
+                self.free_slots.append(session.slot)
+            self.condition.notify_all()
+
+        for session in session_list:
+            session.quit()
+        u.log_normal("%d browser sessions closed." % len(session_list))
@@ -0,0 +1,166 @@
+from threading import Lock
+from time import time
+import json
+import os
+
+from common.util import Util as u
+
+
+class CategoryCache:
+    """Process-wide persistent cache of Play Store categories by package.
+    Packages not found on Play Store are cached too (as None) for a shorter
+    time. Entries are appended to a local file, one JSON object per line.
+
+    TTLs can be set on config file "CATEGORY_CACHE" section: {"ttl": seconds,
+    "negative_ttl": seconds}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    LOCAL_FILE = "data/play_store_downloads/category_cache.jsonl"
+    TTL = 30 * 24 * 3600         # Categories rarely change
+    NEGATIVE_TTL = 24 * 3600     # Retry not found packages next day
+
+    _cache = None
+    _lock = Lock() # Prevents threads to create more than one cache.
+
+    @staticmethod
+    def get_cache() -> "CategoryCache":
+        """Returns or creates the unique cache.
+
+        Returns:
+            CategoryCache: Cache.
+        """
+        with CategoryCache._lock:
+            if not CategoryCache._cache:
+                CategoryCache._cache = CategoryCache()
+
+        return CategoryCache._cache
+
+    def __init__(self) -> None:
+        """Creates a cache loading the local file.
+        """
+        self.ttl = CategoryCache.TTL
+        self.negative_ttl = CategoryCache.NEGATIVE_TTL
+        try:
+            with open(CategoryCache.CONFIG_FILE, '+r',
+                      encoding="utf8") as config:
+                cache_config = json.loads(config.read())["CATEGORY_CACHE"]
+                self.ttl = cache_config.get("ttl", self.ttl)
+                self.negative_ttl = cache_config.get("negative_ttl",
+                                                     self.negative_ttl)
+        except:
+            pass
+
+        self.lock = Lock()
+        self.entries = {} # {package: (category, stored_at)}
+        self.seeded = False
+        self._load()
+
+    def _load(self) -> None:
+        """Loads the local file. Rewrites it if it has many stale lines.
+        """
+        n_lines = 0
+        try:
+            with open(CategoryCache.LOCAL_FILE, 'r', encoding="utf8") as f:
+                for line in f:
+                    n_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # Partial line of an interrupted write
+                    self.entries[entry["package"]] = (entry["category"],
+                                                      entry["stored_at"])
+        except OSError:
+            return
+
+        if n_lines > 2 * len(self.entries):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrites local file with one line per package.
+        """
+        tmp_file = CategoryCache.LOCAL_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding="utf8") as f:
+            for (package, (category, stored_at)) in self.entries.items():
+                f.write(CategoryCache._line(package, category, stored_at))
+        os.replace(tmp_file, CategoryCache.LOCAL_FILE)
+
+    @staticmethod
+    def _line(package: str, category: str, stored_at: float) -> str:
+        """Returns the local file line of an entry.
+
+        Args:
+            package (str): Package of the app.
+            category (str): Category. None if not found.
+            stored_at (float): Timestamp of the entry.
+
+        Returns:
+            str: Line.
+        """
+        return json.dumps({"package": package, "category": category,
+                           "stored_at": stored_at}) + "\n"
+
+    def get(self, package: str) -> tuple[bool, str]:
+        """Looks up the category of a package.
+
+        Args:
+            package (str): Package of the app.
+
+        Returns:
+            tuple[bool, str]: (fresh, category). fresh is False if the
+                package is not cached or its entry expired. category is the
+                last known category (None if unknown or not found).
+        """
+        with self.lock:
+            entry = self.entries.get(package)
+        if not entry:
+            return (False, None)
+
+        (category, stored_at) = entry
+        ttl = self.ttl if category else self.negative_ttl
+
+        return (time() - stored_at < ttl, category)
+
+    def put(self, package: str, category: str) -> None:
+        """Stores the category of a package.
+
+        Args:
+            package (str): Package of the app.
+            category (str): Category. None if not found.
+        """
+        stored_at = time()
+        with self.lock:
+            self.entries[package] = (category, stored_at)
+            try:
+                os.makedirs(os.path.dirname(CategoryCache.LOCAL_FILE),
+                            exist_ok=True)
+                with open(CategoryCache.LOCAL_FILE, 'a',
+                          encoding="utf8") as f:
+                    f.write(CategoryCache._line(package, category, stored_at))
+            except OSError:
+                u.log_error("Cache fail.", "Could not store %s category."
+                            % package)
+
+    def seed(self, category_dict: dict[str, str]) -> None:
+        """Adds known categories (e.g. of apps on the warehouse). Packages
+        already cached are not changed.
+
+        Args:
+            category_dict (dict[str, str]): {package: category}
+        """
+        stored_at = time()
+        with self.lock:
+            new_entries = {package: (category, stored_at)
+                           for (package, category) in category_dict.items()
+                           if category and package not in self.entries}
+            self.entries.update(new_entries)
+            self.seeded = True
+            try:
+                if new_entries:
+                    os.makedirs(os.path.dirname(CategoryCache.LOCAL_FILE),
+                                exist_ok=True)
+                    self._compact()
+            except OSError:
+                u.log_error("Cache fail.", "Could not store categories.")
+
+        u.log_normal("%d categories added to cache." % len(new_entries))
@@ -59,7 +59,7 @@ class Evozi(WebSource):
         if "text-success" not in element.get_attribute("innerHTML"):
             u.log_warning("Empty list.", "No package " + package + " found on "
                           + "Evozi website.")
-            self.driver.close()
+            self.close()
             return None
         
         link_elements = self.driver.find_elements(By.TAG_NAME, "a")
@@ -73,7 +73,7 @@ class Evozi(WebSource):
         else:
             u.log_warning("Empty list.", "No apk " + package + " found on "
                           + "Evozi website.")
-            self.driver.close()
+            self.close()
             return None
         
         return package
@@ -99,12 +99,13 @@ class Evozi(WebSource):
         # Download app
         filename = super()._download_file_page(self.download_url)
         if not filename:
-            self.driver.close()
+            self.close()
             u.log_error("File not found.", "Downloading %s error." 
                         % self.download_url)
             return None
         
-        u.log_result(Evozi.DOWNLOAD_DIR_REL + filename + " downloaded.")
+        apk_dir = self._finalize_download(filename)
+        u.log_result(apk_dir + " downloaded.")
         
-        return Evozi.DOWNLOAD_DIR_REL + filename
+        return apk_dir
         
\ No newline at end of file
@@ -34,7 +34,7 @@ class FDroid(WebSource):
         
         result = self._find_app_by_name(package)
         if not result:
-            self.driver.close()
+            self.close()
             u.log_warning("Empty list.", "No package " + package + " found on "
                           + "F-Droid website.")
             return None
@@ -71,22 +71,23 @@ class FDroid(WebSource):
         download_links = [l for l in download_links if l.split(".")[-1] == "apk"][1:]
 
         if len(download_links) == 0:
-            self.driver.close()
+            self.close()
             u.log_error("File not found.", "Downloading error.")
             return None
     
         # Download app
         filename = super()._download_file_page(download_links[0])
         if not filename:
-            self.driver.close()
+            self.close()
             u.log_error("File not found.", "Downloading %s error." 
                         % download_links[0])
             return None
         apk_filename = filename
         
-        u.log_result(FDroid.DOWNLOAD_DIR_REL + apk_filename + " downloaded.")
+        apk_dir = self._finalize_download(apk_filename)
+        u.log_result(apk_dir + " downloaded.")
         
-        return FDroid.DOWNLOAD_DIR_REL + apk_filename
+        return apk_dir
     
     def _find_app_by_name(self, name: str) -> tuple[str, str]:
         """Finds app by package.
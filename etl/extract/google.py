@@ -2,7 +2,6 @@ import requests
 import base64
 from lxml.etree import XML
 import time
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from alive_progress import alive_bar
 import json
@@ -12,6 +11,8 @@ from common.domain.android_permission import AndroidPermission
 from common.domain.android_permission_group import AndroidPermissionGroup
 from common.util import Util as u
 
+from etl.extract.browser_pool import BrowserPool
+
 
 class ProtectionLevel:
     """Represent protection level map. Data extracted from Android developers 
@@ -72,6 +73,7 @@ class AndroidDevelopersWeb:
                  "reference/android/Manifest.permission_group")
     SLEEP_TIME = 1
     TIMEOUT = 5
+    PAGE_LOAD_TIMEOUT = 120 # Permission page is several MB
     
     def __init__(self, url: str) -> None:
         """Creates an AndroidDevelopersWeb object.
@@ -83,24 +85,30 @@ class AndroidDevelopersWeb:
         """
         u.log_normal("Finding content on " + url + "...")
         
-        # Load page
-        opt = webdriver.FirefoxOptions()
-        opt.add_argument("--headless")
-        self.driver = webdriver.Firefox(options=opt)
-        self.driver.get(url)
-        
-        # Wait for content
-        end_time = time.time() + self.TIMEOUT
-        while(len(self.driver.find_elements(By.TAG_NAME, "h3")) == 0):
-            time.sleep(self.SLEEP_TIME)
-            if(time.time() > end_time):
-                u.log_error("Timeout.", "Could not load page %s." % url)
-                break
-        
-        # Store content
-        element_list = self.driver.find_elements(By.TAG_NAME, "h3")
-        element_ids = map(lambda x: x.get_attribute("id"), element_list)
-        self.element_list = list(zip(element_ids, element_list))
+        # Load page (the session is kept until close_driver(), elements are
+        # read later)
+        self.session = BrowserPool.get_pool().acquire()
+        self.driver = self.session.driver
+        try:
+            self.driver.set_page_load_timeout(self.PAGE_LOAD_TIMEOUT)
+            self.driver.get(url)
+            
+            # Wait for content
+            end_time = time.time() + self.TIMEOUT
+            while(len(self.driver.find_elements(By.TAG_NAME, "h3")) == 0):
+                time.sleep(self.SLEEP_TIME)
+                if(time.time() > end_time):
+                    u.log_error("Timeout.", "Could not load page %s." % url)
+                    break
+            
+            # Store content
+            element_list = self.driver.find_elements(By.TAG_NAME, "h3")
+            element_ids = map(lambda x: x.get_attribute("id"), element_list)
+            self.element_list = list(zip(element_ids, element_list))
+        except Exception:
+            BrowserPool.get_pool().release(self.session, discard=True)
+            self.session = None
+            raise
         
         u.log_result("%d elements found." % len(self.element_list))
         
@@ -127,9 +135,11 @@ class AndroidDevelopersWeb:
         return None
     
     def close_driver(self):
-        """Close browser.
+        """Returns browser to the pool.
         """
-        self.driver.close()  
+        if self.session:
+            BrowserPool.get_pool().release(self.session)
+            self.session = None
         
         
 class BaseFrameworkAndroidManifest:
@@ -160,9 +170,13 @@ class BaseFrameworkAndroidManifest:
         self.permission_web = AndroidDevelopersWeb(
             AndroidDevelopersWeb.PERMISSION_URL
         )
-        self.permission_group_web = AndroidDevelopersWeb(
-            AndroidDevelopersWeb.GROUP_URL
-        )
+        try:
+            self.permission_group_web = AndroidDevelopersWeb(
+                AndroidDevelopersWeb.GROUP_URL
+            )
+        except Exception:
+            self.permission_web.close_driver()
+            raise
         
         u.log_result("AndroidManifest downloaded.")
         
@@ -177,27 +191,29 @@ class BaseFrameworkAndroidManifest:
         u.log_normal("Extracting groups and permissions from " 
                      + "AndroidManifest.xml...")
         
-        if(local and path.exists(BaseFrameworkAndroidManifest.LOCAL_GROUPS) 
-           and path.exists(BaseFrameworkAndroidManifest.LOCAL_PERMISSION)):
-            # All data were downloaded previously
+        try:
+            if(local 
+               and path.exists(BaseFrameworkAndroidManifest.LOCAL_GROUPS) 
+               and path.exists(BaseFrameworkAndroidManifest.LOCAL_PERMISSION)):
+                # All data were downloaded previously
+                return
+            
+            # Remove old data
+            if path.exists(BaseFrameworkAndroidManifest.LOCAL_GROUPS):
+                remove(BaseFrameworkAndroidManifest.LOCAL_GROUPS)
+            if path.exists(BaseFrameworkAndroidManifest.LOCAL_PERMISSION):
+                remove(BaseFrameworkAndroidManifest.LOCAL_PERMISSION)
             
+            # Extract new data
+            with open(BaseFrameworkAndroidManifest.LOCAL_GROUPS, "+a") as f:
+                f.write(json.dumps(self.get_aosp_permission_groups(), 
+                                   indent=2))
+            with open(BaseFrameworkAndroidManifest.LOCAL_PERMISSION, 
+                      "+a") as f:
+                f.write(json.dumps(self.get_aosp_permissions(), indent=2))
+        finally:
             self.permission_group_web.close_driver()
             self.permission_web.close_driver()
-            return
-        
-        # Remove old data
-        if path.exists(BaseFrameworkAndroidManifest.LOCAL_GROUPS):
-            remove(BaseFrameworkAndroidManifest.LOCAL_GROUPS)
-        if path.exists(BaseFrameworkAndroidManifest.LOCAL_PERMISSION):
-            remove(BaseFrameworkAndroidManifest.LOCAL_PERMISSION)
-        
-        # Extract new data
-        with open(BaseFrameworkAndroidManifest.LOCAL_GROUPS, "+a") as f:
-            f.write(json.dumps(self.get_aosp_permission_groups(), indent=2))
-        with open(BaseFrameworkAndroidManifest.LOCAL_PERMISSION, "+a") as f:
-            f.write(json.dumps(self.get_aosp_permissions(), indent=2))
-        self.permission_group_web.close_driver()
-        self.permission_web.close_driver()
         
         u.log_result("Groups and permission extracted to: " 
                      + BaseFrameworkAndroidManifest.LOCAL_GROUPS + " and " 
@@ -0,0 +1,88 @@
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from threading import Lock
+import requests
+import json
+
+from common.util import Util as u
+
+
+class HttpSession:
+    """Process-wide pooled HTTP session for plain page fetches. Connections
+    are kept alive and reused between requests to the same host.
+
+    Pool size can be set on config file "HTTP_SESSION" section:
+    {"pool_size": int, "retries": int}.
+    """
+
+    CONFIG_FILE = "data/config.json"
+    POOL_SIZE = 16
+    RETRIES = 2
+    TIMEOUT = 10
+    HEADERS = {
+        "User-Agent": ("Mozilla/5.0 (X11; Linux x86_64; rv:109.0) "
+                       "Gecko/20100101 Firefox/115.0"),
+        "Accept-Language": "en-US,en;q=0.5"
+    }
+
+    _session = None
+    _lock = Lock() # Prevents threads to create more than one session.
+
+    @staticmethod
+    def get_session() -> "HttpSession":
+        """Returns or creates the unique session.
+
+        Returns:
+            HttpSession: Session.
+        """
+        with HttpSession._lock:
+            if not HttpSession._session:
+                HttpSession._session = HttpSession()
+
+        return HttpSession._session
+
+    def __init__(self) -> None:
+        """Creates the session and its connection pool.
+        """
+        pool_size = HttpSession.POOL_SIZE
+        retries = HttpSession.RETRIES
+        try:
+            with open(HttpSession.CONFIG_FILE, '+r', encoding="utf8") as config:
+                http_config = json.loads(config.read())["HTTP_SESSION"]
+                pool_size = http_config.get("pool_size", pool_size)
+                retries = http_config.get("retries", retries)
+        except:
+            pass
+
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(HttpSession.HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_text(self, url: str, params: dict = None) -> str:
+        """Fetches a page.
+
+        Args:
+            url (str): Url of the page.
+            params (dict, optional): Query parameters. Defaults to None.
+
+        Returns:
+            str: Page content. None if it could not be fetched.
+        """
+        try:
+            response = self.session.get(url, params=params,
+                                        timeout=HttpSession.TIMEOUT)
+        except requests.RequestException:
+            u.log_warning("Connection fail.", "Could not fetch %s." % url)
+            return None
+
+        if response.status_code != 200:
+            u.log_warning("Connection fail.", "%s returned %d."
+                          % (url, response.status_code))
+            return None
+
+        return response.text
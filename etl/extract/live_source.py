@@ -5,11 +5,13 @@ from selenium.webdriver.common.by import By
 from threading import Lock
 from os import listdir
 import time
+import os
 import requests
-import json
 
 from common.util import Util as u
 
+from etl.extract.browser_pool import BrowserPool
+
 
 class LiveSource(ABC):
     """Interface of a live source.
@@ -60,6 +62,12 @@ class LiveSource(ABC):
         """
         pass
     
+    def close(self) -> None:
+        """Releases the resources of the source (e.g. browser). Safe to call
+        more than once.
+        """
+        pass
+    
     
 class WebSource(LiveSource):
     """Represents a website live source.
@@ -68,31 +76,24 @@ class WebSource(LiveSource):
     SLEEP_TIME = 1
     TIMEOUT = 5
     BIG_TIMEOUT = 600
+    PAGE_LOAD_TIMEOUT = 5
     NAME = None
     BASE_URL = None
-    CONFIG_FILE = "data/config.json"
     
     def __init__(self) -> None:
-        """Creates a WebSource object. When download finish closes the browser.
+        """Creates a WebSource object with a browser session of the pool. 
+        Files are downloaded to the session download dir. When download 
+        finish the file is moved out and the session is returned to the pool.
         """
+        self.session = BrowserPool.get_pool().acquire()
+        self.driver = self.session.driver
         try:
-            with open(WebSource.CONFIG_FILE, '+r', encoding="utf8") as config:
-                path = json.loads(config.read())["ABSOLUTE_PATH_OF_WAREHOUSE"]
-                LiveSource.DOWNLOAD_DIR = path + LiveSource.DOWNLOAD_DIR_REL
-        except:
-            pass
-        
-        # Prepare the browser to download files
-        opt = webdriver.FirefoxOptions()
-        opt.set_preference("browser.download.folderList", 2)
-        opt.set_preference("browser.download.manager.showWhenStarting", False)
-        opt.set_preference("browser.download.dir", LiveSource.DOWNLOAD_DIR)
-        opt.set_preference("browser.helperApps.neverAsk.saveToDisk", 
-                           "application/vnd.android.package-archive")
-        opt.set_preference("browser.download.manager.quitBehavior", 2)
-        opt.add_argument("--headless")
-        self.driver = webdriver.Firefox(options=opt)
-        self.driver.set_page_load_timeout(5)
+            self.driver.set_page_load_timeout(WebSource.PAGE_LOAD_TIMEOUT)
+        except Exception:
+            BrowserPool.get_pool().release(self.session, discard=True)
+            raise
+        self.DOWNLOAD_DIR = self.session.download_dir
+        self.DOWNLOAD_DIR_REL = self.session.download_dir_rel
         
     def get_name(self) -> str:
         """Returns the source name.
@@ -109,11 +110,19 @@ class WebSource(LiveSource):
             bool: True if it is alive else False.
         """
         try:
-            requests.get(self.BASE_URL)
+            requests.get(self.BASE_URL, timeout=WebSource.TIMEOUT)
         except Exception:
             return False
         
         return True
+    
+    def close(self) -> None:
+        """Returns the browser session to the pool. Safe to call more than 
+        once.
+        """
+        if self.session:
+            BrowserPool.get_pool().release(self.session)
+            self.session = None
         
     def find_app(self, package: str) -> str:
         """Search in source for "package".
@@ -169,7 +178,8 @@ class WebSource(LiveSource):
         filename = None
         
         # Start download
-        result = DownloadDir().start_download(url, self.driver)
+        result = DownloadDir().start_download(url, self.driver, 
+                                              self.DOWNLOAD_DIR_REL)
         if result:
             filename, tmp_filename = result
         else:
@@ -179,17 +189,31 @@ class WebSource(LiveSource):
         
         # Wait app download
         end_time = time.time() + WebSource.BIG_TIMEOUT
-        while tmp_filename in listdir(WebSource.DOWNLOAD_DIR):
+        while tmp_filename in listdir(self.DOWNLOAD_DIR):
             if(time.time() > end_time):
                 u.log_error("Timeout.", "%s download timeout reached." 
                             % self.get_name())
                 break
             time.sleep(5)
-            
-        self.driver.close()
         
         return filename
     
+    def _finalize_download(self, filename: str) -> str:
+        """Moves a finished download out of the session download dir (it is 
+        emptied for the next user) and returns the session to the pool.
+
+        Args:
+            filename (str): Filename downloaded on the session download dir.
+
+        Returns:
+            str: File directory.
+        """
+        apk_dir = LiveSource.DOWNLOAD_DIR_REL + filename
+        os.replace(self.DOWNLOAD_DIR_REL + filename, apk_dir)
+        self.close()
+        
+        return apk_dir
+    
 class Singleton(type):
     """Singleton design pattern.
     """
@@ -212,29 +236,34 @@ class Singleton(type):
 
 
 class DownloadDir(metaclass=Singleton):
-    """Represents app download directory.
+    """Represents app download directories.
     """
     
-    DOWNLOAD_DIR_REL = "data/app_downloads/"
     TIMEOUT = 5
     
     def __init__(self) -> None:
         self.lock = Lock()
+        self.dir_locks = {} # {download_dir: Lock}
     
-    def start_download(self, url: str, driver: webdriver.Firefox) -> str:
+    def start_download(self, url: str, driver: webdriver.Firefox,
+                       download_dir: str) -> str:
         """Get url on driver passed.
 
         Args:
             url (str): Url to get.
             driver (webdriver.Firefox): Webdriver to use.
+            download_dir (str): Download dir of the webdriver.
 
         Returns:
             tuple[str, str]: (filename, tmp_file) of started download
         """
-        # Sensible code.
         with self.lock:
+            dir_lock = self.dir_locks.setdefault(download_dir, Lock())
+        
+        # Sensible code (per download dir).
+        with dir_lock:
             # List content of dir
-            old_content = listdir(DownloadDir.DOWNLOAD_DIR_REL)
+            old_content = listdir(download_dir)
             
             # Start download (only one download can start here)
             try:
@@ -245,7 +274,7 @@ class DownloadDir(metaclass=Singleton):
             # Wait for new file appear
             end_time = time.time() + DownloadDir.TIMEOUT
             while True:
-                new_content = listdir(DownloadDir.DOWNLOAD_DIR_REL)
+                new_content = listdir(download_dir)
                 dif = [file for file in new_content if file not in old_content]
                 
                 # No tmp file (already downloaded?)
@@ -1,11 +1,35 @@
 from os import path
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from lxml import html as lxml_html
+from urllib.parse import urlparse, parse_qs
 import time
+import json
 import re
         
 from common.util import Util as u
 
+from etl.extract.browser_pool import BrowserPool
+from etl.extract.category_cache import CategoryCache
+from etl.extract.http_session import HttpSession
+
+
+def _parse_html(page: str):
+    """Parses an html page.
+
+    Args:
+        page (str): Page content.
+
+    Returns:
+        lxml.html.HtmlElement: Document root. None if it can't be parsed.
+    """
+    if not page:
+        return None
+    try:
+        return lxml_html.fromstring(page)
+    except Exception:
+        return None
+
 
 class CategoryFinder:
     """Find all possible categories on Google Play based on web support.
@@ -29,23 +53,97 @@ class CategoryFinder:
             
     def get_app_category(self, package: str, 
                          driver: webdriver.Firefox = None) -> str:
-        """Goes to Google Play Store and finds out the app category.
+        """Finds out the app category. Google Play Store is only visited if 
+        the package is not on the category cache or its entry expired.
 
         Args:
             package (str): App.
-            driver (webdriver.Firefox, optional): Browser. Defaults to None.
+            driver (webdriver.Firefox, optional): Browser used on fallback. 
+                Defaults to None.
 
         Returns:
             str: Category of the app.
         """
-        # Load app page
-        tmp_driver = False
+        cache = CategoryCache.get_cache()
+        (fresh, category) = cache.get(package)
+        if fresh:
+            return category
+        
+        # Keep last known category if it can't be found now
+        category = self._find_app_category(package, driver) or category
+        cache.put(package, category)
+        
+        return category
+    
+    def _find_app_category(self, package: str, 
+                           driver: webdriver.Firefox = None) -> str:
+        """Goes to Google Play Store and finds out the app category. The page
+        is fetched by plain HTTP, the browser is only used if it can't be 
+        parsed.
+
+        Args:
+            package (str): App.
+            driver (webdriver.Firefox, optional): Browser used on fallback. 
+                Defaults to None.
+
+        Returns:
+            str: Category of the app.
+        """
+        page = HttpSession.get_session().get_text(
+            CategoryFinder.APP_URL_PREFIX + package)
+        category = CategoryFinder.parse_app_category(page)
+        if category:
+            return category
+        
         if not driver:
-            opt = webdriver.FirefoxOptions()
-            opt.add_argument("--headless")
-            driver = webdriver.Firefox(options=opt)
-            tmp_driver = True
-            
+            with BrowserPool.get_pool().session() as session:
+                return self._get_app_category_browser(package, session.driver)
+        
+        return self._get_app_category_browser(package, driver)
+    
+    @staticmethod
+    def parse_app_category(page: str) -> str:
+        """Finds the app category on an app page html.
+
+        Args:
+            page (str): App page content.
+
+        Returns:
+            str: Category of the app. None if not found.
+        """
+        document = _parse_html(page)
+        if document is None:
+            return None
+        
+        # Structured data of the app
+        for script in document.xpath(
+                '//script[@type="application/ld+json"]/text()'):
+            try:
+                category = json.loads(script).get("applicationCategory")
+            except Exception:
+                continue
+            if category:
+                return category
+        
+        # Genre link
+        for link in document.xpath('//a[@itemprop="genre"]/@href'):
+            if "category" in link:
+                return link.split('/')[-1]
+        
+        return None
+    
+    def _get_app_category_browser(self, package: str, 
+                                  driver: webdriver.Firefox) -> str:
+        """Finds out the app category loading its page on a browser.
+
+        Args:
+            package (str): App.
+            driver (webdriver.Firefox): Browser.
+
+        Returns:
+            str: Category of the app.
+        """
+        # Load app page
         driver.get(CategoryFinder.APP_URL_PREFIX + package)
         
         # Wait for content
@@ -64,9 +162,6 @@ class CategoryFinder:
         links = [l for l in links if l]
         links = [l for l in links if "category" in l]
         
-        if tmp_driver:
-            driver.close()
-        
         category = None
         try:
             category = links[0].split('/')[-1]
@@ -93,9 +188,30 @@ class CategoryFinder:
             return self.categories
         
         # Load categories page
-        opt = webdriver.FirefoxOptions()
-        opt.add_argument("--headless")
-        driver = webdriver.Firefox(options=opt)
+        with BrowserPool.get_pool().session() as session:
+            categories = self._find_categories(session.driver)
+
+        # Parse category names
+        self.categories = list(map(lambda x: x.upper().replace(" ", "_"), 
+                                   categories))
+        
+        u.log_result("%d categories found." % len(self.categories))
+        
+        # Store categories found
+        if len(self.categories) > 0:
+            u.write_list(CategoryFinder.LOCAL_FILE, self.categories)
+
+        return self.categories
+    
+    def _find_categories(self, driver: webdriver.Firefox) -> list[str]:
+        """Finds category names on categories page.
+
+        Args:
+            driver (webdriver.Firefox): Browser.
+
+        Returns:
+            list[str]: Category names as shown on the page.
+        """
         driver.get(CategoryFinder.CATEGORIES_URL)
         
         # Wait for content
@@ -120,19 +236,7 @@ class CategoryFinder:
             if category.rect['x'] == x_location:
                 categories.append(category.text)
                 
-        driver.close()
-
-        # Parse category names
-        self.categories = list(map(lambda x: x.upper().replace(" ", "_"), 
-                                   categories))
-        
-        u.log_result("%d categories found." % len(self.categories))
-        
-        # Store categories found
-        if len(self.categories) > 0:
-            u.write_list(CategoryFinder.LOCAL_FILE, self.categories)
-
-        return self.categories
+        return categories
     
 
 class AppFinder:
@@ -175,10 +279,26 @@ class AppFinder:
         urls = list(map(lambda x: AppFinder.CATEGORY_URL_PREFIX+x, categories))
         urls = zip(urls, categories)
         
-        opt = webdriver.FirefoxOptions()
-        opt.add_argument("--headless")
-        driver = webdriver.Firefox(options=opt)
+        with BrowserPool.get_pool().session() as session:
+            self._find_app_packages(session.driver, urls)
         
+        if len(self.app_packages) > 0:
+            u.log_result("%d apps found." % len(self.app_packages))
+            u.write_list(self.LOCAL_FILE, self.app_packages)
+        else:
+            u.log_warning("Empty list.", "No candidate apps found on " 
+                          + "PlayStore.")
+
+        return self.app_packages
+    
+    def _find_app_packages(self, driver: webdriver.Firefox, 
+                           urls: list[tuple[str, str]]) -> None:
+        """Adds the app packages found on each category page.
+
+        Args:
+            driver (webdriver.Firefox): Browser.
+            urls (list[tuple[str, str]]): (url, category) of each page.
+        """
         for (url, category) in urls:
             # Load web
             driver.get(url)
@@ -208,17 +328,6 @@ class AppFinder:
                               + "not contain any app on PlayStore.")
             
             self.app_packages += app_ids
-
-        driver.close()
-        
-        if len(self.app_packages) > 0:
-            u.log_result("%d apps found." % len(self.app_packages))
-            u.write_list(self.LOCAL_FILE, self.app_packages)
-        else:
-            u.log_warning("Empty list.", "No candidate apps found on " 
-                          + "PlayStore.")
-
-        return self.app_packages
     
     def links_present(self, driver: webdriver) -> bool:
         """Find on web loaded on driver if there is app links present.
@@ -251,23 +360,65 @@ class SearchEngine:
 
     def get_app_package_name_by_name(self, name: str, 
                          driver: webdriver.Firefox = None) -> str:
-        """Goes to Google Play Store and finds out the app package.
+        """Goes to Google Play Store and finds out the app package. The page
+        is fetched by plain HTTP, the browser is only used if it can't be 
+        parsed.
 
         Args:
             name (str): Name of App.
-            driver (webdriver.Firefox, optional): Browser. Defaults to None.
+            driver (webdriver.Firefox, optional): Browser used on fallback. 
+                Defaults to None.
 
         Returns:
             str: Category of the app.
         """
-        # Load app page
-        tmp_driver = False
+        page = HttpSession.get_session().get_text(
+            SearchEngine.QUERY_URL.format(name))
+        package = SearchEngine.parse_app_package(page)
+        if package:
+            return package
+        
         if not driver:
-            opt = webdriver.FirefoxOptions()
-            opt.add_argument("--headless")
-            driver = webdriver.Firefox(options=opt)
-            tmp_driver = True
-            
+            with BrowserPool.get_pool().session() as session:
+                return self._get_app_package_browser(name, session.driver)
+        
+        return self._get_app_package_browser(name, driver)
+    
+    @staticmethod
+    def parse_app_package(page: str) -> str:
+        """Finds the package of the first app on a search page html.
+
+        Args:
+            page (str): Search page content.
+
+        Returns:
+            str: Package of the app. None if not found.
+        """
+        document = _parse_html(page)
+        if document is None:
+            return None
+        
+        for link in document.xpath('//a/@href'):
+            if "details" not in link:
+                continue
+            package = parse_qs(urlparse(link).query).get("id")
+            if package:
+                return package[0]
+        
+        return None
+    
+    def _get_app_package_browser(self, name: str, 
+                                 driver: webdriver.Firefox) -> str:
+        """Finds out the app package loading search page on a browser.
+
+        Args:
+            name (str): Name of App.
+            driver (webdriver.Firefox): Browser.
+
+        Returns:
+            str: Package of the app.
+        """
+        # Load search page
         driver.get(SearchEngine.QUERY_URL.format(name))
         
         # Wait for content
@@ -285,9 +436,6 @@ class SearchEngine:
         links = map(lambda x : x.get_attribute("href"), links)
         links = [l for l in links if "details" in l]
         
-        if tmp_driver:
-            driver.close()
-        
         package = None
         try:
             package = links[0].split('=')[-1]
@@ -1,3 +1,3 @@
 __all__ = ["json_ingest", "app_loader", "score_loader", 
            "android_permission_loader", "android_permission_group_loader",
-           "privacy_rank_loader", "az_metadata_loader"]
\ No newline at end of file
+           "privacy_rank_loader", "az_metadata_loader", "known_hash_index"]
\ No newline at end of file
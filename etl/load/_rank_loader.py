@@ -1,6 +1,7 @@
 from etl.load.mysql_connector import MysqlConnector
 
 from common.domain.rank import Rank
+from common.response_cache import ResponseCache
 
 
 class _RankLoader:
@@ -30,6 +31,9 @@ class _RankLoader:
             {"rank_value": rank.value,
              "permission_name": rank.permission_name,
              "privacy_rank_name": rank.rank_name})
+        if result["row_count"] > 0:
+            # Ranks are part of the responses of every app with the permission
+            self.mysql_conn.after_commit(ResponseCache.get_cache().clear)
         
         return {"permission_name": rank.permission_name,
                 "privacy_rank_name": rank.rank_name,
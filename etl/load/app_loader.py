@@ -1,13 +1,14 @@
 from etl.load.mysql_connector import MysqlConnector
-from etl.load._permission_group_loader import _PermissionGroupLoader
-from etl.load._app_defines_group_loader import _AppDefinesGroupLoader
-from etl.load._permission_loader import _PermissionLoader
-from etl.load._app_defines_permission_loader import _AppDefinesPermissionLoader
-from etl.load._app_uses_permission_loader import _AppUsesPermissionLoader
+from etl.load.known_hash_index import KnownHashIndex
 from etl.load._extraction_metadata_loader import _ExtractionMetadataLoader
-from etl.load.score_loader import ScoreLoader
 
 from common.domain.app import App
+from common.domain.permission import Permission
+from common.domain.permission_group import PermissionGroup
+from common.domain.extraction_metadata import ExtractionMetadata
+from common.domain.score import Score
+from common.domain.rank import Rank
+from common.response_cache import ResponseCache
 
 
 class AppLoader:
@@ -20,7 +21,9 @@ class AppLoader:
         self.mysql_conn = MysqlConnector()
         
     def load_app(self, app: App) -> dict:
-        """Loads app on database.
+        """Loads app on database. The whole app (permissions, groups, binds,
+        metadata and scores) is written with one multi-row statement per table 
+        in a single transaction.
 
         Args:
             app (App): App to load.
@@ -30,61 +33,82 @@ class AppLoader:
                 Hash of the app.
                 Number of rows added (1 if app loaded succesfully else 0).
         """
-        result = self.download_app(app.hash)
-        if not result:
-            result = self.mysql_conn.upload_data("INSERT INTO app VALUES "
-                            + "(%(hash)s, %(package)s, %(version_code)s, " 
-                            + "%(version_name)s, %(min_sdk)s, "
-                            + "%(target_sdk)s, %(max_sdk)s, %(category)s);", 
-                            {"hash": app.hash, 
-                            "package": app.package, 
-                            "version_code": app.version_code, 
-                            "version_name": app.version_name, 
-                            "min_sdk": app.min_sdk_version, 
-                            "target_sdk": app.target_sdk_version, 
-                            "max_sdk": app.max_sdk_version, 
-                            "category": app.category})
-            result = {"hash": app.hash, "row_count": result["row_count"]}
-        else:
-            result = {"hash": app.hash, "row_count": 0}
-
-        # Defines group list
-        if app.defines_group_list:
-            group_loader = _PermissionGroupLoader()
-            b_load = _AppDefinesGroupLoader()
-            for group in app.defines_group_list:
-                g_result = group_loader.load_permission_group(group)
-                b_load.bind_group(app.hash, g_result["permission_group_name"])
-
-        # Defines permission list
-        if app.defines_permission_list:
-            permission_loader = _PermissionLoader()
-            b_load = _AppDefinesPermissionLoader()
-            for perm in app.defines_permission_list:
-                p_result = permission_loader.load_permission(perm, app.hash)
-                b_load.bind_permission(app.hash, p_result["permission_name"])
-                
-        # Uses permission list
-        if app.uses_permission_list:
-            permission_loader = _PermissionLoader()
-            b_load = _AppUsesPermissionLoader()
-            for perm in app.uses_permission_list:
-                p_result = permission_loader.load_permission(perm, app.hash)
-                b_load.bind_permission(app.hash, p_result["permission_name"])
-
-        # Extraction metadata list
-        if app.extraction_metadata_list:
-            metadata_loader = _ExtractionMetadataLoader()
-            for meta in app.extraction_metadata_list:
-                metadata_loader.load_metadata(meta, app.hash)
-
-        # Score list
-        if app.score_list:
-            score_loader = ScoreLoader()
-            for score in app.score_list:
-                score_loader.load_score(score)
-
-        return {"hash": app.hash, "row_count": result["row_count"]}
+        # Groups defined by app or declared by its permissions
+        group_names = [g.name for g in app.defines_group_list or []]
+        permission_list = ((app.defines_permission_list or []) 
+                           + (app.uses_permission_list or []))
+        for perm in permission_list:
+            group_names += [g.name for g in perm.declared_group_list or []]
+        
+        # First declaration of a permission is the one stored
+        permissions = {}
+        for perm in permission_list:
+            permissions.setdefault(perm.name, perm)
+        
+        bind_rows = []
+        rank_rows = []
+        for perm in permission_list:
+            for group in perm.declared_group_list or []:
+                bind_rows.append((group.name, perm.name, app.hash))
+            for rank in perm.rank_list or []:
+                rank_rows.append((rank.value, rank.permission_name, 
+                                  rank.rank_name))
+        
+        row_count_list = self.mysql_conn.upload_batch([
+            ("INSERT IGNORE INTO app VALUES {};",
+             [(app.hash, app.package, app.version_code, app.version_name,
+               app.min_sdk_version, app.target_sdk_version, 
+               app.max_sdk_version, app.category)]),
+            ("INSERT IGNORE INTO permission_group VALUES {};",
+             [(name,) for name in dict.fromkeys(group_names)]),
+            ("INSERT IGNORE INTO app_defines_group VALUES {};",
+             [(g.name, app.hash) for g in app.defines_group_list or []]),
+            ("INSERT IGNORE INTO permission VALUES {};",
+             [(p.name, p.protection_level) for p in permissions.values()]),
+            ("INSERT IGNORE INTO app_bind_permission_to_group VALUES {};",
+             bind_rows),
+            ("INSERT IGNORE INTO permission_rank VALUES {};", rank_rows),
+            ("INSERT IGNORE INTO app_defines_permission VALUES {};",
+             [(app.hash, p.name) for p in app.defines_permission_list or []]),
+            ("INSERT IGNORE INTO app_uses_permission VALUES {};",
+             [(app.hash, p.name) for p in app.uses_permission_list or []]),
+            ("INSERT INTO extraction_metadata VALUES {};",
+             [(None, m.source, m.method, m.timestamp, app.hash) 
+              for m in app.extraction_metadata_list or []]),
+            ("INSERT IGNORE INTO score VALUES {};",
+             [(s.value, s.app_hash, s.rank_name) 
+              for s in app.score_list or []])
+        ])
+        self.mysql_conn.after_commit(
+            lambda: ResponseCache.get_cache().invalidate(app.hash))
+        self.mysql_conn.after_commit(
+            lambda: KnownHashIndex.get_index().add(app.hash))
+        if row_count_list[4] > 0 or row_count_list[5] > 0:
+            # Responses embed the groups (all binds) and ranks of each 
+            # permission, new ones change the responses of other apps
+            self.mysql_conn.after_commit(ResponseCache.get_cache().clear)
+
+        return {"hash": app.hash, "row_count": row_count_list[0]}
+    
+    def load_extraction_metadata(self, app_hash: str, 
+                                 extraction_metadata: ExtractionMetadata
+                                 ) -> int:
+        """Records a new extraction of an app already on the database.
+
+        Args:
+            app_hash (str): Hash of the app.
+            extraction_metadata (ExtractionMetadata): Metadata of the 
+                extraction.
+
+        Returns:
+            int: Number of rows added (1 if loaded succesfully).
+        """
+        result = _ExtractionMetadataLoader().load_metadata(extraction_metadata,
+                                                           app_hash)
+        self.mysql_conn.after_commit(
+            lambda: ResponseCache.get_cache().invalidate(app_hash))
+        
+        return result["row_count"]
     
     def download_app_hash_list(self) -> list[str]:
         """Downloads a list of all app hash on the database.
@@ -99,6 +123,68 @@ class AppLoader:
         
         return hash_list
     
+    def download_unscored_app_hash_list(self, privacy_rank_name: str,
+                                        package_list: list[str] = None
+                                        ) -> list[str]:
+        """Downloads the hash of the apps without a score of a privacy rank
+        (single anti-join query, no scores are downloaded).
+
+        Args:
+            privacy_rank_name (str): Name of the privacy rank.
+            package_list (list[str], optional): Only apps with one of these 
+                packages. Defaults to None (all apps).
+
+        Returns:
+            list[str]: Hash of each app.
+        """
+        query = ("SELECT a.hash FROM app a LEFT JOIN score s "
+                 + "ON s.app_hash = a.hash "
+                 + "AND s.privacy_rank_name = %(rank_name)s "
+                 + "WHERE s.app_hash IS NULL")
+        data = {"rank_name": privacy_rank_name}
+        
+        if package_list is None:
+            result = self.mysql_conn.download_all(query + ";", data)
+        else:
+            result = self.mysql_conn.download_all_in(
+                query + " AND a.package IN ({});", set(package_list), data)
+        hash_list = [hash for (hash,) in result]
+        
+        return hash_list
+    
+    def download_app_category_dict(self) -> dict[str, str]:
+        """Downloads the category of each package on the database (category
+        of its last version).
+
+        Returns:
+            dict[str, str]: {package: category}
+        """
+        result = self.mysql_conn.download_all(
+            "SELECT package, category FROM app WHERE category IS NOT NULL "
+            + "ORDER BY version_code;"
+        )
+        
+        return {package: category for (package, category) in result}
+    
+    def download_app_version_dict(self) -> dict[str, list[tuple[int, list[str]]]]:
+        """Downloads the hash of each version of each package on the database.
+
+        Returns:
+            dict[str, list[tuple[int, list[str]]]]: 
+                {package: [(version_code, list[hash]), ...]}
+        """
+        result = self.mysql_conn.download_all(
+            "SELECT package, version_code, hash FROM app;"
+        )
+        
+        version_dict = {}
+        for (package, version_code, hash) in result:
+            versions = version_dict.setdefault(package, {})
+            versions.setdefault(version_code, []).append(hash)
+        
+        return {package: list(versions.items()) 
+                for (package, versions) in version_dict.items()}
+    
     def download_app_hash_list_by_package(self, package: str) -> list[str]:
         """Downloads a list of all app hash on the database.
         
@@ -125,6 +211,21 @@ class AppLoader:
         Returns:
             App: App. None if not found.
         """
+        app_hash = self.download_last_app_hash(package)
+        if app_hash:
+            return self.download_app(app_hash)
+        
+        return None
+    
+    def download_last_app_hash(self, package: str) -> str:
+        """Finds hash of last app that matches package.
+
+        Args:
+            package (str): Package of app.
+
+        Returns:
+            str: Hash of the app. None if not found.
+        """
         package_alike = [
             package,
             "%." + package + ".%",
@@ -143,8 +244,7 @@ class AppLoader:
                 break
         
         if result:
-            app_hash = result[0]
-            return self.download_app(app_hash)
+            return result[0]
         
         return None
     
@@ -157,34 +257,103 @@ class AppLoader:
         Returns:
             App: App downloaded. None if app doesn't exist.
         """
-        result = self.mysql_conn.download_data_by_id("SELECT * FROM app WHERE "
-                                       + "hash = %(hash)s", {"hash": hash})
-        
-        # Uses permission
-        u_perms = _AppUsesPermissionLoader().download_bind_permission(hash)
-        
-        # Defines permission
-        d_perms = _AppDefinesPermissionLoader().download_bind_permission(hash)
-        
-        # Defines group
-        def_grp_list = _AppDefinesGroupLoader().download_bind_group_app(hash)
-        
-        # Extraction metadata
-        e_meta_list = _ExtractionMetadataLoader().download_metadata_app(hash)
-        
-        # Score list
-        score_list = ScoreLoader().download_scores_app(hash)
-        
-        if result:
-            return App(*result, 
-                       u_perms, 
-                       d_perms, 
-                       def_grp_list, 
-                       e_meta_list, 
-                       score_list)
-                
-        return None
-    
+        apps = self.download_apps([hash])
+
+        return next(iter(apps.values()), None)
+
+    def download_apps(self, hash_list: list[str]) -> dict[str, App]:
+        """Downloads apps from database with a fixed number of queries (one
+        per table, independent of the number of apps and permissions).
+
+        Args:
+            hash_list (list[str]): Hashes of the apps to download.
+
+        Returns:
+            dict[str, App]: {hash: App} of the apps found.
+        """
+        app_rows = self.mysql_conn.download_all_in(
+            "SELECT * FROM app WHERE hash IN ({});", hash_list)
+        if not app_rows:
+            return {}
+        found_hash_list = [row[0] for row in app_rows]
+
+        # Uses and defines permission binds joined with permission data
+        u_rows = self.mysql_conn.download_all_in(
+            "SELECT b.app_hash, p.* FROM app_uses_permission b "
+            + "JOIN permission p ON p.permission_name = b.permission_name "
+            + "WHERE b.app_hash IN ({});", found_hash_list)
+        d_rows = self.mysql_conn.download_all_in(
+            "SELECT b.app_hash, p.* FROM app_defines_permission b "
+            + "JOIN permission p ON p.permission_name = b.permission_name "
+            + "WHERE b.app_hash IN ({});", found_hash_list)
+
+        # Groups and ranks of every permission involved
+        perm_names = {row[1] for row in u_rows + d_rows}
+        groups = {name: [] for name in perm_names}
+        for (name, group) in self.mysql_conn.download_all_in(
+                "SELECT permission_name, permission_group_name "
+                + "FROM app_bind_permission_to_group "
+                + "WHERE permission_name IN ({});", perm_names):
+            groups.setdefault(name, []).append(group)
+        ranks = {name: [] for name in perm_names}
+        for rank in self.mysql_conn.download_all_in(
+                "SELECT * FROM permission_rank "
+                + "WHERE permission_name IN ({});", perm_names):
+            ranks.setdefault(rank[1], []).append(rank)
+
+        # Rest of app children
+        children = {h: {"u_perms": [], "d_perms": [], "groups": [],
+                        "meta": [], "scores": []} for h in found_hash_list}
+        for (app_hash, name, protection_level) in u_rows:
+            children[app_hash]["u_perms"].append(
+                self._build_permission(name, protection_level, groups, ranks))
+        for (app_hash, name, protection_level) in d_rows:
+            children[app_hash]["d_perms"].append(
+                self._build_permission(name, protection_level, groups, ranks))
+        for group in self.mysql_conn.download_all_in(
+                "SELECT * FROM app_defines_group WHERE app_hash IN ({});",
+                found_hash_list):
+            children[group[1]]["groups"].append(PermissionGroup(group[0]))
+        for meta in self.mysql_conn.download_all_in(
+                "SELECT * FROM extraction_metadata WHERE app_hash IN ({});",
+                found_hash_list):
+            children[meta[-1]]["meta"].append(ExtractionMetadata(*meta[1:-1]))
+        for score in self.mysql_conn.download_all_in(
+                "SELECT * FROM score WHERE app_hash IN ({});",
+                found_hash_list):
+            children[score[1]]["scores"].append(Score(*score))
+
+        apps = {}
+        for row in app_rows:
+            c = children[row[0]]
+            apps[row[0]] = App(*row,
+                               c["u_perms"],
+                               c["d_perms"],
+                               c["groups"],
+                               c["meta"],
+                               c["scores"])
+
+        return apps
+
+    @staticmethod
+    def _build_permission(name: str, protection_level: str, groups: dict,
+                          ranks: dict) -> Permission:
+        """Builds a permission with its groups and ranks already downloaded.
+
+        Args:
+            name (str): Name of the permission.
+            protection_level (str): Protection level of the permission.
+            groups (dict): {permission_name: list[group_name]}
+            ranks (dict): {permission_name: list[rank row]}
+
+        Returns:
+            Permission: New permission object.
+        """
+        return Permission(name,
+                          protection_level,
+                          [PermissionGroup(g) for g in groups.get(name, [])],
+                          [Rank(*r) for r in ranks.get(name, [])])
+
     def download_app_versions_hash_list_by_package(self, package: str) -> list[(str, str)]:
         """Downloads a list of all app hash on the database.
         
@@ -4,6 +4,9 @@ from etl.load._az_dependency_loader import _AzDependencyLoader
 
 from common.domain.az_metadata import AzMetadata
 from common.domain.az_dependency import AzDependency
+from common.response_cache import ResponseCache
+
+from functools import partial
 
 
 class AzMetadataLoader:
@@ -16,7 +19,8 @@ class AzMetadataLoader:
         self.mysql_conn = MysqlConnector()
         
     def load_az_metadata(self, az_metadata: AzMetadata) -> int:
-        """Loads app on database.
+        """Loads AzMetadata on database with its dependencies in a single 
+        transaction.
 
         Args:
             az_metadata (AzMetadata): AzMetadata to load.
@@ -24,56 +28,101 @@ class AzMetadataLoader:
         Returns:
             int: Number of rows added (1 if app loaded succesfully else 0).
         """
-        result = self.download_az_metadata(az_metadata.app_hash, 
-                                           az_metadata.az_metadata_date)
-        if not result:
-            result = self.mysql_conn.upload_data("INSERT INTO az_metadata VALUES "
-                            + "(%(app_hash)s, %(az_metadata_date)s, %(ratings_count)s, " 
-                            + "%(star_rating)s, %(comment_count)s, "
-                            + "%(one_star_ratings)s, %(two_star_ratings)s, %(three_star_ratings)s, "
-                            + "%(four_star_ratings)s, %(five_star_ratings)s, %(upload_date)s, "
-                            + "%(creator)s, %(developer_name)s, %(developer_address)s, "
-                            + "%(developer_email)s, %(developer_website)s, %(size)s, "
-                            + "%(num_downloads)s, %(app_url)s, %(app_title)s, "
-                            + "%(privacy_policy_url)s);", 
-                            {"app_hash": az_metadata.app_hash,
-                             "az_metadata_date": az_metadata.az_metadata_date,
-                             "ratings_count": az_metadata.ratings_count,
-                             "star_rating": az_metadata.star_rating,
-                             "comment_count": az_metadata.comment_count,
-                             "one_star_ratings": az_metadata.one_star_ratings,
-                             "two_star_ratings": az_metadata.two_star_ratings,
-                             "three_star_ratings": az_metadata.three_star_ratings,
-                             "four_star_ratings": az_metadata.four_star_ratings,
-                             "five_star_ratings": az_metadata.five_star_ratings,
-                             "upload_date": az_metadata.upload_date,
-                             "creator": az_metadata.creator,
-                             "developer_name": az_metadata.developer_name,
-                             "developer_address": az_metadata.developer_address,
-                             "developer_email": az_metadata.developer_email,
-                             "developer_website": az_metadata.developer_website,
-                             "size": az_metadata.size,
-                             "num_downloads": az_metadata.num_downloads,
-                             "app_url": az_metadata.app_url,
-                             "app_title": az_metadata.app_title,
-                             "privacy_policy_url": az_metadata.privacy_policy_url})
-            result = result["row_count"]
-        else:
-            result = 0
+        with self.mysql_conn.transaction():
+            result = self.download_az_metadata(az_metadata.app_hash, 
+                                               az_metadata.az_metadata_date)
+            if not result:
+                result = self.mysql_conn.upload_data("INSERT INTO az_metadata VALUES "
+                                + "(%(app_hash)s, %(az_metadata_date)s, %(ratings_count)s, " 
+                                + "%(star_rating)s, %(comment_count)s, "
+                                + "%(one_star_ratings)s, %(two_star_ratings)s, %(three_star_ratings)s, "
+                                + "%(four_star_ratings)s, %(five_star_ratings)s, %(upload_date)s, "
+                                + "%(creator)s, %(developer_name)s, %(developer_address)s, "
+                                + "%(developer_email)s, %(developer_website)s, %(size)s, "
+                                + "%(num_downloads)s, %(app_url)s, %(app_title)s, "
+                                + "%(privacy_policy_url)s);", 
+                                {"app_hash": az_metadata.app_hash,
+                                 "az_metadata_date": az_metadata.az_metadata_date,
+                                 "ratings_count": az_metadata.ratings_count,
+                                 "star_rating": az_metadata.star_rating,
+                                 "comment_count": az_metadata.comment_count,
+                                 "one_star_ratings": az_metadata.one_star_ratings,
+                                 "two_star_ratings": az_metadata.two_star_ratings,
+                                 "three_star_ratings": az_metadata.three_star_ratings,
+                                 "four_star_ratings": az_metadata.four_star_ratings,
+                                 "five_star_ratings": az_metadata.five_star_ratings,
+                                 "upload_date": az_metadata.upload_date,
+                                 "creator": az_metadata.creator,
+                                 "developer_name": az_metadata.developer_name,
+                                 "developer_address": az_metadata.developer_address,
+                                 "developer_email": az_metadata.developer_email,
+                                 "developer_website": az_metadata.developer_website,
+                                 "size": az_metadata.size,
+                                 "num_downloads": az_metadata.num_downloads,
+                                 "app_url": az_metadata.app_url,
+                                 "app_title": az_metadata.app_title,
+                                 "privacy_policy_url": az_metadata.privacy_policy_url})
+                result = result["row_count"]
+            else:
+                result = 0
 
-        # AzDependencies
-        if az_metadata.az_dependency_list:
-            az_dependency_loader = _AzDependencyLoader()
-            b_load = _AzBindDependencyLoader()
-            for d in  az_metadata.az_dependency_list:
-                p_result = az_dependency_loader.load_az_dependency(d)
-                b_load.bind_az_metadata_az_dependency(az_metadata.app_hash,
-                                                      az_metadata.az_metadata_date,
-                                                      d.package,
-                                                      d.version_code)
+            # AzDependencies
+            if az_metadata.az_dependency_list:
+                az_dependency_loader = _AzDependencyLoader()
+                b_load = _AzBindDependencyLoader()
+                for d in  az_metadata.az_dependency_list:
+                    p_result = az_dependency_loader.load_az_dependency(d)
+                    b_load.bind_az_metadata_az_dependency(az_metadata.app_hash,
+                                                          az_metadata.az_metadata_date,
+                                                          d.package,
+                                                          d.version_code)
+
+        self.mysql_conn.after_commit(
+            lambda: ResponseCache.get_cache().invalidate(az_metadata.app_hash))
 
         return result
     
+    def load_az_metadata_list(self, az_metadata_list: list[AzMetadata]
+                              ) -> int:
+        """Loads many AzMetadata with their dependencies using multi-row
+        inserts in a single transaction. Already existing rows are ignored.
+
+        Args:
+            az_metadata_list (list[AzMetadata]): AzMetadata to load.
+
+        Returns:
+            int: Number of AzMetadata rows added.
+        """
+        metadata_rows = []
+        dependency_rows = {}
+        bind_rows = []
+        for m in az_metadata_list:
+            metadata_rows.append((
+                m.app_hash, m.az_metadata_date, m.ratings_count,
+                m.star_rating, m.comment_count, m.one_star_ratings,
+                m.two_star_ratings, m.three_star_ratings,
+                m.four_star_ratings, m.five_star_ratings, m.upload_date,
+                m.creator, m.developer_name, m.developer_address,
+                m.developer_email, m.developer_website, m.size,
+                m.num_downloads, m.app_url, m.app_title,
+                m.privacy_policy_url))
+            for d in m.az_dependency_list or []:
+                dependency_rows[(d.package, d.version_code)] = None
+                bind_rows.append((m.app_hash, m.az_metadata_date, d.package,
+                                  d.version_code))
+
+        row_count_list = self.mysql_conn.upload_batch([
+            ("INSERT IGNORE INTO az_metadata VALUES {};", metadata_rows),
+            ("INSERT IGNORE INTO az_dependency VALUES {};",
+             list(dependency_rows)),
+            ("INSERT IGNORE INTO az_bind_dependency VALUES {};", bind_rows)
+        ])
+        cache = ResponseCache.get_cache()
+        for app_hash in {m.app_hash for m in az_metadata_list}:
+            self.mysql_conn.after_commit(partial(cache.invalidate, app_hash))
+
+        return row_count_list[0]
+    
     def download_az_metadata_list(self, app_hash: str) -> list[AzMetadata]:
         """Downloads a list of all azmetadata for hash on the database.
 
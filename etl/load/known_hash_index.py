@@ -0,0 +1,100 @@
+from etl.load.mysql_connector import MysqlConnector
+
+from common.util import Util as u
+
+from threading import Lock
+
+
+class KnownHashIndex:
+    """Process-wide set of the SHA256 of the apps on the warehouse, used to
+    skip downloading or parsing apks already loaded. Seeded from the app
+    table on first use and updated when an app load commits.
+
+    Apps are never deleted, so a known hash is always on the warehouse. Apps
+    loaded by other processes after the seed are not known here, they are
+    parsed again and ignored by the database.
+    """
+
+    _index = None
+    _lock = Lock() # Prevents threads to create more than one index.
+
+    @staticmethod
+    def get_index() -> "KnownHashIndex":
+        """Returns or creates the unique index.
+
+        Returns:
+            KnownHashIndex: Index.
+        """
+        with KnownHashIndex._lock:
+            if not KnownHashIndex._index:
+                KnownHashIndex._index = KnownHashIndex()
+
+        return KnownHashIndex._index
+
+    def __init__(self) -> None:
+        """Creates an empty index, it is seeded on first use.
+        """
+        self.lock = Lock()
+        self.hashes = None # set[bytes] of raw digests (half the memory)
+
+    @staticmethod
+    def _key(app_hash: str) -> bytes:
+        """Returns the index key of a hash.
+
+        Args:
+            app_hash (str): Hex SHA256 (any case).
+
+        Returns:
+            bytes: Raw digest.
+        """
+        return bytes.fromhex(app_hash)
+
+    def _seed(self) -> set:
+        """Loads the hashes of the app table if not done yet.
+
+        Returns:
+            set[bytes]: Hashes.
+        """
+        with self.lock:
+            if self.hashes is None:
+                result = MysqlConnector().download_all("SELECT hash FROM app;")
+                self.hashes = {KnownHashIndex._key(hash) for (hash,) in result}
+                u.log_normal("%d app hashes indexed." % len(self.hashes))
+
+        return self.hashes
+
+    def contains(self, app_hash: str) -> bool:
+        """Checks if an app is on the warehouse.
+
+        Args:
+            app_hash (str): Hex SHA256 of the app (any case).
+
+        Returns:
+            bool: True if loaded else False.
+        """
+        try:
+            return KnownHashIndex._key(app_hash) in self._seed()
+        except ValueError:
+            return False # Not a hash
+
+    def filter_unknown(self, hash_list: list[str]) -> list[str]:
+        """Removes the hashes of apps already on the warehouse.
+
+        Args:
+            hash_list (list[str]): Hex SHA256 of each app (any case).
+
+        Returns:
+            list[str]: Hashes not loaded, in the same order.
+        """
+        return [hash for hash in hash_list if not self.contains(hash)]
+
+    def add(self, app_hash: str) -> None:
+        """Adds the hash of an app loaded. Does nothing until the index is
+        seeded (the seed will include it).
+
+        Args:
+            app_hash (str): Hex SHA256 of the app (any case).
+        """
+        with self.lock:
+            if self.hashes is not None:
+                self.hashes.add(KnownHashIndex._key(app_hash))
@@ -1,44 +1,374 @@
 import mysql.connector
-from mysql.connector.errors import IntegrityError
+from mysql.connector.errors import IntegrityError, PoolError
+from contextlib import contextmanager
+from threading import Condition, Lock, local
+from time import time
 import json
 
 from common.util import Util as u
 
 
-class MysqlConnector:
-    """Connection to the warehouse database with Loader role.
+class _MysqlPool:
+    """Process-wide pool of connections to a warehouse database. There is one
+    pool per config kind (MYSQL, MYSQL_CREDENTIALS...).
     """
-    
+
     CONFIG_FILE = "data/config.json"
+    POOL_SIZE = 10
+    CHECKOUT_TIMEOUT = 30
+    IDLE_TIMEOUT = 300
+    HEALTH_CHECK_INTERVAL = 30
 
-    def __init__(self, kind: str = "MYSQL") -> None:
-        """Creates a connection to the warehouse database. Password should be
-        stored in config file.
+    _pools = {}
+    _lock = Lock() # Prevents threads to create more than one pool per kind.
+
+    @staticmethod
+    def get_pool(kind: str) -> "_MysqlPool":
+        """Returns or creates the pool of the config kind.
+
+        Args:
+            kind (str): Config kind of the database.
+
+        Returns:
+            _MysqlPool: Unique pool of the kind.
+        """
+        with _MysqlPool._lock:
+            if kind not in _MysqlPool._pools:
+                _MysqlPool._pools[kind] = _MysqlPool(kind)
+
+        return _MysqlPool._pools[kind]
+
+    def __init__(self, kind: str) -> None:
+        """Creates a pool reading its credentials from config file. Size and
+        idle timeout can be set on config file with "pool_size" and
+        "idle_timeout".
+
+        Args:
+            kind (str): Config kind of the database.
         """
-        host = None
-        database = None
-        user = None
-        password = None
+        self.kind = kind
+        self.host = None
+        self.database = None
+        self.user = None
+        self.password = None
+        self.size = _MysqlPool.POOL_SIZE
+        self.idle_timeout = _MysqlPool.IDLE_TIMEOUT
         try:
             with open(self.CONFIG_FILE, '+r', encoding="utf8") as config:
                 mysql_config = json.loads(config.read())[kind]
-                host = mysql_config["host"]
-                database = mysql_config["database"]
-                user = mysql_config["user"]
-                password = mysql_config["password"]
+                self.host = mysql_config["host"]
+                self.database = mysql_config["database"]
+                self.user = mysql_config["user"]
+                self.password = mysql_config["password"]
+                self.size = mysql_config.get("pool_size", self.size)
+                self.idle_timeout = mysql_config.get("idle_timeout",
+                                                     self.idle_timeout)
         except:
             pass
-        
-        self.connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
+
+        self.condition = Condition()
+        self.idle_connections = [] # [(connection, last_use)]
+        self.n_checked_out = 0
+
+    def get_connection(self):
+        """Checks out a connection. Waits for a free one when the pool is
+        full.
+
+        Raises:
+            PoolError: No connection was released in time.
+
+        Returns:
+            MySQLConnection: Healthy connection.
+        """
+        connection = None
+        last_use = None
+        end_time = time() + _MysqlPool.CHECKOUT_TIMEOUT
+        with self.condition:
+            self._evict_idle()
+            while(len(self.idle_connections) == 0
+                  and self.n_checked_out >= self.size):
+                remaining = end_time - time()
+                if remaining <= 0:
+                    raise PoolError("No %s connection available." % self.kind)
+                self.condition.wait(remaining)
+
+            if self.idle_connections:
+                connection, last_use = self.idle_connections.pop()
+            self.n_checked_out += 1
+
+        # Health check and connect outside the lock (network calls)
+        try:
+            if connection and time() - last_use > self.HEALTH_CHECK_INTERVAL:
+                if not connection.is_connected():
+                    self._close(connection)
+                    connection = None
+            if not connection:
+                connection = self._connect()
+        except Exception:
+            with self.condition:
+                self.n_checked_out -= 1
+                self.condition.notify()
+            raise
+
+        return connection
+
+    def release(self, connection, discard: bool = False) -> None:
+        """Returns a connection to the pool. Pending work not commited is
+        rolled back.
+
+        Args:
+            connection (MySQLConnection): Connection checked out.
+            discard (bool, optional): Close the connection instead of reusing
+                it. Defaults to False.
+        """
+        if not discard:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close(connection)
+
+        with self.condition:
+            self.n_checked_out -= 1
+            if not discard:
+                self.idle_connections.append((connection, time()))
+            self.condition.notify()
+
+    def _connect(self):
+        """Opens a new connection to the database.
+
+        Returns:
+            MySQLConnection: New connection.
+        """
+        return mysql.connector.connect(
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            database=self.database
         )
-        self.cursor = self.connection.cursor()
+
+    def _evict_idle(self) -> None:
+        """Closes connections idle for more than idle timeout. Must be called
+        holding the condition lock.
+        """
+        now = time()
+        expired = [c for (c, t) in self.idle_connections
+                   if now - t > self.idle_timeout]
+        self.idle_connections = [(c, t) for (c, t) in self.idle_connections
+                                 if now - t <= self.idle_timeout]
+        for connection in expired:
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection) -> None:
+        """Closes a connection ignoring errors (it may be already broken).
+
+        Args:
+            connection (MySQLConnection): Connection to close.
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class Transaction:
+    """Unit of work over a pooled connection. Created by 
+    MysqlConnector.transaction().
+    """
+
+    def __init__(self, connection) -> None:
+        """Creates a transaction over a checked out connection.
+
+        Args:
+            connection (MySQLConnection): Connection of the transaction.
+        """
+        self.connection = connection
+        self.n_savepoints = 0
+        self.after_commit_list = []
+
+    def savepoint(self) -> str:
+        """Creates a savepoint.
+
+        Returns:
+            str: Name of the savepoint.
+        """
+        self.n_savepoints += 1
+        name = "sp_%d" % self.n_savepoints
+        self._execute("SAVEPOINT " + name + ";")
+
+        return name
+
+    def rollback_to(self, name: str) -> None:
+        """Undoes all the work done after a savepoint.
+
+        Args:
+            name (str): Name of the savepoint.
+        """
+        self._execute("ROLLBACK TO SAVEPOINT " + name + ";")
+
+    def release(self, name: str) -> None:
+        """Removes a savepoint keeping the work done after it.
+
+        Args:
+            name (str): Name of the savepoint.
+        """
+        self._execute("RELEASE SAVEPOINT " + name + ";")
+
+    def commit(self) -> None:
+        """Commits all the work done. The transaction can still be used.
+        """
+        self.connection.commit()
+
+    def rollback(self) -> None:
+        """Undoes all the work not commited. The transaction can still be 
+        used.
+        """
+        self.connection.rollback()
+
+    def _execute(self, query: str) -> None:
+        """Executes a query without results.
+
+        Args:
+            query (str): Query.
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query)
+        finally:
+            cursor.close()
+
+
+class MysqlConnector:
+    """Connection to the warehouse database with Loader role. Connections are
+    taken from a process-wide pool on each query, so connectors are cheap to
+    create and can be shared between threads.
+    
+    Inside a transaction() every connector of the same kind on the same thread
+    runs its queries on the transaction connection and leaves commits to the
+    end of the transaction.
+    """
+
+    CONFIG_FILE = "data/config.json"
     
+    _local = local() # Open transactions of each thread {kind: Transaction}
+
+    def __init__(self, kind: str = "MYSQL") -> None:
+        """Creates a connector to the warehouse database. Password should be
+        stored in config file.
+
+        Args:
+            kind (str, optional): Config kind of the database. Defaults to
+                "MYSQL".
+        """
+        self.kind = kind
+        self.pool = _MysqlPool.get_pool(kind)
+
+    def after_commit(self, callback) -> None:
+        """Runs a callback once the work done is visible to other connections:
+        when the open transaction commits (discarded if it is rolled back) or
+        now if there is no transaction.
+
+        Args:
+            callback (Callable[[], None]): Function without arguments.
+        """
+        transaction = self._current_transaction()
+        if transaction:
+            transaction.after_commit_list.append(callback)
+        else:
+            callback()
+
+    def _current_transaction(self) -> Transaction:
+        """Returns the transaction open on this thread for the kind.
+
+        Returns:
+            Transaction: Open transaction. None if there is no transaction.
+        """
+        return getattr(MysqlConnector._local, "transactions", {}).get(
+            self.kind)
+
+    @contextmanager
+    def transaction(self):
+        """Opens a unit of work. Work is commited when the block ends and 
+        rolled back if it raises. Nested transactions use savepoints, so only
+        their own work is undone.
+
+        Yields:
+            Transaction: Open transaction.
+        """
+        current = self._current_transaction()
+        if current:
+            name = current.savepoint()
+            try:
+                yield current
+            except Exception:
+                current.rollback_to(name)
+                raise
+            current.release(name)
+            return
+
+        if not hasattr(MysqlConnector._local, "transactions"):
+            MysqlConnector._local.transactions = {}
+        connection = self.pool.get_connection()
+        transaction = Transaction(connection)
+        MysqlConnector._local.transactions[self.kind] = transaction
+        discard = False
+        try:
+            try:
+                yield transaction
+            except Exception:
+                transaction.rollback()
+                raise
+            transaction.commit()
+        except (mysql.connector.errors.OperationalError,
+                mysql.connector.errors.InterfaceError):
+            discard = True
+            raise
+        finally:
+            del MysqlConnector._local.transactions[self.kind]
+            self.pool.release(connection, discard)
+
+        for callback in transaction.after_commit_list:
+            callback()
+
+    @contextmanager
+    def _cursor(self):
+        """Checks out a connection and a cursor, returning both to the pool
+        when finished. Inside a transaction its connection is used.
+
+        Yields:
+            tuple: (connection, cursor)
+        """
+        transaction = self._current_transaction()
+        if transaction:
+            cursor = transaction.connection.cursor()
+            try:
+                yield transaction.connection, cursor
+            finally:
+                cursor.close()
+            return
+
+        connection = self.pool.get_connection()
+        discard = False
+        try:
+            cursor = connection.cursor()
+            try:
+                yield connection, cursor
+            finally:
+                cursor.close()
+        except (mysql.connector.errors.OperationalError,
+                mysql.connector.errors.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.pool.release(connection, discard)
+
     def upload_data(self, query: str, data: dict) -> dict:
-        """Upload data query.
+        """Upload data query. Inside a transaction it is not commited and only
+        integrity errors (data already on database) are ignored, any other
+        error is raised so the transaction can be rolled back.
 
         Args:
             query (str): INSERT query.
@@ -50,18 +380,64 @@ class MysqlConnector:
                 Number of rows added (1 if uploaded succesfully else 0).
         """
         row_count = -1
+        in_transaction = self._current_transaction() is not None
+        with self._cursor() as (connection, cursor):
+            try:
+                cursor.execute(query, data)
+                if not in_transaction:
+                    connection.commit()
+
+                row_count = cursor.rowcount
+            except Exception as e:
+                if in_transaction and not isinstance(e, IntegrityError):
+                    raise
+                u.log_error("Upload fail.", "Could not upload data to database."
+                            + " Maybe data already on database?")
+                row_count = 0
+
+            last_id = cursor.lastrowid
+
+        return {"id": last_id, "row_count": row_count}
+
+    def upload_batch(self, statement_list: list[tuple[str, list[tuple]]],
+                     batch_size: int = 1000) -> list[int]:
+        """Uploads many rows with multi-row INSERT statements in a single
+        transaction, commiting once at the end. If any statement fails
+        everything is rolled back (inside another transaction only this work
+        is rolled back and the error is raised).
+
+        Args:
+            statement_list (list[tuple[str, list[tuple]]]): List of
+                (statement, rows). Statement has "{}" where row values go (e.g.
+                "INSERT IGNORE INTO permission VALUES {};").
+            batch_size (int, optional): Max rows per statement. Defaults to
+                1000.
+
+        Returns:
+            list[int]: Number of rows added by each statement (all 0 if the
+                transaction was rolled back).
+        """
+        row_count_list = [0] * len(statement_list)
         try:
-            self.cursor.execute(query, data)
-            self.connection.commit()
-            
-            row_count = self.cursor.rowcount
+            with self.transaction(), self._cursor() as (connection, cursor):
+                for (i, (statement, rows)) in enumerate(statement_list):
+                    for j in range(0, len(rows), batch_size):
+                        batch = rows[j:j + batch_size]
+                        values = ", ".join(
+                            "(" + ", ".join(["%s"] * len(row)) + ")"
+                            for row in batch)
+                        params = [value for row in batch for value in row]
+                        cursor.execute(statement.format(values), params)
+                        row_count_list[i] += cursor.rowcount
         except Exception:
             u.log_error("Upload fail.", "Could not upload data to database."
-                        + " Maybe data already on database?")
-            row_count = 0
+                        + " Transaction rolled back.")
+            if self._current_transaction():
+                raise # Outer unit of work decides
+            row_count_list = [0] * len(statement_list)
+
+        return row_count_list
 
-        return {"id": self.cursor.lastrowid, "row_count": row_count}
-    
     def download_data_by_id(self, query: str, data: dict) -> tuple:
         """Download data (1 row only).
 
@@ -72,11 +448,13 @@ class MysqlConnector:
         Returns:
             tuple: Row result in a tuple or None.
         """
-        self.cursor.execute(query, data)
-        result = self.cursor.fetchone()
-                
+        with self._cursor() as (connection, cursor):
+            cursor.execute(query, data)
+            result = cursor.fetchone()
+            cursor.fetchall() # Consume unread rows before reusing connection
+
         return result
-    
+
     def download_all(self, query: str, data: dict = None) -> list:
         """Downloads all the data result of a query.
 
@@ -87,7 +465,35 @@ class MysqlConnector:
         Returns:
             list: List with the results.
         """
-        self.cursor.execute(query, data)
-        result = self.cursor.fetchall()
-                
-        return result
\ No newline at end of file
+        with self._cursor() as (connection, cursor):
+            cursor.execute(query, data)
+            result = cursor.fetchall()
+
+        return result
+
+    def download_all_in(self, query: str, values: list, data: dict = None,
+                        batch_size: int = 500) -> list:
+        """Downloads all the data result of a query with an IN (...) clause.
+        Values are sent in batches of batch_size to keep queries small.
+
+        Args:
+            query (str): SELECT query with "{}" where IN values go (e.g.
+                "SELECT * FROM app WHERE hash IN ({});").
+            values (list): Values of the IN clause.
+            data (dict, optional): Other data of the select query. Defaults to
+                None.
+            batch_size (int, optional): Max values per query. Defaults to 500.
+
+        Returns:
+            list: List with the results of all batches.
+        """
+        values = list(values)
+        result = []
+        for i in range(0, len(values), batch_size):
+            batch = values[i:i + batch_size]
+            params = {"in_%d" % j: v for (j, v) in enumerate(batch)}
+            placeholders = ", ".join("%(" + p + ")s" for p in params)
+            result += self.download_all(query.format(placeholders),
+                                        (data or {}) | params)
+
+        return result
@@ -15,7 +15,8 @@ class PrivacyRankLoader:
         self.mysql_conn = MysqlConnector()
         
     def load_privacy_rank(self, privacy_rank: PrivacyRank) -> dict:
-        """Loads privacy rank on database.
+        """Loads privacy rank on database with its ranks and scores in a 
+        single transaction.
 
         Args:
             privacy_rank (PrivacyRank): PrivacyRank to load.
@@ -25,39 +26,43 @@ class PrivacyRankLoader:
                 Name of the privacy_rank.
                 Number of rows added (1 if loaded succesfully).
         """
-        # Loads privacy_rank data if is not already on database
-        result = self.download_privacy_rank(privacy_rank.name)
-        if result:
-            result = {"privacy_rank_name": privacy_rank.name, 
-                      "row_count": 0}
-        else:
-            result = self.mysql_conn.upload_data(
-                "INSERT INTO privacy_rank VALUES " 
-                + "(%(name)s, %(source)s, %(timestamp)s);", 
-                {"name": privacy_rank.name,
-                "source": privacy_rank.source,
-                "timestamp": privacy_rank.timestamp})
-            result = {"privacy_rank_name": privacy_rank.name, 
-                      "row_count": result["row_count"]}
+        with self.mysql_conn.transaction():
+            # Loads privacy_rank data if is not already on database
+            result = self.download_privacy_rank(privacy_rank.name)
+            if result:
+                result = {"privacy_rank_name": privacy_rank.name, 
+                          "row_count": 0}
+            else:
+                result = self.mysql_conn.upload_data(
+                    "INSERT INTO privacy_rank VALUES " 
+                    + "(%(name)s, %(source)s, %(timestamp)s);", 
+                    {"name": privacy_rank.name,
+                    "source": privacy_rank.source,
+                    "timestamp": privacy_rank.timestamp})
+                result = {"privacy_rank_name": privacy_rank.name, 
+                          "row_count": result["row_count"]}
         
-        # Loads third tables data
-        if privacy_rank.permission_ranks_list:
-            rank_loader = _RankLoader()
-            for rank in privacy_rank.permission_ranks_list:
-                rank_loader.load_rank(rank)
+            # Loads third tables data
+            if privacy_rank.permission_ranks_list:
+                rank_loader = _RankLoader()
+                for rank in privacy_rank.permission_ranks_list:
+                    rank_loader.load_rank(rank)
 
-        if privacy_rank.app_scores_list:
-            score_loader = ScoreLoader()
-            for score in privacy_rank.app_scores_list:
-                score_loader.load_score(score)
+            if privacy_rank.app_scores_list:
+                score_loader = ScoreLoader()
+                for score in privacy_rank.app_scores_list:
+                    score_loader.load_score(score)
         
         return result
     
-    def download_privacy_rank(self, name: str) -> dict:
+    def download_privacy_rank(self, name: str, 
+                              with_scores: bool = True) -> dict:
         """Downloads a privacy_rank from database.
 
         Args:
             name (str): Id of the privacy rank to download.
+            with_scores (bool, optional): Download also the app scores (may be
+                a lot of rows). Defaults to True.
 
         Returns:
             dict: {privacy_rank_name, PrivacyRank}
@@ -71,8 +76,10 @@ class PrivacyRankLoader:
         ranks_loader = _RankLoader()
         ranks = ranks_loader.download_ranks_rank(name)
         
-        scores_loader = ScoreLoader()
-        scores = scores_loader.download_scores_rank(name)
+        scores = None
+        if with_scores:
+            scores_loader = ScoreLoader()
+            scores = scores_loader.download_scores_rank(name)
         
         if result:
             return {"privacy_rank_name": name, 
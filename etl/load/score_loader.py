@@ -1,6 +1,9 @@
 from etl.load.mysql_connector import MysqlConnector
 
 from common.domain.score import Score
+from common.response_cache import ResponseCache
+
+from functools import partial
 
 
 class ScoreLoader:
@@ -30,11 +33,33 @@ class ScoreLoader:
             {"score_value": score.value,
              "app_hash": score.app_hash,
              "privacy_rank_name": score.rank_name})
+        self.mysql_conn.after_commit(
+            lambda: ResponseCache.get_cache().invalidate(score.app_hash))
         
         return {"app_hash": score.app_hash,
                 "privacy_rank_name": score.rank_name,
                 "row_count": result["row_count"]}
     
+    def load_scores(self, score_list: list[Score]) -> int:
+        """Loads many scores on database with multi-row inserts in a single
+        transaction. Already existing scores are ignored.
+
+        Args:
+            score_list (list[Score]): Scores to load.
+
+        Returns:
+            int: Number of rows added.
+        """
+        row_count_list = self.mysql_conn.upload_batch([
+            ("INSERT IGNORE INTO score VALUES {};",
+             [(s.value, s.app_hash, s.rank_name) for s in score_list])
+        ])
+        cache = ResponseCache.get_cache()
+        for app_hash in {s.app_hash for s in score_list}:
+            self.mysql_conn.after_commit(partial(cache.invalidate, app_hash))
+        
+        return row_count_list[0]
+    
     def download_score(self, app_hash: str, 
                        privacy_rank_name: str) -> dict:
         """Downloads a rank from database.
@@ -1,6 +1,8 @@
 from selenium import webdriver
 from lxml.etree import XML
 from androguard.core.bytecodes.apk import APK
+from androguard.core.bytecodes.axml import AXMLPrinter
+import zipfile
 import hashlib
 import json
 
@@ -14,30 +16,214 @@ from etl.extract.play_store import CategoryFinder
 from etl.extract.google import ProtectionLevel
 
 
+class ManifestApk:
+    """Lightweight replacement of androguard APK that only reads and decodes
+    AndroidManifest.xml from the apk zip (the rest of the file is not loaded
+    in memory nor analysed). Implements the APK methods used by 
+    ApkDataExtractor with the same results.
+    """
+    
+    MANIFEST = "AndroidManifest.xml"
+    NS_ANDROID = "{http://schemas.android.com/apk/res/android}"
+    
+    def __init__(self, path_to_apk: str) -> None:
+        """Decodes the manifest of an apk.
+
+        Args:
+            path_to_apk (str): Location of the .apk.
+
+        Raises:
+            ValueError: Manifest not found or not valid.
+        """
+        with zipfile.ZipFile(path_to_apk) as apk_zip:
+            try:
+                manifest_data = apk_zip.read(ManifestApk.MANIFEST)
+            except KeyError:
+                raise ValueError("Missing AndroidManifest.xml.")
+        
+        self.axml = AXMLPrinter(manifest_data)
+        if not self.axml.is_valid():
+            raise ValueError("AndroidManifest.xml not valid.")
+        self.xml = self.axml.get_xml_obj()
+        if self.xml is None or self.xml.tag != "manifest":
+            raise ValueError("AndroidManifest.xml not valid.")
+        
+    def _find_tags(self, tag_name: str) -> list:
+        """Finds all tags with a name (including root).
+
+        Args:
+            tag_name (str): Tag name.
+
+        Returns:
+            list[lxml.etree.Element]: Tags.
+        """
+        if self.xml.tag == tag_name:
+            return [self.xml]
+        return self.xml.findall(".//" + tag_name)
+    
+    def _get_attribute_values(self, tag_name: str, attribute: str) -> list:
+        """Finds an attribute on all tags with a name. As androguard, plain
+        attribute is preferred over android namespaced one.
+
+        Args:
+            tag_name (str): Tag name.
+            attribute (str): Attribute name.
+
+        Returns:
+            list[str]: Attribute values (tags without it are skipped).
+        """
+        values = [tag.get(attribute) or 
+                  tag.get(ManifestApk.NS_ANDROID + attribute)
+                  for tag in self._find_tags(tag_name)]
+        return [value for value in values if value is not None]
+    
+    def _get_attribute_value(self, tag_name: str, attribute: str) -> str:
+        """Finds an attribute on the first tag with a name having it.
+
+        Args:
+            tag_name (str): Tag name.
+            attribute (str): Attribute name.
+
+        Returns:
+            str: Attribute value. None if not found.
+        """
+        values = self._get_attribute_values(tag_name, attribute)
+        return values[0] if values else None
+    
+    def get_android_manifest_axml(self) -> AXMLPrinter:
+        """Returns the decoded manifest.
+
+        Returns:
+            AXMLPrinter: Manifest.
+        """
+        return self.axml
+    
+    def get_raw(self) -> bytes:
+        """Returns raw bytes of the apk (not loaded).
+
+        Returns:
+            bytes: None.
+        """
+        return None # Apk not loaded in memory
+    
+    def get_package(self) -> str:
+        """Returns the package name.
+
+        Returns:
+            str: Package. None if not found.
+        """
+        return self._get_attribute_value("manifest", "package")
+    
+    def get_androidversion_code(self) -> str:
+        """Returns the version code.
+
+        Returns:
+            str: Version code. None if not found.
+        """
+        return self._get_attribute_value("manifest", "versionCode")
+    
+    def get_androidversion_name(self) -> str:
+        """Returns the version name.
+
+        Returns:
+            str: Version name. None if not found.
+        """
+        return self._get_attribute_value("manifest", "versionName")
+    
+    def get_min_sdk_version(self) -> str:
+        """Returns the minimum sdk declared.
+
+        Returns:
+            str: Sdk version. None if not found.
+        """
+        return self._get_attribute_value("uses-sdk", "minSdkVersion")
+    
+    def get_target_sdk_version(self) -> str:
+        """Returns the target sdk declared.
+
+        Returns:
+            str: Sdk version. None if not found.
+        """
+        return self._get_attribute_value("uses-sdk", "targetSdkVersion")
+    
+    def get_max_sdk_version(self) -> str:
+        """Returns the maximum sdk declared.
+
+        Returns:
+            str: Sdk version. None if not found.
+        """
+        return self._get_attribute_value("uses-sdk", "maxSdkVersion")
+    
+    def _format_value(self, value: str) -> str:
+        """Prefixes a name with the package if it has no dots or starts with
+        one (as androguard does with uses-permission names).
+
+        Args:
+            value (str): Name.
+
+        Returns:
+            str: Name formatted.
+        """
+        package = self.get_package()
+        if value and package is not None and (value.find(".") <= 0):
+            value = package + "." + value
+        return value
+    
+    def get_requested_permissions(self) -> list[str]:
+        """Returns the permissions requested, without duplicates and with the
+        names formatted as androguard.
+
+        Returns:
+            list[str]: Permission names.
+        """
+        return list(dict.fromkeys(
+            self._format_value(value) for value in 
+            self._get_attribute_values("uses-permission", "name")))
+
+
 class ApkDataExtractor:
     """Represents an object capable of extract data from .apk.
     """
     
     def __init__(self, path_to_apk: str, 
-                 metadata: ExtractionMetadata = None) -> None:
+                 metadata: ExtractionMetadata = None,
+                 manifest_only: bool = True, app_hash: str = None) -> None:
         """Creates an ApkDataExtractor object.
 
         Args:
             path_to_apk (str): Location of the .apk.
             metadata (ExtractionMetadata, optional): Metadata of the extraction
                 of the app. Defaults to None.
+            manifest_only (bool, optional): Only decode the manifest 
+                (ManifestApk), the full androguard analysis is used if it 
+                fails. Defaults to True.
+            app_hash (str, optional): SHA256 of the apk if already computed.
+                Defaults to None.
         """
         self.path_to_apk = path_to_apk
-        self.apk = APK(path_to_apk)
+        self.app_hash = app_hash
+        self.apk = None
+        if manifest_only:
+            try:
+                self.apk = ManifestApk(path_to_apk)
+            except Exception as e:
+                u.log_warning("Parse.", "Manifest of %s not decoded (%s), " 
+                              % (path_to_apk, e) + "using full analysis.")
+        if not self.apk:
+            self.apk = APK(path_to_apk)
         self.manifest_xml = XML(self.apk.get_android_manifest_axml().get_xml())
         self.extraction_metadata = metadata
         self.app = None
         
-    def get_app(self, driver: webdriver.Firefox = None) -> App:
+    def get_app(self, driver: webdriver.Firefox = None, 
+                find_category: bool = True) -> App:
         """Converts the data into an App object.
 
         Args:
             driver (webdriver.Firefox, optional): Browser. Defaults to None.
+            find_category (bool, optional): Find the app category on Google 
+                Play Store. If False category is None, so it can be found 
+                later apart from the apk parsing. Defaults to True.
 
         Returns:
             App: app containing all possible data extracted.
@@ -45,7 +231,7 @@ class ApkDataExtractor:
         if self.app:
             return self.app
         
-        hash = hashlib.sha256(open(self.path_to_apk, "rb").read()).hexdigest()
+        hash = self._get_hash()
         package = self.apk.get_package()
         version_code = int(self.apk.get_androidversion_code())
         version_name = self.apk.get_androidversion_name()
@@ -55,7 +241,9 @@ class ApkDataExtractor:
         target_sdk = int(target_sdk) if target_sdk else None
         max_sdk = self.apk.get_max_sdk_version()
         max_sdk = int(max_sdk) if max_sdk else None
-        category = CategoryFinder().get_app_category(package, driver)
+        category = None
+        if find_category:
+            category = CategoryFinder().get_app_category(package, driver)
         use_per_l = self._get_app_uses_permission()
         defines_permission_list = self._get_permission_definition()
         defines_group_list = self._get_permission_group_definition()
@@ -67,6 +255,25 @@ class ApkDataExtractor:
         
         return self.app
      
+    def _get_hash(self) -> str:
+        """Computes the SHA256 of the apk. Uses the bytes already read by 
+        androguard, so the file is not read (nor held in memory) twice.
+
+        Returns:
+            str: Hex digest.
+        """
+        if self.app_hash:
+            return self.app_hash
+        
+        try:
+            raw = self.apk.get_raw()
+        except AttributeError:
+            raw = None
+        if raw:
+            return hashlib.sha256(raw).hexdigest()
+        
+        return u.get_file_sha256(self.path_to_apk)
+    
     def _get_app_uses_permission(self) -> list[Permission]:
         """Extract permissions used by app.
 
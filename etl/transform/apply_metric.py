@@ -7,6 +7,7 @@ from etl.extract.tosdr import TosdrApi
 from abc import ABC, abstractmethod
 from os import path
 from pandas import read_csv
+import numpy as np
 
 
 class Metric(ABC):
@@ -60,6 +61,18 @@ class Metric(ABC):
             float: Normalized 0-10 score.
         """
         pass
+    
+    def get_scores(self, app_list: list[App]) -> list[float]:
+        """Returns the score of many apps. Metrics that can score a batch 
+        faster than app by app override it.
+
+        Args:
+            app_list (list[App]): Apps.
+
+        Returns:
+            list[float]: Normalized 0-10 score of each app (same order).
+        """
+        return [self.get_score(app) for app in app_list]
 
 class RPNDroidMetric(Metric):
     """Apply RPNDroid permission rank based metric.
@@ -95,11 +108,7 @@ class RPNDroidMetric(Metric):
         Returns:
             list[str]: List of hash.
         """
-        hash_list = []
-        for app in self.privacy_rank.app_scores_list:
-            hash_list.append(app.app_hash)
-            
-        return hash_list
+        return self.privacy_rank.get_app_hash_list()
         
     @staticmethod
     def get_name() -> str:
@@ -133,6 +142,45 @@ class RPNDroidMetric(Metric):
 
         return score / RPNDroidMetric.MAX_POSSIBLE_SCORE * 10
     
+    def get_scores(self, app_list: list[App]) -> list[float]:
+        """Apply RPNDroid score to many apps at once. Builds a sparse 
+        (coordinate) app x dangerous permission matrix and multiplies it by
+        the rank weight vector.
+
+        Args:
+            app_list (list[App]): Apps.
+
+        Returns:
+            list[float]: Normalized 0-10 score of each app (same order).
+        """
+        # Rank weight vector (first rank of each permission)
+        column = {}
+        weight_list = []
+        for rank in self.privacy_rank.permission_ranks_list or []:
+            if rank.permission_name not in column:
+                column[rank.permission_name] = len(weight_list)
+                weight_list.append(rank.value or 0)
+        weights = np.array(weight_list, dtype=float)
+        
+        # Non-zero entries of the app x permission matrix
+        row_list = []
+        col_list = []
+        for (i, app) in enumerate(app_list):
+            for permission in app.uses_permission_list or []:
+                if(permission.protection_level 
+                   and "dangerous" in permission.protection_level
+                   and permission.name in column):
+                    row_list.append(i)
+                    col_list.append(column[permission.name])
+        rows = np.array(row_list, dtype=np.intp)
+        cols = np.array(col_list, dtype=np.intp)
+        
+        # Sparse mat-vec
+        scores = np.bincount(rows, weights=weights[cols], 
+                             minlength=len(app_list))
+        
+        return (scores / RPNDroidMetric.MAX_POSSIBLE_SCORE * 10).tolist()
+    
 
 class TosdrMetric(Metric):
     """Apply Tosdr terms of service based metric.
@@ -166,11 +214,7 @@ class TosdrMetric(Metric):
         Returns:
             list[str]: List of hash.
         """
-        hash_list = []
-        for app in self.privacy_rank.app_scores_list:
-            hash_list.append(app.app_hash)
-            
-        return hash_list
+        return self.privacy_rank.get_app_hash_list()
         
     @staticmethod
     def get_name() -> str:
@@ -219,6 +263,9 @@ class PaperMetric(Metric):
         # Extract app scores
         self.df = read_csv(scores_db)
         self.scores = self.df["Score"]
+        # First score of each package
+        self.package_scores = dict(zip(self.df["Package"][::-1], 
+                                       self.scores[::-1]))
         
     def get_app_package_candidates(self) -> list[str]:
         """Returns app package list of apps candidates to apply the metric.
@@ -234,11 +281,7 @@ class PaperMetric(Metric):
         Returns:
             list[str]: List of hash.
         """
-        hash_list = []
-        for app in self.privacy_rank.app_scores_list:
-            hash_list.append(app.app_hash)
-            
-        return hash_list
+        return self.privacy_rank.get_app_hash_list()
         
     def set_privacy_rank(self, privacy_rank: PrivacyRank) -> None:
         """Sets the privacy rank.
@@ -266,7 +309,4 @@ class PaperMetric(Metric):
             float: Normalized 0-10 score. None if no possible rank.
         """
         # Apply rank
-        if app.package in list(self.df["Package"]):
-            return self.scores[self.df["Package"] == app.package].values[0]
-        
-        return None
\ No newline at end of file
+        return self.package_scores.get(app.package)
\ No newline at end of file
@@ -0,0 +1,117 @@
+# Writes a small synthetic apk (binary AndroidManifest.xml only) used by
+# test-manifest-parity.py. It covers uses-permission names that androguard
+# prefixes with the package (".CUSTOM", "NODOT"), duplicates, uses-sdk and
+# declared permissions and groups.
+# Usage: python pruebas/make-manifest-fixture.py
+import os
+import struct
+import zipfile
+
+FIXTURE = "pruebas/manifest_fixtures/synthetic.apk"
+NS_ANDROID = "http://schemas.android.com/apk/res/android"
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+NO_INDEX = 0xFFFFFFFF
+
+# (tag, [(attribute, type, value)], children)
+MANIFEST = ("manifest", [
+    ("package", TYPE_STRING, "com.example.fixture"),
+    ("versionCode", TYPE_INT_DEC, 42),
+    ("versionName", TYPE_STRING, "4.2"),
+], [
+    ("uses-sdk", [("minSdkVersion", TYPE_INT_DEC, 21),
+                  ("targetSdkVersion", TYPE_INT_DEC, 33)], []),
+    ("uses-permission", [("name", TYPE_STRING,
+                          "android.permission.INTERNET")], []),
+    ("uses-permission", [("name", TYPE_STRING, ".CUSTOM")], []),
+    ("uses-permission", [("name", TYPE_STRING, "NODOT")], []),
+    ("uses-permission", [("name", TYPE_STRING,
+                          "android.permission.INTERNET")], []),
+    ("uses-permission", [("name", TYPE_STRING,
+                          "android.permission.CAMERA")], []),
+    ("permission-group", [("name", TYPE_STRING,
+                           "com.example.fixture.GROUP")], []),
+    ("permission", [("name", TYPE_STRING, "com.example.fixture.MY_PERM"),
+                    ("permissionGroup", TYPE_STRING,
+                     "com.example.fixture.GROUP"),
+                    ("protectionLevel", TYPE_INT_HEX, 2)], []),
+    ("application", [("label", TYPE_STRING, "Fixture")], []),
+])
+
+
+def chunk(chunk_type: int, header: bytes, body: bytes) -> bytes:
+    header_size = 8 + len(header)
+    return (struct.pack("<HHI", chunk_type, header_size,
+                        header_size + len(body)) + header + body)
+
+
+def string_pool(strings: list[str]) -> bytes:
+    data = b""
+    offsets = b""
+    for s in strings:
+        offsets += struct.pack("<I", len(data))
+        data += struct.pack("<H", len(s)) + s.encode("utf-16-le") + b"\0\0"
+    data += b"\0" * (-len(data) % 4)
+    strings_start = 28 + len(offsets)
+    header = struct.pack("<IIIII", len(strings), 0, 0, strings_start, 0)
+    return chunk(0x0001, header, offsets + data)
+
+
+def build_manifest() -> bytes:
+    # Attribute names first (resource map), then the rest of strings
+    strings = []
+
+    def index(s: str) -> int:
+        if s not in strings:
+            strings.append(s)
+        return strings.index(s)
+
+    def names(node):
+        (tag, attributes, children) = node
+        for (name, _, _) in attributes:
+            index(name)
+        for child in children:
+            names(child)
+    names(MANIFEST)
+    n_attribute_names = len(strings)
+
+    ns_prefix = index("android")
+    ns_uri = index(NS_ANDROID)
+
+    def element(node) -> bytes:
+        (tag, attributes, children) = node
+        attribute_data = b""
+        for (name, value_type, value) in attributes:
+            ns = NO_INDEX if name == "package" else ns_uri
+            if value_type == TYPE_STRING:
+                raw = data = index(value)
+            else:
+                (raw, data) = (NO_INDEX, value)
+            attribute_data += struct.pack("<IIIHBBI", ns, index(name),
+                                          raw, 8, 0, value_type, data)
+        start = chunk(0x0102, struct.pack("<II", 1, NO_INDEX),
+                      struct.pack("<IIHHHHHH", NO_INDEX, index(tag), 20, 20,
+                                  len(attributes), 0, 0, 0) + attribute_data)
+        end = chunk(0x0103, struct.pack("<II", 1, NO_INDEX),
+                    struct.pack("<II", NO_INDEX, index(tag)))
+        return start + b"".join(element(c) for c in children) + end
+
+    body = element(MANIFEST)
+    namespace = struct.pack("<II", ns_prefix, ns_uri)
+    body = (chunk(0x0100, struct.pack("<II", 1, NO_INDEX), namespace) + body
+            + chunk(0x0101, struct.pack("<II", 1, NO_INDEX), namespace))
+    # Attribute resource ids are not needed, names are on the string pool
+    resource_map = chunk(0x0180, b"", b"\0\0\0\0" * n_attribute_names)
+
+    return chunk(0x0003, b"", string_pool(strings) + resource_map + body)
+
+
+os.makedirs(os.path.dirname(FIXTURE), exist_ok=True)
+with zipfile.ZipFile(FIXTURE, "w", zipfile.ZIP_DEFLATED) as apk:
+    # Fixed dates so the fixture is the same on every run
+    apk.writestr(zipfile.ZipInfo("AndroidManifest.xml", (2023, 1, 1, 0, 0, 0)),
+                 build_manifest(), zipfile.ZIP_DEFLATED)
+    apk.writestr(zipfile.ZipInfo("classes.dex", (2023, 1, 1, 0, 0, 0)),
+                 b"dex\n035\0", zipfile.ZIP_DEFLATED)
+print(FIXTURE + " written.")
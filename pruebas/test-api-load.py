@@ -0,0 +1,54 @@
+# Load test: p99 of /get/app/hash alone and while slow endpoints
+# (/v2/get/app/name launches Firefox) are in flight. It should stay flat.
+# Usage: python pruebas/test-api-load.py <base_url> <app_hash> [app_name]
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8080"
+APP_HASH = sys.argv[2] if len(sys.argv) > 2 else ""
+APP_NAME = sys.argv[3] if len(sys.argv) > 3 else "Whatsapp"
+
+N_REQUESTS = 500
+N_CLIENTS = 20
+N_SLOW_CLIENTS = 4
+
+
+def get_app_by_hash(session: requests.Session) -> float:
+    start = time.perf_counter()
+    session.get(BASE_URL + "/get/app/hash", params={"hash": APP_HASH},
+                timeout=60)
+    return time.perf_counter() - start
+
+
+def get_app_by_name() -> None:
+    requests.get(BASE_URL + "/v2/get/app/name", params={"name": APP_NAME},
+                 timeout=600)
+
+
+def measure() -> list[float]:
+    session = requests.Session()
+    with ThreadPoolExecutor(N_CLIENTS) as executor:
+        return sorted(executor.map(lambda _: get_app_by_hash(session),
+                                   range(N_REQUESTS)))
+
+
+def report(name: str, latencies: list[float]) -> None:
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print("%s: p50 %.1f ms, p99 %.1f ms, max %.1f ms"
+          % (name, p50 * 1000, p99 * 1000, latencies[-1] * 1000))
+
+
+report("idle", measure())
+
+slow_executor = ThreadPoolExecutor(N_SLOW_CLIENTS)
+slow_futures = [slow_executor.submit(get_app_by_name)
+                for _ in range(N_SLOW_CLIENTS)]
+time.sleep(1) # Let slow requests start
+report("slow endpoints in flight", measure())
+print("%d slow requests still running."
+      % len([f for f in slow_futures if not f.done()]))
+slow_executor.shutdown(wait=True)
@@ -0,0 +1,52 @@
+# Peak memory (max RSS) of hashing and parsing big apks, old whole-file
+# read vs current ApkDataExtractor. Each mode runs on a fresh process.
+# Usage: python pruebas/test-apk-hash-memory.py <apk> [apk ...]
+import hashlib
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ["read", "chunked", "extractor-old", "extractor"]
+
+
+def run(mode: str, apk_path: str) -> str:
+    if mode == "read":
+        return hashlib.sha256(open(apk_path, "rb").read()).hexdigest()
+
+    if mode == "chunked":
+        from common.util import Util as u
+        return u.get_file_sha256(apk_path)
+
+    from etl.transform.apk_data_extractor import ApkDataExtractor
+    if mode == "extractor-old":
+        extractor = ApkDataExtractor(apk_path, manifest_only=False)
+        hash = hashlib.sha256(open(apk_path, "rb").read()).hexdigest()
+        extractor._get_app_uses_permission()
+        return hash
+
+    extractor = ApkDataExtractor(apk_path)
+    return extractor.get_app(find_category=False).hash
+
+
+if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+    start = time.perf_counter()
+    hash = run(sys.argv[2], sys.argv[3])
+    elapsed = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print("%s %.1f %.2f" % (hash, max_rss, elapsed))
+    sys.exit(0)
+
+for apk_path in sys.argv[1:]:
+    print(apk_path)
+    hashes = set()
+    for mode in MODES:
+        output = subprocess.run([sys.executable, __file__, "--mode", mode,
+                                 apk_path], capture_output=True, text=True)
+        if output.returncode != 0:
+            print("  %-14s failed: %s" % (mode, output.stderr.strip()[-200:]))
+            continue
+        (hash, max_rss, elapsed) = output.stdout.split()[-3:]
+        hashes.add(hash)
+        print("  %-14s max RSS %8s MiB  %6s s" % (mode, max_rss, elapsed))
+    print("  same hash: %s" % (len(hashes) == 1))
@@ -25,8 +25,6 @@ with open("apps.csv") as f:
 from etl.extract.androzoo import AndrozooGP
 from etl.load.az_metadata_loader import AzMetadataLoader
 
-az_metadata_list = AndrozooGP().bulk_load_from_index("/media/app-pimd/Data/gp-metadata-full.jsonl.gz", 16881166, app_list)
-
 loader = AzMetadataLoader()
-for az_metadata in az_metadata_list:
-    print(loader.load_az_metadata(az_metadata))
\ No newline at end of file
+for az_metadata_list in AndrozooGP().bulk_load_from_index("/media/app-pimd/Data/gp-metadata-full.jsonl.gz", 16881166, app_list):
+    print(loader.load_az_metadata_list(az_metadata_list))
\ No newline at end of file
@@ -0,0 +1,60 @@
+# Checks that the manifest-only extractor (ManifestApk) returns the same App
+# fields as the full androguard analysis, and compares their time.
+# Usage: python pruebas/test-manifest-parity.py <apk or dir> [...]
+# Synthetic fixture (make-manifest-fixture.py):
+#   python pruebas/test-manifest-parity.py pruebas/manifest_fixtures/
+import os
+import sys
+import time
+
+from etl.transform.apk_data_extractor import ApkDataExtractor
+
+FIELDS = ["hash", "package", "version_code", "version_name",
+          "min_sdk_version", "target_sdk_version", "max_sdk_version"]
+
+
+def extract(apk_path: str, manifest_only: bool) -> tuple[dict, float]:
+    start = time.perf_counter()
+    app = ApkDataExtractor(apk_path, manifest_only=manifest_only).get_app(
+        find_category=False)
+    elapsed = time.perf_counter() - start
+
+    fields = {field: getattr(app, field) for field in FIELDS}
+    fields["uses_permissions"] = sorted(p.name
+                                        for p in app.uses_permission_list)
+    fields["defines_permissions"] = sorted(
+        (p.name, p.protection_level,
+         [g.name for g in p.declared_group_list or []])
+        for p in app.defines_permission_list)
+    fields["defines_groups"] = sorted(g.name for g in app.defines_group_list)
+
+    return (fields, elapsed)
+
+
+apk_path_list = []
+for arg in sys.argv[1:]:
+    if os.path.isdir(arg):
+        apk_path_list += [os.path.join(arg, f) for f in sorted(os.listdir(arg))
+                          if f.endswith(".apk")]
+    else:
+        apk_path_list.append(arg)
+
+n_failed = 0
+total_fast = 0
+total_full = 0
+for apk_path in apk_path_list:
+    (full, full_time) = extract(apk_path, False)
+    (fast, fast_time) = extract(apk_path, True)
+    total_full += full_time
+    total_fast += fast_time
+
+    diff = [field for field in full if full[field] != fast[field]]
+    n_failed += bool(diff)
+    print("%s %s: full %.3f s, manifest only %.3f s %s"
+          % ("OK  " if not diff else "FAIL", apk_path, full_time, fast_time,
+             ", ".join("%s: %s != %s" % (f, full[f], fast[f]) for f in diff)))
+
+print("%d/%d apks with the same fields. Total: full %.1f s, manifest only "
+      "%.1f s." % (len(apk_path_list) - n_failed, len(apk_path_list),
+                   total_full, total_fast))
+sys.exit(1 if n_failed else 0)
@@ -0,0 +1,77 @@
+# Checks the HTTP Play Store parsers against saved pages.
+# Save fixtures (HTML by HTTP, expected result by browser):
+#   python pruebas/test-play-store-http.py save com.whatsapp org.telegram.messenger
+# Check saved fixtures offline (synthetic pages with the structures the
+# parsers use are committed, saved ones are added to them):
+#   python pruebas/test-play-store-http.py
+import json
+import os
+import sys
+import time
+
+from etl.extract.browser_pool import BrowserPool
+from etl.extract.http_session import HttpSession
+from etl.extract.play_store import CategoryFinder, SearchEngine
+
+FIXTURE_DIR = "pruebas/play_store_pages/"
+EXPECTED_FILE = FIXTURE_DIR + "expected.json"
+
+
+def save(package_list: list[str]) -> None:
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    expected = {}
+    if os.path.exists(EXPECTED_FILE):
+        with open(EXPECTED_FILE) as f:
+            expected = json.load(f)
+
+    http = HttpSession.get_session()
+    with BrowserPool.get_pool().session() as session:
+        for package in package_list:
+            page = http.get_text(CategoryFinder.APP_URL_PREFIX + package)
+            with open(FIXTURE_DIR + "app-%s.html" % package, "w") as f:
+                f.write(page or "")
+            expected["app-%s.html" % package] = CategoryFinder(
+                )._get_app_category_browser(package, session.driver)
+
+            page = http.get_text(SearchEngine.QUERY_URL.format(package))
+            with open(FIXTURE_DIR + "search-%s.html" % package, "w") as f:
+                f.write(page or "")
+            expected["search-%s.html" % package] = SearchEngine(
+                )._get_app_package_browser(package, session.driver)
+
+    with open(EXPECTED_FILE, "w") as f:
+        json.dump(expected, f, indent=2)
+    BrowserPool.get_pool().close()
+
+
+def check() -> None:
+    with open(EXPECTED_FILE) as f:
+        expected = json.load(f)
+
+    failed = 0
+    for (filename, result) in sorted(expected.items()):
+        with open(FIXTURE_DIR + filename) as f:
+            page = f.read()
+
+        start = time.perf_counter()
+        if filename.startswith("app-"):
+            parsed = CategoryFinder.parse_app_category(page)
+        else:
+            parsed = SearchEngine.parse_app_package(page)
+        elapsed = time.perf_counter() - start
+
+        ok = parsed == result
+        failed += not ok
+        print("%s %s: %s (expected %s) %.1f ms"
+              % ("OK  " if ok else "FAIL", filename, parsed, result,
+                 elapsed * 1000))
+
+    print("%d/%d fixtures parsed as the browser."
+          % (len(expected) - failed, len(expected)))
+    sys.exit(1 if failed else 0)
+
+
+if len(sys.argv) > 1 and sys.argv[1] == "save":
+    save(sys.argv[2:])
+else:
+    check()
@@ -0,0 +1,38 @@
+# Checks RPNDroidMetric batch scoring (get_scores) against per app scoring
+# (get_score) over random apps.
+import random
+
+from common.domain.app import App
+from common.domain.permission import Permission
+from common.domain.privacy_rank import PrivacyRank
+from common.domain.rank import Rank
+from etl.transform.apply_metric import RPNDroidMetric
+
+random.seed(0)
+
+permission_names = ["android.permission.P%d" % i for i in range(300)]
+protection_levels = ["dangerous", "normal", "signature", "dangerous|appop",
+                     None]
+
+# Only some permissions ranked, some of them with 0 value
+rank_list = [Rank(random.choice([0, random.random() / 10]), name, "RPNDroid")
+             for name in random.sample(permission_names, 120)]
+metric = RPNDroidMetric()
+metric.set_privacy_rank(PrivacyRank("RPNDroid", None, None, rank_list, None))
+
+app_list = []
+for i in range(2000):
+    uses_permission_list = [
+        Permission(name, random.choice(protection_levels))
+        for name in random.sample(permission_names, random.randint(0, 40))
+    ]
+    app_list.append(App("hash%d" % i, "com.app%d" % i,
+                        use_per_l=uses_permission_list))
+
+expected = [metric.get_score(app) for app in app_list]
+result = metric.get_scores(app_list)
+
+mismatch = [(e, r) for (e, r) in zip(expected, result) if abs(e - r) > 1e-9]
+print("%d apps, %d mismatches." % (len(app_list), len(mismatch)))
+print(mismatch[:10])
+print(metric.get_scores([]))